@@ -6,5 +6,6 @@
 # - imports (definitely/possible[an if/catch importerror])
 
 from .api import get_requires_for_build_sdist, get_requires_for_build_wheel
+from .monorepo import discover
 
-__all__ = ["get_requires_for_build_sdist", "get_requires_for_build_wheel"]
+__all__ = ["discover", "get_requires_for_build_sdist", "get_requires_for_build_wheel"]
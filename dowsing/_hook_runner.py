@@ -0,0 +1,81 @@
+"""
+Runs PEP 517 hooks in a build environment, for `dowsing.hybrid`.
+
+This is run as a script by the environment's python, so it must only use the
+standard library (and must not import dowsing).
+
+    python _hook_runner.py BACKEND BACKEND_PATH HOOK OUTPUT_DIR
+
+BACKEND_PATH is joined with os.pathsep (and can be empty).  The result is
+written as json to OUTPUT_DIR/result.json, because backends are free to print
+whatever they like to stdout.
+"""
+
+import importlib
+import json
+import os
+import sys
+import zipfile
+from typing import Any, List
+
+
+def load_backend(name: str, backend_path: List[str]) -> Any:
+    if backend_path:
+        sys.path[:0] = [os.path.abspath(p) for p in backend_path]
+    mod_name, _, obj_path = name.partition(":")
+    obj = importlib.import_module(mod_name)
+    for attr in obj_path.split("."):
+        if attr:
+            obj = getattr(obj, attr)
+    return obj
+
+
+def prepare_metadata(backend: Any, output_dir: str) -> str:
+    """
+    Returns the text of METADATA, building a wheel if the backend doesn't have
+    the (optional) prepare_metadata_for_build_wheel hook.
+    """
+    metadata_dir = os.path.join(output_dir, "metadata")
+    os.mkdir(metadata_dir)
+    hook = getattr(backend, "prepare_metadata_for_build_wheel", None)
+    if hook is not None:
+        dist_info = hook(metadata_dir)
+        with open(
+            os.path.join(metadata_dir, dist_info, "METADATA"), encoding="utf-8"
+        ) as f:
+            return f.read()
+
+    wheel_dir = os.path.join(output_dir, "wheel")
+    os.mkdir(wheel_dir)
+    wheel = backend.build_wheel(wheel_dir)
+    with zipfile.ZipFile(os.path.join(wheel_dir, wheel)) as z:
+        for name in z.namelist():
+            parts = name.split("/")
+            if (
+                len(parts) == 2
+                and parts[0].endswith(".dist-info")
+                and parts[1] == "METADATA"
+            ):
+                return z.read(name).decode("utf-8")
+    raise Exception(f"No METADATA in {wheel}")
+
+
+def main(name: str, backend_path: str, hook: str, output_dir: str) -> None:
+    backend = load_backend(name, [p for p in backend_path.split(os.pathsep) if p])
+
+    result: Any
+    if hook == "prepare_metadata_for_build_wheel":
+        result = prepare_metadata(backend, output_dir)
+    elif hook in ("get_requires_for_build_wheel", "get_requires_for_build_sdist"):
+        # Optional hooks; these are the defaults from PEP 517.
+        fn = getattr(backend, hook, None)
+        result = fn() if fn is not None else []
+    else:
+        raise ValueError(f"Unknown hook {hook!r}")
+
+    with open(os.path.join(output_dir, "result.json"), "w") as f:
+        json.dump(result, f)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:5])
@@ -0,0 +1,150 @@
+"""
+Re-analyzing only the projects whose inputs changed between two git revisions.
+
+Results for everything else come from a store, which can be any
+`MutableMapping[str, Distribution]` -- a plain dict, or `shelve.open(...)` to
+keep results between CI runs.
+"""
+
+import posixpath
+import subprocess
+from pathlib import Path
+from typing import Collection, Dict, List, Mapping, MutableMapping, Optional, Set, Union
+
+from .monorepo import discover, get_metadata_all
+from .types import Distribution
+from .watch import INPUT_FILES
+
+
+def changed_paths(root: Path, base: str, head: str = "HEAD") -> List[str]:
+    """
+    Returns the files changed between two revisions, as posix paths relative to
+    root.  Files outside root are not included.
+
+    Renames are reported as a delete and an add, since both sides matter.
+    """
+    proc = subprocess.run(
+        ["git", "diff", "--name-only", "--no-renames", "-z", "--relative", base, head],
+        cwd=root,
+        check=True,
+        stdout=subprocess.PIPE,
+    )
+    return [p for p in proc.stdout.decode("utf-8").split("\0") if p]
+
+
+def _owner(path: str, projects: Collection[str]) -> Optional[str]:
+    """
+    Returns the innermost project containing `path`, or None.
+    """
+    d = posixpath.dirname(path)
+    while True:
+        if (d or ".") in projects:
+            return d or "."
+        if not d:
+            return None
+        d = posixpath.dirname(d)
+
+
+def _affects(rel: str, dist: Distribution) -> bool:
+    """
+    Whether a changed file (relative to its project) can change `dist`.
+    """
+    if rel in INPUT_FILES or rel in dist.input_files:
+        return True
+    # New packages, or a module becoming a package, can change what
+    # find_packages returns.  Top-level .py files can be py_modules.
+    if posixpath.basename(rel) == "__init__.py" or (
+        "/" not in rel and rel.endswith(".py")
+    ):
+        return True
+    if dist.source_mapping and rel in dist.source_mapping.values():
+        return True
+    if isinstance(dist.packages_dict, dict):
+        for v in dist.packages_dict.values():
+            v = posixpath.normpath(v)
+            if v == "." or rel.startswith(v + "/"):
+                return True
+    return False
+
+
+def affected_projects(
+    changed: Collection[str],
+    projects: Collection[str],
+    store: Mapping[str, Distribution],
+) -> Set[str]:
+    """
+    Returns the projects that need to be analyzed again: those that have no
+    stored result, those that a project was added to or removed from, and
+    those where a changed path is one of their inputs (even outside of them,
+    like a cargo workspace) or under one of their packages.  Projects with a
+    version from version control change with every commit, so they're always
+    included.
+    """
+    missing = {p for p in projects if p not in store}
+    # A project appearing inside another one (or going away) takes its files
+    # out of (or gives them back to) the enclosing project's source mapping.
+    appeared = missing | (set(store) - set(projects))
+    affected = missing | {
+        p for p in projects if p in store and store[p].scm_config is not None
+    }
+    for p in appeared:
+        if p != ".":
+            enclosing = _owner(p, projects)
+            if enclosing is not None and enclosing != p:
+                affected.add(enclosing)
+    for p in projects:
+        if p in affected:
+            continue
+        for f in store[p].input_files:
+            if posixpath.normpath(posixpath.join(p, f)) in changed:
+                affected.add(p)
+                break
+    for path in changed:
+        owner = _owner(path, projects)
+        if owner is None or owner in affected:
+            continue
+        rel = path if owner == "." else path[len(owner) + 1 :]
+        if _affects(rel, store[owner]):
+            affected.add(owner)
+    return affected
+
+
+def get_affected_metadata(
+    root: Path,
+    base: str,
+    store: MutableMapping[str, Distribution],
+    head: str = "HEAD",
+    max_workers: Optional[int] = None,
+) -> Dict[str, Union[Distribution, Exception]]:
+    """
+    Returns results for every project under root, like
+    `monorepo.get_metadata_all`, but only analyzes the ones affected by the
+    changes between `base` and `head`.
+
+    The working tree at root is what gets analyzed, so it should have `head`
+    checked out.  `store` is expected to hold results for `base`, and is
+    updated to hold results for `head`.
+    """
+    projects = discover(root)
+    todo = affected_projects(changed_paths(root, base, head), projects, store)
+    fresh = get_metadata_all(
+        root, only=todo, max_workers=max_workers, projects=projects
+    )
+
+    results: Dict[str, Union[Distribution, Exception]] = {}
+    for p in projects:
+        if p in fresh:
+            result = fresh[p]
+            if isinstance(result, Distribution):
+                store[p] = result
+            elif p in store:
+                # Don't let a stale success hide the failure next time.
+                del store[p]
+            results[p] = result
+        else:
+            results[p] = store[p]
+
+    for p in set(store) - set(projects):
+        del store[p]
+
+    return results
@@ -1,13 +1,15 @@
-from pathlib import Path
 from typing import List
 
 from highlighter.types import EnvironmentMarkers
 from packaging.requirements import Requirement
 
 from . import pep517
+from .types import ProjectPath
 
 
-def get_requires_for_build_sdist(path: Path, env: EnvironmentMarkers) -> List[str]:
+def get_requires_for_build_sdist(
+    path: ProjectPath, env: EnvironmentMarkers
+) -> List[str]:
     reqs = pep517.get_requires_for_build_sdist(path)
     rv = []
     for req_str in reqs:
@@ -17,7 +19,9 @@ def get_requires_for_build_sdist(path: Path, env: EnvironmentMarkers) -> List[st
     return rv
 
 
-def get_requires_for_build_wheel(path: Path, env: EnvironmentMarkers) -> List[str]:
+def get_requires_for_build_wheel(
+    path: ProjectPath, env: EnvironmentMarkers
+) -> List[str]:
     reqs = pep517.get_requires_for_build_wheel(path)
     rv = []
     for req_str in reqs:
@@ -0,0 +1,138 @@
+"""
+Contents of files that config refers to, like `open("README.md").read()` in
+setup.py or `file: requirements.txt` in setup.cfg.
+
+The same few files (READMEs, requirements.txt) get read over and over when one
+process analyzes many projects or the same project repeatedly, so they go
+through a `FileCache` that's bounded both per file and in total.  Python
+modules that setup.py imports are summarized once per distinct source, in a
+`SummaryCache`.
+"""
+
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Hashable, Optional, Tuple
+
+from .types import ProjectPath
+
+# A file bigger than this is almost certainly not something setup.py means to
+# pass to setup().
+MAX_FILE_BYTES = 1024 * 1024
+MAX_BYTES = 32 * 1024 * 1024
+
+
+class FileTooLarge(Exception):
+    pass
+
+
+class FileCache:
+    """
+    An LRU cache of file contents.
+
+    Files on disk are checked against their (mtime, size) on each read, so
+    edits are picked up.  Files in a `TreePath` never change, and are keyed by
+    `Tree.content_key` so that entries don't keep the tree alive; trees
+    without one (like a MemoryTree, which is in memory anyway) aren't cached.
+    """
+
+    def __init__(
+        self, max_bytes: int = MAX_BYTES, max_file_bytes: int = MAX_FILE_BYTES
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self._data: "OrderedDict[Hashable, Tuple[Optional[Tuple[int, int]], bytes]]"
+        self._data = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def read_bytes(self, path: ProjectPath) -> bytes:
+        """
+        Raises OSError like `path.read_bytes()` would, or FileTooLarge.
+        """
+        stamp: Optional[Tuple[int, int]] = None
+        key: Optional[Hashable]
+        if isinstance(path, Path):
+            st = path.stat()
+            if st.st_size > self.max_file_bytes:
+                raise FileTooLarge(str(path))
+            stamp = (st.st_mtime_ns, st.st_size)
+            key = path
+        else:
+            key = path.tree.content_key(path.relpath)
+
+        if key is not None:
+            with self._lock:
+                if key in self._data and self._data[key][0] == stamp:
+                    self._data.move_to_end(key)
+                    return self._data[key][1]
+
+        data = path.read_bytes()
+        if len(data) > self.max_file_bytes:
+            raise FileTooLarge(str(path))
+        if key is None:
+            return data
+
+        with self._lock:
+            if key in self._data:
+                self._size -= len(self._data.pop(key)[1])
+            self._data[key] = (stamp, data)
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, (_, old) = self._data.popitem(last=False)
+                self._size -= len(old)
+        return data
+
+    def read_text(self, path: ProjectPath, encoding: str = "utf-8") -> str:
+        return self.read_bytes(path).decode(encoding)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+
+
+class SummaryCache:
+    """
+    What's known about python modules, keyed by a hash of their source, so
+    that copies of the same file (like a vendored versioneer.py) are only
+    analyzed once.
+    """
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+# Shared by all readers, unless they're given others.
+FILE_CACHE = FileCache()
+SUMMARY_CACHE = SummaryCache()
@@ -0,0 +1,102 @@
+"""
+Package discovery that works on anything readers can read.
+
+`setuptools.find_packages` insists on a real directory (it uses `os.walk`), and
+importing setuptools just for that is slow anyway.
+"""
+
+import posixpath
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from typing import Callable, Dict, Iterable, List
+
+from .types import ProjectPath
+
+
+def _build_filter(*patterns: str) -> Callable[[str], bool]:
+    return lambda name: any(fnmatchcase(name, pat) for pat in patterns)
+
+
+def find_packages(
+    where: ProjectPath,
+    exclude: Iterable[str] = (),
+    include: Iterable[str] = ("*",),
+    namespaces: bool = False,
+) -> List[str]:
+    """
+    Returns the same list as `setuptools.find_packages`, in a stable order, or
+    with `namespaces`, as `setuptools.find_namespace_packages`.
+
+    Like setuptools, a directory is only a package if it has an `__init__.py`
+    (any directory is, for PEP 420 namespace packages), and excluded packages
+    are still searched for included subpackages.
+    """
+    return find_layout(where, exclude, include, namespaces, modules=False).packages
+
+
+@dataclass
+class Layout:
+    # Dotted names
+    packages: List[str] = field(default_factory=list)
+    py_modules: List[str] = field(default_factory=list)
+    # Package -> its directory, relative to the project
+    packages_dict: Dict[str, str] = field(default_factory=dict)
+
+
+def find_layout(
+    where: ProjectPath,
+    exclude: Iterable[str] = (),
+    include: Iterable[str] = ("*",),
+    namespaces: bool = False,
+    modules: bool = True,
+    prefix: str = "",
+) -> Layout:
+    """
+    Returns the packages that find_packages would, along with the top-level
+    modules that the same filters allow, from one walk of `where`.
+
+    `prefix` (where `where` is, relative to the project) is prepended to the
+    directories in packages_dict.
+    """
+    include_filter = _build_filter(*include)
+    exclude_filter = _build_filter("ez_setup", "*__pycache__", *exclude)
+    layout = Layout()
+    base = posixpath.normpath(prefix) if prefix else "."
+
+    def visit(path: ProjectPath, parent: str) -> None:
+        subdirs = []
+        children: Iterable[ProjectPath] = path.iterdir()
+        for child in sorted(children, key=lambda p: p.name):
+            name = child.name
+            if not child.is_dir():
+                if (
+                    modules
+                    and not parent
+                    and name.endswith(".py")
+                    and name != "setup.py"
+                ):
+                    module = name[: -len(".py")]
+                    if (
+                        module.isidentifier()
+                        and include_filter(module)
+                        and not exclude_filter(module)
+                    ):
+                        layout.py_modules.append(module)
+                continue
+            if "." in name:
+                continue
+            if not namespaces and not (child / "__init__.py").is_file():
+                continue
+            package = parent + name
+            if include_filter(package) and not exclude_filter(package):
+                layout.packages.append(package)
+                layout.packages_dict[package] = posixpath.normpath(
+                    posixpath.join(base, package.replace(".", "/"))
+                )
+            subdirs.append((child, package + "."))
+        for child, child_parent in subdirs:
+            visit(child, child_parent)
+
+    if where.is_dir():
+        visit(where, "")
+    return layout
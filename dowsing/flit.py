@@ -1,15 +1,14 @@
-from pathlib import Path
 from typing import Sequence
 
 import tomlkit
-from setuptools import find_packages
 
 from .pep621 import Pep621Reader
-from .types import Distribution
+from .setuptools.directives import resolve_directives
+from .types import Confidence, Distribution, ProjectPath
 
 
 class FlitReader(Pep621Reader):
-    def __init__(self, path: Path):
+    def __init__(self, path: ProjectPath):
         self.path = path
 
     def get_requires_for_build_sdist(self) -> Sequence[str]:
@@ -31,7 +30,6 @@ class FlitReader(Pep621Reader):
         flit = doc.get("tool", {}).get("flit", {})
         metadata = flit.get("metadata", {})
         for k, v in metadata.items():
-            # TODO description-file -> long_description
             # TODO home-page -> urls
             # TODO requires -> requires_dist
             # TODO tool.flit.metadata.urls
@@ -39,16 +37,12 @@ class FlitReader(Pep621Reader):
                 d.project_urls.append("Homepage={v}")
                 continue
             elif k == "module":
-                if (self.path / f"{v}.py").exists():
-                    k = "py_modules"
-                    v = [v]
-                else:
-                    k = "packages"
-                    v = find_packages(self.path.as_posix(), include=(f"{v}.*"))
-                    d.packages_dict = {i: i.replace(".", "/") for i in v}
+                self._guess_layout(d, v)
+                continue
             elif k == "description-file":
                 k = "description"
                 v = f"file: {v}"
+                d.confidence = {**d.confidence, "description": Confidence.UNKNOWN}
             elif k == "requires":
                 k = "requires_dist"
 
@@ -65,6 +59,7 @@ class FlitReader(Pep621Reader):
         # TODO extras-require
         # TODO distutils commands (e.g. pex 2.1.19)
 
+        resolve_directives(self.path, d)
         d.source_mapping = d._source_mapping(self.path)
         return d
 
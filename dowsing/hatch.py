@@ -0,0 +1,137 @@
+import posixpath
+import re
+from typing import Any, Dict, List, Mapping, Sequence
+
+import tomlkit
+
+from .pep621 import Pep621Reader, read_version
+from .scm import get_version
+from .types import Confidence, Distribution, ProjectPath, TooComplicated
+
+
+def _normalize(name: str) -> str:
+    # What hatchling looks for on disk
+    return re.sub(r"[^\w\d.]+", "_", name, flags=re.ASCII).replace(".", "_").lower()
+
+
+class HatchReader(Pep621Reader):
+    """
+    Reads projects using hatchling, which is pep621 plus `[tool.hatch]`.
+    """
+
+    def __init__(self, path: ProjectPath):
+        self.path = path
+
+    def get_requires_for_build_sdist(self) -> Sequence[str]:
+        return self._get_requires("sdist")
+
+    def get_requires_for_build_wheel(self) -> Sequence[str]:
+        return self._get_requires("wheel")
+
+    def _hatch(self) -> Mapping[str, Any]:
+        pyproject = self.path / "pyproject.toml"
+        doc = tomlkit.parse(pyproject.read_text())
+        hatch: Mapping[str, Any] = doc.get("tool", {}).get("hatch", {})
+        return hatch
+
+    def _target(self, hatch: Mapping[str, Any], target: str) -> Dict[str, Any]:
+        """
+        Returns the build options for target, which override those for all
+        targets.
+        """
+        build = hatch.get("build", {})
+        options = {k: v for k, v in build.items() if k not in ("targets", "hooks")}
+        options.update(build.get("targets", {}).get(target, {}))
+        return options
+
+    def _get_requires(self, target: str) -> List[str]:
+        hatch = self._hatch()
+        build = hatch.get("build", {})
+        target_table = build.get("targets", {}).get(target, {})
+        requires = list(target_table.get("dependencies", ()))
+        for hooks in (build.get("hooks", {}), target_table.get("hooks", {})):
+            for hook in hooks.values():
+                requires.extend(hook.get("dependencies", ()))
+        if target_table.get("require-runtime-dependencies"):
+            requires.extend(self.get_metadata().requires_dist)
+        return requires
+
+    def get_metadata(self) -> Distribution:
+        d = self.get_pep621_metadata()
+        hatch = self._hatch()
+
+        if d.get_confidence("version") == Confidence.UNKNOWN:
+            self._set_version(d, self._version(d, hatch.get("version", {})))
+
+        options = self._target(hatch, "wheel")
+        layout: Dict[str, str] = {}
+        if "packages" in options:
+            for p in options["packages"]:
+                layout[posixpath.basename(p.rstrip("/"))] = p
+        elif "only-include" in options:
+            sources = options.get("sources", {})
+            for p in options["only-include"]:
+                layout[self._rewrite(p, sources)] = p
+        elif "include" not in options:
+            layout = self._default_layout(d.name or "")
+        for source, installed in options.get("force-include", {}).items():
+            layout[installed] = source
+
+        self._set_layout(d, layout)
+        if not layout or "include" in options or "exclude" in options:
+            # Globs over the whole tree, which we don't try to reproduce.
+            d.confidence = {
+                **d.confidence,
+                "packages_dict": Confidence.UNKNOWN,
+                "source_mapping": Confidence.UNKNOWN,
+            }
+        return d
+
+    def _default_layout(self, name: str) -> Dict[str, str]:
+        """
+        Where hatchling looks when nothing is configured.
+        """
+        name = _normalize(name)
+        for candidate in (name, f"src/{name}"):
+            if (self.path / candidate / "__init__.py").is_file():
+                return {name: candidate}
+        if (self.path / f"{name}.py").is_file():
+            return {f"{name}.py": f"{name}.py"}
+        return {}
+
+    def _rewrite(self, path: str, sources: Any) -> str:
+        """
+        Applies `sources`, which is either prefixes to remove or a mapping of
+        prefixes to replacements.
+        """
+        if not isinstance(sources, Mapping):
+            sources = {s: "" for s in sources}
+        for prefix, replacement in sorted(
+            sources.items(), key=lambda x: len(x[0]), reverse=True
+        ):
+            prefix = prefix.rstrip("/")
+            if path == prefix or path.startswith(prefix + "/") or not prefix:
+                rest = path[len(prefix) :].lstrip("/")
+                return posixpath.join(replacement, rest) if replacement else rest
+        return path
+
+    def _version(self, d: Distribution, version: Mapping[str, Any]) -> Any:
+        source = version.get("source", "regex")
+        value: Any
+        if source == "regex" and "path" in version:
+            pattern = version.get("pattern")
+            if isinstance(pattern, str):
+                value = read_version(self.path, version["path"], pattern)
+            else:
+                value = read_version(self.path, version["path"])
+            d.input_files = (version["path"],)
+        elif source == "vcs":
+            # hatch-vcs, which is setuptools_scm underneath
+            config = dict(version.get("raw-options", {}))
+            if "fallback-version" in version:
+                config.setdefault("fallback_version", version["fallback-version"])
+            d.scm_config = config
+            value = get_version(self.path, config)
+        else:
+            value = TooComplicated(f"version source {source!r} isn't supported")
+        return value
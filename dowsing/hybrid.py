@@ -0,0 +1,362 @@
+"""
+Static analysis first, with the real PEP 517 hooks as a fallback.
+
+When the static readers can't say for sure (a field you asked for has
+Confidence.UNKNOWN, or they raise), the backend's own
+`prepare_metadata_for_build_wheel` is run instead.  That's slow mostly because
+of setting up a build environment, so environments are pooled: they're venvs
+whose site-packages symlink to distributions that are already installed
+locally, keyed by the exact set of distributions, and reused for every project
+with the same build requirements.  Nothing is downloaded; a build requirement
+that isn't installed locally is an error.
+
+Results of the fallback are cached by a hash of the project's files.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import sysconfig
+import tempfile
+import threading
+import venv
+from importlib import metadata as importlib_metadata
+from pathlib import Path
+from types import SimpleNamespace
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    MutableMapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from packaging.requirements import Requirement
+from packaging.utils import canonicalize_name
+
+from . import pep517
+from .monorepo import PRUNE_DIRS
+from .tree import TreePath
+from .types import Confidence, Distribution, ProjectPath
+
+HOOK_RUNNER = Path(__file__).with_name("_hook_runner.py")
+
+# What pip assumes for a project without [build-system].
+LEGACY_BACKEND = "setuptools.build_meta:__legacy__"
+DEFAULT_REQUIRES = ["setuptools>=40.8.0"]
+
+
+def is_confident(dist: Distribution, fields: Optional[Iterable[str]] = None) -> bool:
+    """
+    Whether a static result can be used as-is for `fields` (by default, all of
+    them): none of them are Confidence.UNKNOWN.
+    """
+    if fields is None:
+        return not any(c == Confidence.UNKNOWN for c in dist.confidence_map().values())
+    return all(dist.get_confidence(k) != Confidence.UNKNOWN for k in fields)
+
+
+def resolve_installed(
+    requires: Iterable[str],
+) -> List[importlib_metadata.Distribution]:
+    """
+    Returns the locally installed distributions that satisfy `requires`,
+    including their dependencies.
+    """
+    found: Dict[str, importlib_metadata.Distribution] = {}
+    todo: List[Tuple[Requirement, str]] = [(Requirement(r), "") for r in requires]
+    seen: Set[Tuple[str, str]] = set()
+    while todo:
+        req, extra = todo.pop()
+        if req.marker is not None and not req.marker.evaluate({"extra": extra}):
+            continue
+        name = canonicalize_name(req.name)
+        try:
+            dist = found.get(name) or importlib_metadata.distribution(req.name)
+        except importlib_metadata.PackageNotFoundError:
+            raise Exception(f"Build requirement {str(req)!r} is not installed")
+        if not req.specifier.contains(dist.version, prereleases=True):
+            raise Exception(
+                f"Build requirement {str(req)!r} is not installed "
+                f"(found {dist.version})"
+            )
+        found[name] = dist
+        for e in ("", *req.extras):
+            if (name, e) in seen:
+                continue
+            seen.add((name, e))
+            todo.extend((Requirement(r), e) for r in dist.requires or ())
+    return [found[k] for k in sorted(found)]
+
+
+def _link(src: Path, dst: Path) -> None:
+    """
+    Symlinks src at dst, merging directories that more than one distribution
+    installs into (namespace packages, mostly).
+    """
+    if not os.path.lexists(dst):
+        dst.symlink_to(src, target_is_directory=src.is_dir())
+    elif src.is_dir() and dst.is_dir():
+        if dst.is_symlink():
+            existing = Path(os.readlink(dst))
+            dst.unlink()
+            dst.mkdir()
+            for child in existing.iterdir():
+                _link(child, dst / child.name)
+        for child in src.iterdir():
+            _link(child, dst / child.name)
+
+
+class _Builder(venv.EnvBuilder):
+    def post_setup(self, context: SimpleNamespace) -> None:
+        self.context = context
+
+
+class Environment:
+    """
+    An isolated venv that can import a fixed set of installed distributions.
+    """
+
+    def __init__(
+        self, path: Path, dists: Sequence[importlib_metadata.Distribution]
+    ) -> None:
+        self.path = path
+        marker = path / "dowsing-env.json"
+        builder = _Builder(with_pip=False, symlinks=(os.name != "nt"))
+        if marker.exists():
+            # Left by an earlier pool with the same root; just find the paths.
+            self.python = Path(builder.ensure_directories(path).env_exe)
+            return
+
+        builder.create(path)
+        self.python = Path(builder.context.env_exe)
+        site_packages = Path(
+            sysconfig.get_path(
+                "purelib",
+                "nt" if os.name == "nt" else "posix_prefix",
+                vars={"base": str(path), "platbase": str(path)},
+            )
+        )
+        for dist in dists:
+            tops = {f.parts[0] for f in dist.files or () if f.parts[0] != ".."}
+            for top in sorted(tops):
+                src = Path(str(dist.locate_file(top)))
+                if src.exists():
+                    _link(src, site_packages / top)
+        marker.write_text(json.dumps([(d.metadata["Name"], d.version) for d in dists]))
+
+
+class EnvironmentPool:
+    """
+    Build environments, created on first use and reused after that.
+
+    Environments live under `root` (a temporary directory by default, removed
+    by `close()`).  Passing the same root to a later pool reuses the
+    environments that are already there.
+    """
+
+    def __init__(self, root: Optional[Path] = None) -> None:
+        self._owns_root = root is None
+        self.root = (
+            Path(tempfile.mkdtemp(prefix="dowsing-envs-")) if root is None else root
+        )
+        self._envs: Dict[str, Environment] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+
+    def __enter__(self) -> "EnvironmentPool":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def get(self, requires: Iterable[str]) -> Environment:
+        dists = resolve_installed(requires)
+        key = hashlib.sha256(
+            json.dumps(
+                [sys.executable] + [(d.metadata["Name"], d.version) for d in dists]
+            ).encode()
+        ).hexdigest()[:16]
+
+        with self._lock:
+            if key in self._envs:
+                return self._envs[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            if key not in self._envs:
+                self._envs[key] = Environment(self.root / key, dists)
+            return self._envs[key]
+
+    def prewarm(self, requires_list: Iterable[Iterable[str]]) -> None:
+        """
+        Creates environments ahead of time, for build requirements you expect
+        to see.
+        """
+        for requires in requires_list:
+            self.get(requires)
+
+    def close(self) -> None:
+        self._envs.clear()
+        if self._owns_root:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+
+def input_hash(path: ProjectPath) -> str:
+    """
+    Returns a hash of every file in the project (except in directories that
+    never matter, like .git), and the python version.
+    """
+    h = hashlib.sha256(sys.version.encode())
+    todo: List[ProjectPath] = [path]
+    while todo:
+        p = todo.pop()
+        children: Iterable[ProjectPath] = p.iterdir()
+        for child in sorted(children, key=lambda c: c.name, reverse=True):
+            if child.is_dir():
+                # setuptools writes egg-info into the source tree when run.
+                if not (
+                    child.name.startswith(".")
+                    or child.name in PRUNE_DIRS
+                    or child.name.endswith(".egg-info")
+                ):
+                    todo.append(child)
+            elif child.is_file():
+                rel = child.parts[len(path.parts) :]
+                h.update("/".join(rel).encode("utf-8", "surrogateescape") + b"\0")
+                h.update(hashlib.sha256(child.read_bytes()).digest())
+    return h.hexdigest()
+
+
+def _materialize(path: TreePath, dest: Path) -> None:
+    for item in path.rglob("*"):
+        target = dest.joinpath(*item.parts[len(path.parts) :])
+        if item.is_dir():
+            target.mkdir(parents=True, exist_ok=True)
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(item.read_bytes())
+
+
+class HybridAnalyzer:
+    """
+    `get_metadata` that is static when it can be, and correct when it can't.
+
+    After each call, `last_source` is "static", "cache", or "hooks".  `cache`
+    can be any `MutableMapping[str, Distribution]`, like a dict or a shelf.
+    """
+
+    def __init__(
+        self,
+        pool: Optional[EnvironmentPool] = None,
+        cache: Optional[MutableMapping[str, Distribution]] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        self.pool = EnvironmentPool() if pool is None else pool
+        self.cache: MutableMapping[str, Distribution] = {} if cache is None else cache
+        self.timeout = timeout
+        self.last_source = ""
+
+    def get_metadata(
+        self, path: ProjectPath, fields: Optional[Iterable[str]] = None
+    ) -> Distribution:
+        """
+        If you only need some fields (distribution keys like "requires_dist"),
+        pass them as `fields`, and the hooks will only be run when one of
+        those is unknown.
+        """
+        static: Optional[Distribution]
+        try:
+            static = pep517.get_metadata(path)
+        except Exception:
+            static = None
+        else:
+            if is_confident(static, fields):
+                self.last_source = "static"
+                return static
+
+        key = input_hash(path)
+        if key in self.cache:
+            self.last_source = "cache"
+            return self.cache[key]
+
+        if isinstance(path, TreePath):
+            with tempfile.TemporaryDirectory(prefix="dowsing-src-") as d:
+                _materialize(path, Path(d))
+                dist = self._run_hooks(Path(d))
+        else:
+            dist = self._run_hooks(path)
+
+        # The hooks don't say where files come from.
+        if static is not None and static.source_mapping is not None:
+            dist.source_mapping = static.source_mapping
+
+        self.cache[key] = dist
+        self.last_source = "hooks"
+        return dist
+
+    def _run_hooks(self, path: Path) -> Distribution:
+        requires, backend, backend_path = pep517.get_build_system(path)
+        requires = [str(r) for r in requires]
+        if not requires and backend == LEGACY_BACKEND:
+            requires = DEFAULT_REQUIRES
+        env = self.pool.get(requires)
+
+        # Backends can ask for more in get_requires_for_build_wheel, but those
+        # (like "wheel" from older setuptools) are rarely needed for metadata, so
+        # ones that aren't installed locally are skipped.
+        extra: List[str] = []
+        for r in self._call(
+            env, path, backend, backend_path, "get_requires_for_build_wheel"
+        ):
+            try:
+                resolve_installed([r])
+            except Exception:
+                continue
+            extra.append(r)
+        if extra:
+            env = self.pool.get(requires + extra)
+
+        text = self._call(
+            env, path, backend, backend_path, "prepare_metadata_for_build_wheel"
+        )
+        dist = Distribution()
+        dist.parse(text)
+        return dist
+
+    def _call(
+        self,
+        env: Environment,
+        path: Path,
+        backend: str,
+        backend_path: List[str],
+        hook: str,
+    ) -> Any:
+        with tempfile.TemporaryDirectory(prefix="dowsing-hook-") as out:
+            proc = subprocess.run(
+                [
+                    str(env.python),
+                    "-I",
+                    str(HOOK_RUNNER),
+                    backend,
+                    os.pathsep.join(backend_path),
+                    hook,
+                    out,
+                ],
+                cwd=path,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                timeout=self.timeout,
+            )
+            result = Path(out) / "result.json"
+            if proc.returncode != 0 or not result.exists():
+                output = proc.stdout.decode("utf-8", "replace")
+                raise Exception(f"{hook} failed for {backend}:\n{output[-2000:]}")
+            return json.loads(result.read_text())
@@ -0,0 +1,229 @@
+"""
+In-tree backends (found through `backend-path` in pyproject.toml) that are thin
+wrappers around a backend we already know how to read, like
+
+    from setuptools import build_meta as _orig
+    from setuptools.build_meta import *
+
+    def get_requires_for_build_wheel(config_settings=None):
+        return _orig.get_requires_for_build_wheel(config_settings) + ["cython"]
+
+These are recognized without running them.  Anything else a hook does (a
+custom `build_wheel`, say) means we can't tell what it produces.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import libcst as cst
+from libcst.helpers import get_full_name_for_node
+
+from .types import BaseReader, Distribution, ProjectPath
+
+HOOKS = frozenset(
+    {
+        "build_wheel",
+        "build_sdist",
+        "build_editable",
+        "get_requires_for_build_wheel",
+        "get_requires_for_build_sdist",
+        "get_requires_for_build_editable",
+        "prepare_metadata_for_build_wheel",
+        "prepare_metadata_for_build_editable",
+    }
+)
+REQUIRED_HOOKS = ("build_wheel", "build_sdist")
+
+
+@dataclass
+class InTreeBackend:
+    # The known backend that it re-exports
+    backend: str
+    # "sdist" or "wheel" -> requirements it adds
+    extra_requires: Dict[str, List[str]] = field(default_factory=dict)
+
+
+class InTreeReader(BaseReader):
+    """
+    The reader for the wrapped backend, plus the wrapper's extra requirements.
+    """
+
+    def __init__(self, reader: BaseReader, extra_requires: Dict[str, List[str]]):
+        self.path = reader.path
+        self.reader = reader
+        self.extra_requires = extra_requires
+
+    def get_requires_for_build_sdist(self) -> Sequence[str]:
+        return list(self.reader.get_requires_for_build_sdist()) + list(
+            self.extra_requires.get("sdist", ())
+        )
+
+    def get_requires_for_build_wheel(self) -> Sequence[str]:
+        return list(self.reader.get_requires_for_build_wheel()) + list(
+            self.extra_requires.get("wheel", ())
+        )
+
+    def get_metadata(self) -> Distribution:
+        return self.reader.get_metadata()
+
+    def get_source_mapping(self, dist: Distribution) -> Optional[Dict[str, str]]:
+        return self.reader.get_source_mapping(dist)
+
+
+def find_backend_module(
+    path: ProjectPath, backend: str, backend_path: Iterable[str]
+) -> Optional[ProjectPath]:
+    """
+    Returns the file that `backend` is in, if it's in one of the backend-path
+    directories.
+    """
+    parts = backend.partition(":")[0].split(".")
+    for d in backend_path:
+        base = path / d
+        for p in parts[:-1]:
+            base = base / p
+        for candidate in (base / f"{parts[-1]}.py", base / parts[-1] / "__init__.py"):
+            if candidate.is_file():
+                return candidate
+    return None
+
+
+def inspect_backend(source: str, known: Iterable[str]) -> Optional[InTreeBackend]:
+    """
+    Returns which of the `known` backends (module names, optionally with a
+    ":object") the module with this source re-exports, or None.
+    """
+    modules = {k.partition(":")[0]: k for k in known}
+    try:
+        module = cst.parse_module(source)
+    except cst.ParserSyntaxError:
+        return None
+
+    # local name -> known module
+    aliases: Dict[str, str] = {}
+    # hook -> known module it comes from
+    hooks: Dict[str, str] = {}
+    extra: Dict[str, List[str]] = {}
+    star: Optional[str] = None
+
+    statements: List[cst.CSTNode] = list(module.body)
+    while statements:
+        statement = statements.pop(0)
+        if isinstance(statement, cst.Try):
+            # try: from x import *  except ImportError: ...
+            statements[:0] = list(statement.body.body)
+            continue
+        if isinstance(statement, cst.FunctionDef):
+            name = statement.name.value
+            if name == "__getattr__":
+                return None
+            if name not in HOOKS:
+                continue
+            wrapped = _delegates(statement, aliases)
+            if wrapped is None:
+                return None
+            hooks[name] = wrapped[0]
+            if wrapped[1]:
+                extra[name.rpartition("_")[2]] = wrapped[1]
+            continue
+        if not isinstance(statement, cst.SimpleStatementLine):
+            continue
+        for small in statement.body:
+            if (
+                isinstance(small, cst.ImportFrom)
+                and small.module is not None
+                and not small.relative
+            ):
+                source_module = get_full_name_for_node(small.module)
+                if isinstance(small.names, cst.ImportStar):
+                    if source_module in modules:
+                        star = source_module
+                    continue
+                for alias in small.names:
+                    imported = get_full_name_for_node(alias.name)
+                    local = _local_name(alias) or imported
+                    full = f"{source_module}.{imported}"
+                    if full in modules and local:
+                        aliases[local] = full
+                    elif source_module in modules and local in HOOKS:
+                        hooks[local] = source_module
+            elif isinstance(small, cst.Import):
+                for alias in small.names:
+                    imported = get_full_name_for_node(alias.name)
+                    local = _local_name(alias)
+                    if imported in modules:
+                        aliases[local or imported or ""] = imported
+            elif isinstance(small, cst.Assign) and len(small.targets) == 1:
+                target = get_full_name_for_node(small.targets[0].target)
+                if target in HOOKS:
+                    value = get_full_name_for_node(small.value) or ""
+                    owner, _, attr = value.rpartition(".")
+                    if attr != target or owner not in aliases:
+                        return None
+                    hooks[target] = aliases[owner]
+
+    if star is not None:
+        for hook in HOOKS:
+            hooks.setdefault(hook, star)
+    if any(h not in hooks for h in REQUIRED_HOOKS):
+        return None
+    wrapped_modules = set(hooks.values())
+    if len(wrapped_modules) != 1:
+        return None
+    return InTreeBackend(modules[wrapped_modules.pop()], extra)
+
+
+def _local_name(alias: cst.ImportAlias) -> Optional[str]:
+    if alias.asname is not None and isinstance(alias.asname.name, cst.Name):
+        return alias.asname.name.value
+    return None
+
+
+def _delegates(
+    function: cst.FunctionDef, aliases: Dict[str, str]
+) -> Optional[Tuple[str, List[str]]]:
+    """
+    For a hook that just calls the same hook of a known backend (and, for
+    get_requires_*, adds a list of strings to it), returns (module, extra).
+    """
+    body = list(function.body.body)
+    if (
+        body
+        and isinstance(body[0], cst.SimpleStatementLine)
+        and isinstance(body[0].body[0], cst.Expr)
+        and isinstance(body[0].body[0].value, cst.SimpleString)
+    ):
+        body = body[1:]  # docstring
+    if len(body) != 1 or not isinstance(body[0], cst.SimpleStatementLine):
+        return None
+    ret = body[0].body[0]
+    if not isinstance(ret, cst.Return) or ret.value is None:
+        return None
+
+    value: cst.BaseExpression = ret.value
+    extra: List[str] = []
+    if isinstance(value, cst.BinaryOperation) and isinstance(value.operator, cst.Add):
+        if not function.name.value.startswith("get_requires_for_build_"):
+            return None
+        left, right = value.left, value.right
+        if isinstance(right, cst.List):
+            value, literal = left, right
+        elif isinstance(left, cst.List):
+            value, literal = right, left
+        else:
+            return None
+        for el in literal.elements:
+            if not isinstance(el.value, cst.SimpleString):
+                return None
+            s = el.value.evaluated_value
+            if not isinstance(s, str):
+                return None
+            extra.append(s)
+
+    if not isinstance(value, cst.Call):
+        return None
+    called = get_full_name_for_node(value.func) or ""
+    owner, _, attr = called.rpartition(".")
+    if attr != function.name.value or owner not in aliases:
+        return None
+    return aliases[owner], extra
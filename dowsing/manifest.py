@@ -0,0 +1,243 @@
+"""
+MANIFEST.in, which decides what setuptools puts in an sdist, and (with
+include_package_data) which data files in packages end up in the wheel.
+
+Each directive adds or removes the files it matches, so a file's fate is that
+of the last directive matching it.  All the directives are compiled into one
+regex, newest first, so that a single match per file (in a single walk of the
+tree) gives the answer.
+"""
+
+import posixpath
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Mapping, Optional, Pattern, Sequence, Tuple
+
+from .types import ProjectPath
+
+# What setuptools puts in an sdist regardless (before MANIFEST.in applies).
+DEFAULT_FILES = (
+    "README",
+    "README.txt",
+    "README.rst",
+    "README.md",
+    "setup.py",
+    "setup.cfg",
+    "pyproject.toml",
+    "test/test*.py",
+    "LICEN[CS]E*",
+    "LICENCE*",
+    "COPYING*",
+    "NOTICE*",
+    "AUTHORS*",
+)
+
+# Never in an sdist, and not worth walking.
+PRUNE_DIRS = frozenset(
+    {"build", "dist", ".git", ".hg", ".svn", ".bzr", "CVS", "RCS", "_darcs"}
+)
+
+# directive -> (whether it includes, whether the first word is a directory)
+DIRECTIVES = {
+    "include": (True, False),
+    "exclude": (False, False),
+    "recursive-include": (True, True),
+    "recursive-exclude": (False, True),
+    "global-include": (True, False),
+    "global-exclude": (False, False),
+    "graft": (True, True),
+    "prune": (False, True),
+}
+
+
+def glob_to_regex(pattern: str) -> str:
+    """
+    Translates a glob where `*` and `?` don't match "/" and `**` matches any
+    number of directories.
+    """
+    result = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            result.append("(?:.*/)?")
+            i += 3
+            continue
+        elif pattern.startswith("**", i):
+            result.append(".*")
+            i += 2
+            continue
+        elif c == "*":
+            result.append("[^/]*")
+        elif c == "?":
+            result.append("[^/]")
+        elif c == "[" and "]" in pattern[i + 2 :]:
+            end = pattern.index("]", i + 2)
+            body = pattern[i + 1 : end].replace("\\", "\\\\")
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            result.append(f"[{body}]")
+            i = end
+        else:
+            result.append(re.escape(c))
+        i += 1
+    return "".join(result)
+
+
+def _directory(path: str) -> str:
+    """
+    Returns the regex prefix for paths under a directory.
+    """
+    path = posixpath.normpath(path.replace("\\", "/")).strip("/")
+    return "" if path == "." else glob_to_regex(path) + "/"
+
+
+@dataclass
+class Manifest:
+    """
+    The compiled MANIFEST.in.  `includes` says what the last directive
+    matching a path did to it, or None if none did.
+    """
+
+    pattern: Pattern[str]
+    # group name -> whether that directive includes
+    actions: Dict[str, bool] = field(default_factory=dict)
+    # Lines that weren't understood
+    unknown: List[str] = field(default_factory=list)
+
+    def includes(self, path: str) -> Optional[bool]:
+        match = self.pattern.fullmatch(path)
+        if match is None or match.lastgroup is None:
+            return None
+        return self.actions[match.lastgroup]
+
+
+def parse_manifest(text: str) -> Manifest:
+    # Continuation lines, like distutils' TextFile
+    text = re.sub(r"\\\n", " ", text)
+    alternatives: List[str] = []
+    actions: Dict[str, bool] = {}
+    unknown: List[str] = []
+    for line in text.splitlines():
+        words = line.split("#", 1)[0].split()
+        if not words:
+            continue
+        if words[0] not in DIRECTIVES:
+            unknown.append(line)
+            continue
+        include, has_dir = DIRECTIVES[words[0]]
+        args = [w.replace("\\", "/") for w in words[1:]]
+        if words[0] in ("graft", "prune"):
+            regexes = [_directory(a) + ".*" for a in args]
+        elif has_dir:
+            if len(args) < 2:
+                unknown.append(line)
+                continue
+            prefix = _directory(args[0])
+            regexes = [f"{prefix}(?:.*/)?{glob_to_regex(a)}" for a in args[1:]]
+        elif words[0].startswith("global-"):
+            regexes = [f"(?:.*/)?{glob_to_regex(a)}" for a in args]
+        else:
+            regexes = [glob_to_regex(a.lstrip("/")) for a in args]
+        if not regexes:
+            unknown.append(line)
+            continue
+        name = f"d{len(actions)}"
+        actions[name] = include
+        alternatives.append(f"(?P<{name}>{'|'.join(f'(?:{r})' for r in regexes)})")
+
+    # Newest first, so the first alternative that matches is the last directive
+    pattern = re.compile("|".join(reversed(alternatives)) or "(?!)", re.DOTALL)
+    return Manifest(pattern, actions, unknown)
+
+
+def read_manifest(root: ProjectPath) -> Optional[Manifest]:
+    path = root / "MANIFEST.in"
+    if not path.is_file():
+        return None
+    return parse_manifest(path.read_text())
+
+
+DEFAULT_MANIFEST = parse_manifest(f"include {' '.join(DEFAULT_FILES)}")
+
+
+def sdist_files(
+    root: ProjectPath,
+    manifest: Optional[Manifest],
+    source_mapping: Optional[Mapping[str, str]] = None,
+    all_files: bool = False,
+) -> List[str]:
+    """
+    Returns the files in root that go in an sdist, in sorted order: the
+    defaults and the wheel's sources (or with `all_files`, everything, like
+    setuptools_scm's file finder does), then MANIFEST.in.
+    """
+    sources = set((source_mapping or {}).values())
+    found: List[str] = []
+
+    def visit(path: ProjectPath, prefix: str) -> None:
+        children: Iterable[ProjectPath] = path.iterdir()
+        for child in sorted(children, key=lambda p: p.name):
+            rel = prefix + child.name
+            if child.is_dir():
+                if child.name not in PRUNE_DIRS:
+                    visit(child, rel + "/")
+                continue
+            included = manifest.includes(rel) if manifest is not None else None
+            if included is None:
+                included = (
+                    all_files or rel in sources or bool(DEFAULT_MANIFEST.includes(rel))
+                )
+            if included:
+                found.append(rel)
+
+    if root.is_dir():
+        visit(root, "")
+    return found
+
+
+def wheel_mapping(
+    source_mapping: Mapping[str, str],
+    manifest: Optional[Manifest],
+    packages_dict: Mapping[str, str],
+    package_data: Mapping[str, Sequence[str]],
+    include_package_data: bool,
+    all_files: bool = False,
+) -> Dict[str, str]:
+    """
+    Narrows a source mapping that has every file under the package directories
+    down to what setuptools' build_py copies: python modules, package_data, and
+    (with include_package_data) data files that are in the sdist.
+    """
+    data_patterns = {
+        package: re.compile("|".join(glob_to_regex(p) for p in patterns) or "(?!)")
+        for package, patterns in package_data.items()
+    }
+    result: Dict[str, str] = {}
+    for installed, source in source_mapping.items():
+        if installed.endswith(".py"):
+            result[installed] = source
+            continue
+        package, rel = _owning_package(installed, packages_dict)
+        if package is None:
+            result[installed] = source
+            continue
+        patterns = [data_patterns[k] for k in (package, "", "*") if k in data_patterns]
+        if any(p.fullmatch(rel) for p in patterns):
+            result[installed] = source
+        elif include_package_data:
+            included = manifest.includes(source) if manifest is not None else None
+            if included or (included is None and all_files):
+                result[installed] = source
+    return result
+
+
+def _owning_package(
+    installed: str, packages_dict: Mapping[str, str]
+) -> Tuple[Optional[str], str]:
+    parts = installed.split("/")
+    for i in range(len(parts) - 1, 0, -1):
+        package = ".".join(parts[:i])
+        if package in packages_dict:
+            return package, "/".join(parts[i:])
+    return None, installed
@@ -0,0 +1,308 @@
+"""
+Conditions on the build environment, and turning them into PEP 508 markers.
+
+A `Condition` is a conjunction of marker atoms like ("python_version", "<", "3").
+Anything involving "or" or "not" is a `Dnf`, a tuple of conditions of which any
+one holds: `TRUE` is `((),)` and `FALSE` is `()`.  These stay small in real
+setup.py files, but to be safe anything that grows past MAX_TERMS raises
+ValueError.
+"""
+
+import itertools
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from packaging.version import InvalidVersion, Version
+
+from .types import Condition, MarkerAtom, Sometimes, TooComplicated
+
+Dnf = Tuple[Condition, ...]
+
+TRUE: Dnf = ((),)
+FALSE: Dnf = ()
+
+MAX_TERMS = 256
+
+VERSION_VARIABLES = frozenset({"python_version", "python_full_version"})
+
+INVERSE_OPS = {
+    "==": "!=",
+    "!=": "==",
+    "<": ">=",
+    ">=": "<",
+    ">": "<=",
+    "<=": ">",
+    "in": "not in",
+    "not in": "in",
+}
+
+# Enough python versions to find a counterexample for any comparison that
+# real setup.py files make.
+_PYTHON_VERSIONS = [f"{x}.{y}" for x in (2, 3, 4) for y in range(21)]
+
+
+def _compare(lhs: str, op: str, rhs: str, version: bool) -> bool:
+    if op == "in":
+        return lhs in rhs
+    if op == "not in":
+        return lhs not in rhs
+    a: Any = lhs
+    b: Any = rhs
+    if version:
+        try:
+            a, b = Version(lhs), Version(rhs)
+        except InvalidVersion:
+            pass
+    if op == "==":
+        return bool(a == b)
+    if op == "!=":
+        return bool(a != b)
+    if op == "<":
+        return bool(a < b)
+    if op == "<=":
+        return bool(a <= b)
+    if op == ">":
+        return bool(a > b)
+    if op == ">=":
+        return bool(a >= b)
+    raise ValueError(op)
+
+
+def _candidates(var: str, atoms: List[MarkerAtom]) -> Set[str]:
+    values = {v for _, _, v in atoms}
+    if var in VERSION_VARIABLES:
+        values.update(_PYTHON_VERSIONS)
+        for v in list(values):
+            parts = v.split(".")
+            if all(p.isdigit() for p in parts):
+                bumped = parts[:-1] + [str(int(parts[-1]) + 1)]
+                values.add(".".join(bumped))
+                values.add(v + ".1")
+    else:
+        # Something that's equal to none of them.
+        values.add("\0")
+    return values
+
+
+def satisfiable(cond: Condition) -> bool:
+    """
+    Whether some environment meets all of cond.
+
+    Variables are treated as independent, so this can be wrong in the safe
+    direction, e.g. it doesn't know os_name == "nt" implies sys_platform ==
+    "win32".
+    """
+    by_var: Dict[str, List[MarkerAtom]] = {}
+    for atom in cond:
+        by_var.setdefault(atom[0], []).append(atom)
+    for var, atoms in by_var.items():
+        version = var in VERSION_VARIABLES
+        if not any(
+            all(_compare(c, op, v, version) for _, op, v in atoms)
+            for c in _candidates(var, atoms)
+        ):
+            return False
+    return True
+
+
+def conjoin(a: Condition, b: Condition) -> Optional[Condition]:
+    """
+    Returns a and b, or None if that can't hold.
+
+    Atoms that the others imply are dropped, so that python_version >= "3" and
+    python_version >= "3.7" is just the latter.
+    """
+    result = a + tuple(x for x in b if x not in a)
+    if not satisfiable(result):
+        return None
+    if len(result) > 1:
+        for atom in list(result):
+            others = tuple(x for x in result if x != atom)
+            if not satisfiable(others + (invert(atom),)):
+                result = others
+    return result
+
+
+def _check(x: Dnf) -> Dnf:
+    if len(x) > MAX_TERMS:
+        raise ValueError("condition too complicated")
+    return x
+
+
+def _absorb(terms: List[Condition]) -> Dnf:
+    """
+    Drops terms that are redundant because a more general one is there too.
+    """
+    result: List[Condition] = []
+    for t in sorted(terms, key=len):
+        if not any(set(r) <= set(t) for r in result):
+            result.append(t)
+    return _check(tuple(result))
+
+
+def and_(x: Dnf, y: Dnf) -> Dnf:
+    terms: List[Condition] = []
+    for a, b in itertools.product(x, y):
+        c = conjoin(a, b)
+        if c is not None:
+            terms.append(c)
+    return _absorb(terms)
+
+
+def or_(x: Dnf, y: Dnf) -> Dnf:
+    return _absorb(list(x + y))
+
+
+def not_(x: Dnf) -> Dnf:
+    result = TRUE
+    for cond in x:
+        result = and_(result, tuple((invert(atom),) for atom in cond))
+    return result
+
+
+def invert(atom: MarkerAtom) -> MarkerAtom:
+    var, op, value = atom
+    return (var, INVERSE_OPS[op], value)
+
+
+def is_tautology(x: Dnf) -> bool:
+    return not not_(x)
+
+
+def _holds(atoms: List[MarkerAtom], value: str) -> bool:
+    return all(_compare(value, op, v, var in VERSION_VARIABLES) for var, op, v in atoms)
+
+
+def _merge(a: Condition, b: Condition) -> Optional[Condition]:
+    """
+    When a and b differ only in atoms on one variable, and a or b is the same
+    as one of those atoms (or always true), returns the single condition that
+    is a or b.
+    """
+    da = [x for x in a if x not in b]
+    db = [x for x in b if x not in a]
+    variables = {x[0] for x in da + db}
+    if len(variables) != 1:
+        return None
+    common = tuple(x for x in a if x in b)
+    values = _candidates(variables.pop(), da + db)
+    either = {v: _holds(da, v) or _holds(db, v) for v in values}
+    if all(either.values()):
+        return common
+    for atom in da + db:
+        if all(either[v] == _holds([atom], v) for v in values):
+            return common + (atom,)
+    return None
+
+
+def _consensus(a: Condition, b: Condition) -> Optional[Condition]:
+    opposing = [x for x in a if invert(x) in b]
+    if len(opposing) != 1:
+        return None
+    return conjoin(
+        tuple(x for x in a if x != opposing[0]),
+        tuple(x for x in b if x != invert(opposing[0])),
+    )
+
+
+def simplify(x: Dnf) -> Dnf:
+    """
+    Returns a shorter equivalent of x, so that conditions from each branch of
+    an if/elif/else chain come out as just TRUE.
+    """
+    terms = list(_absorb(list(x)))
+    changed = True
+    while changed:
+        changed = False
+        for a, b in itertools.combinations(terms, 2):
+            new = _merge(a, b) or _consensus(a, b)
+            if new is not None and not any(set(t) <= set(new) for t in terms):
+                terms = list(_absorb(terms + [new]))
+                changed = True
+                break
+
+    # Consensus leaves terms around that the others cover.
+    for t in list(terms):
+        rest = tuple(r for r in terms if r != t)
+        if rest and not and_((t,), not_(rest)):
+            terms = list(rest)
+    return tuple(terms)
+
+
+def to_marker(cond: Condition) -> str:
+    return " and ".join(f'{var} {op} "{value}"' for var, op, value in cond)
+
+
+def dnf_to_marker(x: Dnf) -> str:
+    if len(x) == 1:
+        return to_marker(x[0])
+    return " or ".join(f"({to_marker(c)})" if len(c) > 1 else to_marker(c) for c in x)
+
+
+def _walk(value: Any, cond: Condition) -> Iterator[Tuple[Any, Condition]]:
+    if isinstance(value, Sometimes):
+        for c, v in value.options:
+            both = conjoin(cond, c)
+            if both is not None:
+                yield from _walk(v, both)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            yield from _walk(v, cond)
+    else:
+        yield value, cond
+
+
+def _add_marker(req: str, marker: str) -> str:
+    name, sep, existing = req.partition(";")
+    if sep and existing.strip():
+        return f"{name.rstrip()}; ({existing.strip()}) and ({marker})"
+    return f"{name.rstrip()}; {marker}"
+
+
+def flatten_requirements(value: Any) -> Union[List[str], TooComplicated]:
+    """
+    Turns a list of requirements that may contain (or be) Sometimes into plain
+    PEP 508 strings, with markers for the conditions.
+
+    A requirement that's there under every condition doesn't get a marker.
+    """
+    conds: Dict[str, List[Condition]] = {}
+    for item, cond in _walk(value, ()):
+        if isinstance(item, TooComplicated):
+            return item
+        if not isinstance(item, str):
+            return TooComplicated(f"requirement is {type(item).__name__}")
+        conds.setdefault(item, [])
+        if cond not in conds[item]:
+            conds[item].append(cond)
+
+    result = []
+    for req, cs in conds.items():
+        try:
+            dnf = simplify(tuple(cs))
+        except ValueError:
+            return TooComplicated("conditions are too complicated")
+        result.append(req if dnf == TRUE else _add_marker(req, dnf_to_marker(dnf)))
+    return result
+
+
+def flatten_extras(value: Any) -> Union[Dict[str, List[str]], TooComplicated]:
+    """
+    Like flatten_requirements, for an extras_require dict (which may itself be,
+    or have values that are, Sometimes).
+    """
+    by_extra: Dict[str, List[Tuple[Condition, Any]]] = {}
+    for item, cond in _walk(value, ()):
+        if isinstance(item, TooComplicated):
+            return item
+        if not isinstance(item, dict):
+            return TooComplicated(f"extras_require is {type(item).__name__}")
+        for k, v in item.items():
+            by_extra.setdefault(k, []).append((cond, v))
+
+    result: Dict[str, List[str]] = {}
+    for k, options in by_extra.items():
+        reqs = flatten_requirements(Sometimes(options))
+        if isinstance(reqs, TooComplicated):
+            return reqs
+        result[k] = reqs
+    return result
@@ -1,54 +1,274 @@
+import os
+import posixpath
+import re
 from pathlib import Path
-from typing import Sequence
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
 
 import tomlkit
 
-from .types import BaseReader, Distribution
+from .pep621 import FIELDS, Pep621Reader, README_TYPES
+from .setuptools.directives import resolve_directives
+from .types import Confidence, Distribution, ProjectPath, TooComplicated
 
+# How far up from Cargo.toml to look for the workspace it's in.
+MAX_WORKSPACE_DEPTH = 8
 
-class MaturinReader(BaseReader):
-    def __init__(self, path: Path):
+# Cargo's "1.0.0-alpha.1" is "1.0.0a1" to python.
+PRERELEASE_RE = re.compile(r"(\d+(?:\.\d+)*)-(alpha|beta|rc|a|b)\.?(\d+)")
+PRERELEASES = {"alpha": "a", "beta": "b", "rc": "rc", "a": "a", "b": "b"}
+
+# [package.metadata.maturin] key -> ([project] key, Distribution field)
+LEGACY_FIELDS = {
+    "requires-python": ("requires-python", "requires_python"),
+    "classifier": ("classifiers", "classifiers"),
+    "classifiers": ("classifiers", "classifiers"),
+    "requires-dist": ("dependencies", "requires_dist"),
+    "provides-extra": ("optional-dependencies", "provides_extras"),
+}
+
+
+def cargo_version(version: str) -> str:
+    """
+    Returns the PEP 440 spelling of a Cargo (semver) version, like maturin
+    uses.
+    """
+    match = PRERELEASE_RE.fullmatch(version)
+    if match is None:
+        return version
+    release, kind, number = match.groups()
+    return f"{release}{PRERELEASES[kind]}{number}"
+
+
+class MaturinReader(Pep621Reader):
+    """
+    Reads projects using maturin, where metadata that isn't in `[project]`
+    comes from Cargo.toml (and the workspace it inherits from).  The extension
+    module is built by cargo, so only the python sources are in the source
+    mapping.
+    """
+
+    def __init__(self, path: ProjectPath):
         self.path = path
 
+    def _config(self) -> Mapping[str, Any]:
+        """
+        Returns `[tool.maturin]`, over the older `[package.metadata.maturin]`.
+        """
+        tool = self._pyproject().get("tool", {}).get("maturin", {})
+        package = self._cargo(tool).get("package", {})
+        legacy = package.get("metadata", {}).get("maturin", {})
+        return {**legacy, **tool}
+
+    def _pyproject(self) -> Mapping[str, Any]:
+        pyproject = self.path / "pyproject.toml"
+        doc: Mapping[str, Any] = tomlkit.parse(pyproject.read_text())
+        return doc
+
+    def _manifest(self, tool: Mapping[str, Any]) -> str:
+        return posixpath.normpath(str(tool.get("manifest-path", "Cargo.toml")))
+
+    def _cargo(self, tool: Mapping[str, Any]) -> Mapping[str, Any]:
+        manifest = self.path / self._manifest(tool)
+        if not manifest.is_file():
+            return {}
+        doc: Mapping[str, Any] = tomlkit.parse(manifest.read_text())
+        return doc
+
     def get_requires_for_build_sdist(self) -> Sequence[str]:
-        return []  # TODO
+        return ()
 
     def get_requires_for_build_wheel(self) -> Sequence[str]:
-        return []  # TODO
+        # maturin runs cffi itself to generate the bindings
+        if self._config().get("bindings") == "cffi":
+            return ("cffi",)
+        return ()
 
     def get_metadata(self) -> Distribution:
-        pyproject = self.path / "pyproject.toml"
-        doc = tomlkit.parse(pyproject.read_text())
-
-        d = Distribution()
-        d.metadata_version = "2.1"
-
-        cargo = self.path / "Cargo.toml"
-        doc = tomlkit.parse(cargo.read_text())
-        package = doc.get("package", {})
-        for k, v in package.items():
-            if k == "name":
-                d.name = v
-            elif k == "version":
-                d.version = v
-            elif k == "license":
-                d.license = v
-            elif k == "description":
-                d.summary = v
-            # authors ["foo <foo@foo.com>"]
-            # repository
-            # homepage
-            # readme (filename)
-
-        maturin = package.get("metadata", {}).get("maturin", {})
-        for k, v in maturin.items():
-            if k == "requires-python":
-                d.requires_python = v
-            elif k == "classifier":
-                d.classifiers = v
-            elif k == "requires-dist":
-                d.requires_dist = v
-            # Many others, see https://docs.rs/maturin/0.8.3/maturin/struct.Metadata21.html
-            # but these do not seem to be that popular.
+        doc = self._pyproject()
+        tool = doc.get("tool", {}).get("maturin", {})
+        cargo = self._cargo(tool)
+        config = self._config()
+        package, workspace = self._inherit(cargo, self._manifest(tool))
 
+        project = doc.get("project", {})
+        if project:
+            d = self.get_pep621_metadata()
+        else:
+            d = Distribution()
+            d.metadata_version = "2.1"
+
+        # Cargo.toml fills in whatever [project] doesn't say.
+        confidence = dict(d.confidence)
+        for key, values in self._from_cargo(package, self._manifest(tool)).items():
+            if key in project:
+                continue
+            for k, v in values.items():
+                setattr(d, k, v)
+            confidence.pop(FIELDS.get(key, key.replace("-", "_")), None)
+        d.confidence = confidence
+
+        # The older place for python-only metadata, which [project] overrides
+        legacy = package.get("metadata", {}).get("maturin", {})
+        for k, v in legacy.items():
+            if k in LEGACY_FIELDS and LEGACY_FIELDS[k][0] not in project:
+                setattr(d, LEGACY_FIELDS[k][1], v)
+        # Many others, see https://docs.rs/maturin/0.8.3/maturin/struct.Metadata21.html
+        # but these do not seem to be that popular.
+
+        python_source = posixpath.normpath(config.get("python-source", "."))
+        module_name = config.get("module-name") or cargo.get("lib", {}).get(
+            "name", d.name or ""
+        )
+        top = str(module_name).replace("-", "_").split(".")[0]
+        layout: Dict[str, str] = {}
+        if top and (self.path / python_source / top).is_dir():
+            # A mixed rust/python project
+            layout[top] = posixpath.join(python_source, top)
+        for p in config.get("python-packages", ()):
+            layout[p] = posixpath.join(python_source, p)
+
+        self._set_layout(d, layout)
+        if "include" in config or "exclude" in config:
+            d.confidence = {
+                **d.confidence,
+                "packages_dict": Confidence.UNKNOWN,
+                "source_mapping": Confidence.UNKNOWN,
+            }
+        # Changes to these show up in the metadata too
+        input_files = list(d.input_files)
+        for f in (self._manifest(tool), workspace):
+            if f is not None and f != "Cargo.toml" and f not in input_files:
+                input_files.append(f)
+        d.input_files = tuple(input_files)
+        resolve_directives(self.path, d)
         return d
+
+    def _inherit(
+        self, cargo: Mapping[str, Any], manifest: str
+    ) -> Tuple[Dict[str, Any], Optional[str]]:
+        """
+        Returns `[package]` with `field.workspace = true` replaced by the
+        workspace's value, and the path of the workspace's Cargo.toml (relative
+        to the project) if it was read.
+        """
+        package = dict(cargo.get("package", {}))
+        inherited = [
+            k
+            for k, v in package.items()
+            if isinstance(v, Mapping) and v.get("workspace") is True
+        ]
+        if not inherited:
+            return package, None
+
+        found = self._workspace(cargo, manifest, package.get("workspace"))
+        path, workspace = found if found is not None else (None, None)
+        for k in inherited:
+            if workspace is None or k not in workspace:
+                package[k] = TooComplicated(f"{k} is inherited from a workspace")
+            elif k in ("readme", "license-file"):
+                # These are relative to the workspace, outside the project
+                package[k] = TooComplicated(f"{k} is relative to the workspace")
+            else:
+                package[k] = workspace[k]
+        return package, path
+
+    def _workspace(
+        self, cargo: Mapping[str, Any], manifest: str, explicit: Optional[str]
+    ) -> Optional[Tuple[str, Mapping[str, Any]]]:
+        """
+        Returns the path of the Cargo.toml that this one is a member of, like
+        cargo finds it, and its `[workspace.package]`.
+        """
+        if "workspace" in cargo:
+            return manifest, dict(cargo["workspace"].get("package", {}))
+
+        here = self.path / posixpath.dirname(manifest)
+        if isinstance(here, Path):
+            here = here.resolve()
+        if explicit is not None:
+            candidates = [here / explicit]
+        else:
+            candidates = []
+            for _ in range(MAX_WORKSPACE_DEPTH):
+                if here.parent == here:
+                    break
+                here = here.parent
+                candidates.append(here)
+
+        for c in candidates:
+            path = c / "Cargo.toml"
+            if path.is_file():
+                doc = tomlkit.parse(path.read_text())
+                if "workspace" in doc:
+                    package = dict(doc["workspace"].get("package", {}))
+                    return self._relative(path), package
+        return None
+
+    def _relative(self, path: ProjectPath) -> str:
+        """
+        Returns path relative to the project, which for a workspace is outside
+        of it (like "../Cargo.toml").
+        """
+        if isinstance(path, Path):
+            assert isinstance(self.path, Path)
+            return Path(os.path.relpath(path, self.path.resolve())).as_posix()
+        return posixpath.relpath(path.as_posix(), self.path.as_posix())
+
+    def _from_cargo(
+        self, package: Mapping[str, Any], manifest: str
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns the metadata in `[package]`, as [project] key -> Distribution
+        fields, the same way maturin translates it.
+        """
+        fields: Dict[str, Dict[str, Any]] = {}
+        if "name" in package:
+            fields["name"] = {"name": package["name"]}
+        if "version" in package:
+            version = package["version"]
+            if isinstance(version, str):
+                version = cargo_version(version)
+            fields["version"] = {"version": version}
+        if "description" in package:
+            fields["description"] = {"summary": package["description"]}
+        if "license" in package:
+            fields["license"] = {"license": package["license"]}
+        if "keywords" in package:
+            fields["keywords"] = {"keywords": list(package["keywords"])}
+        if "authors" in package:
+            authors = package["authors"]
+            if isinstance(authors, TooComplicated):
+                fields["authors"] = {"author": authors, "author_email": authors}
+            else:
+                names = [a.partition("<")[0].strip() for a in authors]
+                emails = [a for a in authors if "<" in a]
+                fields["authors"] = {
+                    "author": ", ".join(names) or None,
+                    "author_email": ", ".join(emails) or None,
+                }
+        if "readme" in package:
+            readme = package["readme"]
+            if isinstance(readme, str):
+                readme = posixpath.join(posixpath.dirname(manifest), readme)
+                fields["readme"] = {
+                    "description": f"file: {readme}",
+                    "description_content_type": README_TYPES.get(
+                        posixpath.splitext(readme)[1].lower(), "text/plain"
+                    ),
+                }
+            elif readme is not False:
+                fields["readme"] = {"description": readme}
+
+        urls: List[str] = []
+        for key, label in (
+            ("repository", "Source Code"),
+            ("documentation", "Documentation"),
+        ):
+            if isinstance(package.get(key), str):
+                urls.append(f"{label}={package[key]}")
+        if urls or "homepage" in package:
+            fields["urls"] = {
+                "project_urls": urls,
+                "home_page": package.get("homepage"),
+            }
+        return fields
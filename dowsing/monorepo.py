@@ -0,0 +1,126 @@
+"""
+Finding and analyzing many projects that live under one root.
+"""
+
+import json
+import os
+import sys
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Collection, Dict, List, Optional, Union
+
+from . import pep517
+from .types import Distribution
+
+# Any one of these makes a directory a project, the same as pip would see it.
+PROJECT_FILES = ("pyproject.toml", "setup.py", "setup.cfg")
+
+# Directories that can be huge and never contain projects we care about.  Names
+# starting with "." (.git, .tox, .venv, ...) are always skipped too.
+PRUNE_DIRS = frozenset({"__pycache__", "node_modules", "site-packages"})
+
+
+def discover(root: Path) -> List[str]:
+    """
+    Returns the directories under root that are projects, as sorted posix
+    paths relative to root ("." for root itself).
+
+    This is a single walk; virtualenvs and the directories in PRUNE_DIRS are not
+    descended into.
+    """
+    found: List[str] = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        if "pyvenv.cfg" in filenames:
+            dirnames.clear()
+            continue
+        dirnames[:] = [
+            d
+            for d in dirnames
+            if not d.startswith(".")
+            and d not in PRUNE_DIRS
+            and not d.endswith(".egg-info")
+        ]
+        if any(f in filenames for f in PROJECT_FILES):
+            found.append(Path(dirpath).relative_to(root).as_posix())
+    return sorted(found)
+
+
+def _nested(project: str, projects: Collection[str]) -> List[str]:
+    """
+    Returns the projects that live inside `project`, relative to it.
+    """
+    if project == ".":
+        return [p for p in projects if p != "."]
+    prefix = project + "/"
+    return [p[len(prefix) :] for p in projects if p.startswith(prefix)]
+
+
+def _exclude_nested(dist: Distribution, nested: List[str]) -> None:
+    if not dist.source_mapping or not nested:
+        return
+    dist.source_mapping = {
+        k: v
+        for k, v in dist.source_mapping.items()
+        if not any(v == n or v.startswith(n + "/") for n in nested)
+    }
+
+
+def get_metadata_all(
+    root: Path,
+    only: Optional[Collection[str]] = None,
+    max_workers: Optional[int] = None,
+    projects: Optional[List[str]] = None,
+) -> Dict[str, Union[Distribution, Exception]]:
+    """
+    Runs `pep517.get_metadata` on every project under root, in parallel.
+
+    Results are keyed by the same relative paths as `discover` returns; if a
+    project can't be analyzed, its value is the exception instead.  Files that
+    belong to a nested project are removed from the parent's source_mapping.
+
+    If `only` is given, just those projects are analyzed (nested projects are
+    still found by walking everything).  `max_workers=1` runs in-process.  If
+    you've already called `discover`, pass its result as `projects`.
+    """
+    if projects is None:
+        projects = discover(root)
+    todo = [p for p in projects if only is None or p in only]
+
+    results: Dict[str, Union[Distribution, Exception]] = {}
+    if max_workers == 1:
+        for p in todo:
+            try:
+                results[p] = pep517.get_metadata(root / p)
+            except Exception as e:
+                results[p] = e
+    else:
+        # Parsing is CPU-bound Python, so threads wouldn't help much.
+        with ProcessPoolExecutor(max_workers) as executor:
+            futures: Dict[str, "Future[Distribution]"] = {
+                p: executor.submit(pep517.get_metadata, root / p) for p in todo
+            }
+            for p, fut in futures.items():
+                try:
+                    results[p] = fut.result()
+                except Exception as e:
+                    results[p] = e
+
+    for p, result in results.items():
+        if isinstance(result, Distribution):
+            _exclude_nested(result, _nested(p, projects))
+
+    return results
+
+
+def main(root: Path) -> None:
+    d: Dict[str, Any] = {}
+    for k, v in get_metadata_all(root).items():
+        if isinstance(v, Exception):
+            d[k] = {"error": repr(v)}
+        else:
+            d[k] = {"get_metadata": v.asdict(), "source_mapping": v.source_mapping}
+    print(json.dumps(d, default=pep517._default))
+
+
+if __name__ == "__main__":
+    main(Path(sys.argv[1]))
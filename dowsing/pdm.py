@@ -0,0 +1,112 @@
+import posixpath
+from typing import Any, Dict, Mapping, Sequence
+
+import tomlkit
+
+from .discovery import find_packages
+from .pep621 import Pep621Reader, read_version
+from .scm import get_version
+from .types import Confidence, Distribution, ProjectPath, TooComplicated
+
+GLOB_CHARS = frozenset("*?[")
+
+
+class PdmReader(Pep621Reader):
+    """
+    Reads projects using pdm-backend, or the older pdm-pep517 (whose options
+    are directly in `[tool.pdm]` rather than `[tool.pdm.build]`).
+    """
+
+    def __init__(self, path: ProjectPath):
+        self.path = path
+
+    def get_requires_for_build_sdist(self) -> Sequence[str]:
+        return ()
+
+    def get_requires_for_build_wheel(self) -> Sequence[str]:
+        return ()
+
+    def get_metadata(self) -> Distribution:
+        pyproject = self.path / "pyproject.toml"
+        doc = tomlkit.parse(pyproject.read_text())
+        pdm = doc.get("tool", {}).get("pdm", {})
+        build = {**pdm, **pdm.get("build", {})}
+
+        d = self.get_pep621_metadata()
+        if d.get_confidence("version") == Confidence.UNKNOWN:
+            self._set_version(d, self._version(d, pdm.get("version", {})))
+
+        if "package-dir" in build:
+            package_dir = str(build["package-dir"])
+        elif (self.path / "src").is_dir():
+            package_dir = "src"
+        else:
+            package_dir = "."
+
+        layout: Dict[str, str] = {}
+        unknown = bool(build.get("excludes"))
+        includes = build.get("includes", ())
+        if includes:
+            for include in includes:
+                include = include.rstrip("/")
+                if GLOB_CHARS & set(include):
+                    unknown = True
+                    continue
+                installed = include
+                if package_dir != "." and include.startswith(package_dir + "/"):
+                    installed = include[len(package_dir) + 1 :]
+                layout[installed] = include
+        else:
+            layout = self._default_layout(package_dir)
+
+        self._set_layout(d, layout)
+        if unknown or not layout:
+            d.confidence = {
+                **d.confidence,
+                "packages_dict": Confidence.UNKNOWN,
+                "source_mapping": Confidence.UNKNOWN,
+            }
+        return d
+
+    def _default_layout(self, package_dir: str) -> Dict[str, str]:
+        """
+        The top-level packages in package_dir, or if there aren't any, the
+        modules.
+        """
+        where = self.path / package_dir
+        layout = {
+            p: posixpath.normpath(posixpath.join(package_dir, p))
+            for p in find_packages(where)
+            if "." not in p
+        }
+        if not layout and where.is_dir():
+            for child in where.iterdir():
+                if (
+                    child.name.endswith(".py")
+                    and child.name != "setup.py"
+                    and child.is_file()
+                ):
+                    layout[child.name] = posixpath.normpath(
+                        posixpath.join(package_dir, child.name)
+                    )
+        return layout
+
+    def _version(self, d: Distribution, version: Mapping[str, Any]) -> Any:
+        source = version.get("source")
+        if source is None:
+            # pdm-pep517's older spelling
+            source = "scm" if version.get("use_scm") else "file"
+        if source == "file" and "path" in version:
+            d.input_files = (version["path"],)
+            return read_version(self.path, version["path"])
+        elif source == "scm":
+            config = {}
+            if "fallback_version" in version:
+                config["fallback_version"] = version["fallback_version"]
+            # pdm's own scm support has the same default scheme as
+            # setuptools_scm, except that it's configured by version_format.
+            if "version_format" in version or "tag_regex" in version:
+                return TooComplicated("custom scm version formats aren't supported")
+            d.scm_config = config
+            return get_version(self.path, config)
+        return TooComplicated(f"version source {source!r} isn't supported")
@@ -2,11 +2,13 @@ import importlib
 import json
 import sys
 from pathlib import Path
-from typing import Any, Dict, List, Tuple, Type
+from typing import Any, Dict, List, Optional, Tuple, Type
 
 import tomlkit
 
-from .types import BaseReader, Distribution
+from .in_tree import find_backend_module, inspect_backend, InTreeReader
+from .tree import GitTree
+from .types import BaseReader, Distribution, ProjectPath, TooComplicated
 
 KNOWN_BACKENDS: Dict[str, str] = {
     "setuptools.build_meta:__legacy__": "dowsing.setuptools:SetuptoolsReader",
@@ -14,17 +16,25 @@ KNOWN_BACKENDS: Dict[str, str] = {
     "jupyter_packaging.build_api": "dowsing.setuptools:SetuptoolsReader",
     "flit_core.buildapi": "dowsing.flit:FlitReader",
     "flit.buildapi": "dowsing.flit:FlitReader",
+    "hatchling.build": "dowsing.hatch:HatchReader",
     "maturin": "dowsing.maturin:MaturinReader",
+    "pdm.backend": "dowsing.pdm:PdmReader",
+    "pdm.pep517.api": "dowsing.pdm:PdmReader",
     "poetry.core.masonry.api": "dowsing.poetry:PoetryReader",
     "poetry.masonry.api": "dowsing.poetry:PoetryReader",
+    "scikit_build_core.build": "dowsing.scikit_build:ScikitBuildReader",
 }
 
 
-def get_backend(path: Path) -> Tuple[List[str], BaseReader]:
+def get_build_system(path: ProjectPath) -> Tuple[List[str], str, List[str]]:
+    """
+    Returns (requires, build-backend, backend-path) from pyproject.toml, with
+    the same default backend as pip when there isn't one.
+    """
     pyproject = path / "pyproject.toml"
     backend = "setuptools.build_meta:__legacy__"
-    # TODO for setuptools, we should also include requirements
     requires: List[str] = []
+    backend_path: List[str] = []
     if pyproject.exists():
         doc = tomlkit.parse(pyproject.read_text())
         table = doc.get("build-system", {})
@@ -33,58 +43,114 @@ def get_backend(path: Path) -> Tuple[List[str], BaseReader]:
         if "requires" in table:
             requires.extend(table["requires"])
         if "build-backend" in table:
-            backend = table["build-backend"]
-        # TODO backend-path
+            backend = str(table["build-backend"])
+        if "backend-path" in table:
+            backend_path.extend(table["backend-path"])
+    return requires, backend, backend_path
+
 
+def _reader(backend: str) -> Type[BaseReader]:
     try:
-        backend_path = KNOWN_BACKENDS[backend]
+        reader = KNOWN_BACKENDS[backend]
     except KeyError:
         raise Exception(f"Unknown pep517 backend {backend!r}")
 
-    mod, _, x = backend_path.partition(":")
+    mod, _, x = reader.partition(":")
     cls: Type[BaseReader] = getattr(importlib.import_module(mod), x)
+    return cls
+
+
+def get_backend(path: ProjectPath) -> Tuple[List[str], BaseReader]:
+    # TODO for setuptools, we should also include requirements
+    requires, backend, backend_path = get_build_system(path)
 
-    return requires, cls(path)
+    module = find_backend_module(path, backend, backend_path)
+    if module is not None:
+        # In-tree, which takes precedence over anything installed
+        in_tree = inspect_backend(module.read_text(), KNOWN_BACKENDS)
+        if in_tree is None:
+            raise Exception(f"Unknown in-tree pep517 backend {backend!r}")
+        reader = _reader(in_tree.backend)(path)
+        return requires, InTreeReader(reader, in_tree.extra_requires)
 
+    return requires, _reader(backend)(path)
 
-def get_requires_for_build_sdist(path: Path) -> List[str]:
+
+# These take an optional git `rev`, in which case `path` is a git work tree
+# (or a subdirectory of one) and files are read from that revision without
+# checking it out.
+
+
+def get_requires_for_build_sdist(
+    path: ProjectPath, rev: Optional[str] = None
+) -> List[str]:
     # TODO config_settings, env
+    if rev is not None:
+        assert isinstance(path, Path)
+        with GitTree(path, rev) as tree:
+            return get_requires_for_build_sdist(tree.root)
 
     requires, backend = get_backend(path)
 
     return requires + list(backend.get_requires_for_build_sdist())
 
 
-def get_requires_for_build_wheel(path: Path) -> List[str]:
+def get_requires_for_build_wheel(
+    path: ProjectPath, rev: Optional[str] = None
+) -> List[str]:
     # TODO config_settings, env
+    if rev is not None:
+        assert isinstance(path, Path)
+        with GitTree(path, rev) as tree:
+            return get_requires_for_build_wheel(tree.root)
 
     requires, backend = get_backend(path)
     return requires + list(backend.get_requires_for_build_wheel())
 
 
-def get_metadata(path: Path) -> Distribution:
+def get_metadata(path: ProjectPath, rev: Optional[str] = None) -> Distribution:
     # TODO config_settings, env
+    if rev is not None:
+        assert isinstance(path, Path)
+        with GitTree(path, rev) as tree:
+            return get_metadata(tree.root)
 
     _, backend = get_backend(path)
     return backend.get_metadata()
 
 
 def _default(obj: Any) -> Any:
+    if isinstance(obj, TooComplicated):
+        # What this used to be before there was a type for it; see
+        # "confidence" for which fields it affects.
+        return "??"
     if obj.__class__.__name__ == "FindPackages":
-        return f"FindPackages({obj.where!r}, {obj.exclude!r}, {obj.include!r}"
+        namespaces = ", namespaces=True" if obj.namespaces else ""
+        return (
+            f"FindPackages({obj.where!r}, {obj.exclude!r}, {obj.include!r}"
+            f"{namespaces})"
+        )
     raise TypeError(obj)
 
 
-def main(path: Path) -> None:
+def main(path: Path, rev: Optional[str] = None) -> None:
+    if rev is not None:
+        with GitTree(path, rev) as tree:
+            return main_tree(tree.root)
+    main_tree(path)
+
+
+def main_tree(path: ProjectPath) -> None:
     metadata = get_metadata(path)
     d = {
         "get_requires_for_build_sdist": get_requires_for_build_sdist(path),
         "get_requires_for_build_wheel": get_requires_for_build_wheel(path),
         "get_metadata": metadata.asdict(),
         "source_mapping": metadata.source_mapping,
+        "confidence": {k: v.value for k, v in metadata.confidence_map().items()},
     }
     print(json.dumps(d, default=_default))
 
 
 if __name__ == "__main__":
-    main(Path(sys.argv[1]))
+    main(Path(sys.argv[1]), *sys.argv[2:3])
@@ -1,7 +1,47 @@
+import posixpath
+import re
+from typing import Any, Dict, Mapping, Optional
+
 import tomlkit
-from setuptools import find_packages
 
-from .types import BaseReader, Distribution
+from .discovery import find_layout, find_packages
+from .types import BaseReader, Confidence, Distribution, ProjectPath, TooComplicated
+
+# `__version__ = "1.0"` and the like; the same default as hatchling's regex
+# version source.
+VERSION_PATTERN = r"""(?i)^(__version__|VERSION) *= *(['"])v?(?P<version>.+?)\2"""
+
+# [project] keys whose Distribution attribute isn't just the key with
+# underscores.
+FIELDS = {
+    "dependencies": "requires_dist",
+    "description": "summary",
+    "readme": "description",
+    "optional-dependencies": "extras_require",
+    "scripts": "entry_points",
+    "gui-scripts": "entry_points",
+    "entry-points": "entry_points",
+    "urls": "project_urls",
+}
+SCRIPT_GROUPS = {"scripts": "console_scripts", "gui-scripts": "gui_scripts"}
+README_TYPES = {".md": "text/markdown", ".rst": "text/x-rst"}
+
+
+def read_version(
+    path: ProjectPath, filename: str, pattern: str = VERSION_PATTERN
+) -> Optional[str]:
+    """
+    Returns the version assigned in a python (or other text) file, using a
+    regex with a "version" (or "value") group, or None.
+    """
+    f = path / filename
+    if not f.is_file():
+        return None
+    match = re.search(pattern, f.read_text(), re.MULTILINE)
+    if match is None:
+        return None
+    groups = match.groupdict()
+    return groups.get("version") or groups.get("value")
 
 
 class Pep621Reader(BaseReader):
@@ -18,18 +58,19 @@ class Pep621Reader(BaseReader):
         d.packages_dict = {}
 
         assert isinstance(d.project_urls, list)
+        confidence: Dict[str, Confidence] = {}
 
         table = doc.get("project", None)
         if table:
+            # Filled in by the backend, which we don't know how to do in general.
+            for k in table.get("dynamic", ()):
+                k2 = FIELDS.get(k, k.replace("-", "_"))
+                if k2 in d:
+                    confidence[k2] = Confidence.UNKNOWN
+
             for k, v in table.items():
                 if k == "name":
-                    if (self.path / f"{v}.py").exists():
-                        d.py_modules = [v]
-                    else:
-                        d.packages = find_packages(
-                            self.path.as_posix(), include=(f"{v}.*")
-                        )
-                        d.packages_dict = {i: i.replace(".", "/") for i in d.packages}
+                    self._guess_layout(d, v)
                 elif k == "license":
                     if isinstance(v, str):
                         pass  # PEP 639 proposes `license = "MIT"` style metadata
@@ -37,17 +78,103 @@ class Pep621Reader(BaseReader):
                         v = v["text"]
                     elif "file" in v:
                         v = f"file: {v['file']}"
+                        confidence["license"] = Confidence.UNKNOWN
                     else:
                         raise ValueError("no known license field values")
-                elif k == "dependencies":
-                    k = "requires_dist"
+                elif k == "readme":
+                    if isinstance(v, str):
+                        v = {"file": v}
+                    if "content-type" in v:
+                        d.description_content_type = v["content-type"]
+                    elif "file" in v:
+                        d.description_content_type = README_TYPES.get(
+                            posixpath.splitext(v["file"])[1].lower(), "text/plain"
+                        )
+                    if "text" in v:
+                        v = v["text"]
+                    else:
+                        # Read lazily, if anyone asks for it
+                        v = f"file: {v['file']}"
+                        confidence["description"] = Confidence.UNKNOWN
                 elif k == "optional-dependencies":
-                    pass
+                    d.extras_require = {x: list(y) for x, y in v.items()}
+                    d.provides_extras = list(v)
+                    continue
+                elif k in ("scripts", "gui-scripts", "entry-points"):
+                    groups = {SCRIPT_GROUPS[k]: v} if k in SCRIPT_GROUPS else v
+                    d.entry_points = {
+                        **d.entry_points,
+                        **{
+                            group: [f"{x} = {y}" for x, y in entries.items()]
+                            for group, entries in groups.items()
+                        },
+                    }
+                    continue
                 elif k == "urls":
                     d.project_urls.extend([f"{x}={y}" for x, y in v.items()])
+                    continue
 
-                k2 = k.replace("-", "_")
+                k2 = FIELDS.get(k, k.replace("-", "_"))
                 if k2 in d:
                     setattr(d, k2, v)
 
+        d.confidence = confidence
         return d
+
+    def _guess_layout(self, d: Distribution, name: str) -> None:
+        """
+        Fills in packages, py_modules and packages_dict for the package or
+        module named like the project, either at the top level or in src.
+        """
+        names = tuple(dict.fromkeys([name, name.replace("-", "_")]))
+        include = names + tuple(f"{n}.*" for n in names)
+        for where in (".", "src"):
+            layout = find_layout(self.path / where, include=include, prefix=where)
+            if layout.packages or layout.py_modules:
+                d.packages = layout.packages
+                d.py_modules = layout.py_modules
+                d.packages_dict = layout.packages_dict
+                if where != ".":
+                    d.package_dir = {"": where}
+                return
+
+    def _set_version(self, d: Distribution, value: Any) -> None:
+        """
+        Fills in a dynamic version that was worked out, where None means it
+        wasn't found.
+        """
+        if value is None:
+            value = TooComplicated("version not found")
+        d.version = value
+        if not isinstance(value, TooComplicated):
+            d.confidence = {k: v for k, v in d.confidence.items() if k != "version"}
+
+    def _set_layout(self, d: Distribution, layout: Mapping[str, str]) -> None:
+        """
+        Fills in packages, py_modules and source_mapping from the top-level
+        paths in the wheel, each mapped to where it is in the project.
+        """
+        d.packages = []
+        d.packages_dict = {}
+        d.py_modules = []
+        modules: Dict[str, str] = {}
+        for installed, source in sorted(layout.items()):
+            installed = posixpath.normpath(installed)
+            source = posixpath.normpath(source)
+            if (self.path / source).is_dir():
+                top = installed.replace("/", ".")
+                d.packages.append(top)
+                d.packages_dict[top] = source
+                for p in find_packages(self.path / source):
+                    d.packages.append(f"{top}.{p}")
+                    d.packages_dict[f"{top}.{p}"] = posixpath.join(
+                        source, p.replace(".", "/")
+                    )
+            elif installed.endswith(".py") and (self.path / source).is_file():
+                d.py_modules.append(installed[: -len(".py")].replace("/", "."))
+                modules[installed] = source
+
+        source_mapping = d._source_mapping(self.path)
+        if source_mapping is not None:
+            source_mapping.update(modules)
+        d.source_mapping = source_mapping
@@ -1,11 +1,15 @@
+import functools
 import posixpath
-from pathlib import Path
-from typing import Sequence
+import re
+from typing import Any, Dict, List, Mapping, Sequence, Tuple, Union
 
 import tomlkit
-from setuptools import find_packages
+from packaging.specifiers import InvalidSpecifier, SpecifierSet
+from packaging.version import InvalidVersion, Version
 
-from .types import BaseReader, Distribution
+from .discovery import find_packages
+from .markers import dnf_to_marker
+from .types import BaseReader, Condition, Distribution, ProjectPath, TooComplicated
 
 METADATA_MAPPING = {
     "name": "name",
@@ -19,16 +23,247 @@ METADATA_MAPPING = {
     "classifiers": "classifiers",
 }
 
+# `^1.2`, `>= 1.2`, `1.2.*` and so on; operators can be followed by spaces, and
+# constraints are separated by commas or spaces.
+CONSTRAINT_RE = re.compile(r"(\^|~=|~|===|==|!=|<=|>=|<|>|=)?(.+)")
+OPERATOR_SPACE_RE = re.compile(r"(\^|~=|~|===|==|!=|<=|>=|<|>|=)\s+")
+VERSION_RE = re.compile(r"v?(\d+(?:\.\d+)*)(\.\*|[-_.+!a-zA-Z0-9]*)")
+
+# Python releases, which is what a union of python constraints gets spelled
+# out against (the same way poetry writes Requires-Python).
+PYTHON_VERSIONS = [f"2.{y}" for y in range(8)] + [f"3.{y}" for y in range(21)]
+
+# The same constraints show up in many projects, so these are memoized.
+CACHE_SIZE = 4096
+
+Specifier = Tuple[str, str]
+
+
+def _bump(version: str, index: int) -> str:
+    """
+    Returns the upper bound for ^ and ~, which increments one component of the
+    release and zeroes the rest.
+    """
+    parts = version.split(".")
+    index = min(index, len(parts) - 1)
+    bumped = parts[:index] + [str(int(parts[index]) + 1)]
+    return ".".join(bumped + ["0"] * (len(parts) - index - 1))
+
+
+def _specifiers(constraint: str) -> Union[List[Specifier], TooComplicated]:
+    """
+    Turns one side of a `||` into PEP 440 (operator, version) pairs; an empty
+    list allows anything.
+    """
+    result: List[Specifier] = []
+    for token in re.split(r"[\s,]+", OPERATOR_SPACE_RE.sub(r"\1", constraint)):
+        if not token or token in ("*", "x", "X"):
+            continue
+        match = CONSTRAINT_RE.fullmatch(token)
+        assert match is not None
+        op, version = match.group(1) or "", match.group(2)
+        parsed = VERSION_RE.fullmatch(version)
+        if parsed is None:
+            return TooComplicated(f"can't parse constraint {token!r}")
+        release, suffix = parsed.groups()
+        version = release + suffix
+        if op in ("^", "~"):
+            if suffix == ".*":
+                return TooComplicated(f"can't parse constraint {token!r}")
+            if op == "^":
+                nonzero = [i for i, p in enumerate(release.split(".")) if int(p)]
+                index = nonzero[0] if nonzero else len(release.split(".")) - 1
+            else:
+                index = 1 if "." in release else 0
+            result.append((">=", version))
+            result.append(("<", _bump(release, index)))
+        elif op in ("", "="):
+            result.append(("==", version))
+        else:
+            result.append((op, version))
+    return result
+
+
+def _union(constraint: str) -> Union[List[List[Specifier]], TooComplicated]:
+    pieces = []
+    for piece in constraint.split("||"):
+        specifiers = _specifiers(piece)
+        if isinstance(specifiers, TooComplicated):
+            return specifiers
+        pieces.append(specifiers)
+    return pieces
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def translate_constraint(constraint: str) -> Union[str, TooComplicated]:
+    """
+    Returns the PEP 440 specifier for a poetry version constraint, like
+    ">=1.2,<2.0" for "^1.2" (or "" for "*").
+    """
+    pieces = _union(constraint)
+    if isinstance(pieces, TooComplicated):
+        return pieces
+    if len(pieces) > 1:
+        # Requirements can't say "or"; poetry-core writes these unchanged,
+        # which isn't valid PEP 508 either.
+        return TooComplicated(f"{constraint!r} is a union")
+    return _join(pieces[0])
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def translate_python(constraint: str) -> Union[str, TooComplicated]:
+    """
+    Returns Requires-Python for poetry's `python` dependency.  Unions become a
+    range with whole releases excluded, like ">=2.7,!=3.0.*,<4.0", when that
+    allows exactly the same versions.
+    """
+    pieces = _union(constraint)
+    if isinstance(pieces, TooComplicated):
+        return pieces
+    if len(pieces) == 1:
+        return _join(pieces[0])
+    if any(not p for p in pieces):
+        return ""
+    # "2.7.*" has the bounds of ">=2.7,<2.8"
+    pieces = [
+        [
+            x
+            for o, v in p
+            for x in (
+                [(">=", v[:-2]), ("<", _bump(v[:-2], v.count(".") - 1))]
+                if o == "==" and v.endswith(".*")
+                else [(o, v)]
+            )
+        ]
+        for p in pieces
+    ]
+
+    try:
+        sets = [SpecifierSet(_join(p)) for p in pieces]
+        lower = [(o, v) for p in pieces for o, v in p if o in (">=", ">")]
+        upper = [(o, v) for p in pieces for o, v in p if o in ("<", "<=")]
+        # Only bounds that every piece has hold for the union.
+        low: List[Specifier] = []
+        high: List[Specifier] = []
+        if len(lower) == len(pieces):
+            low.append(min(lower, key=lambda x: Version(x[1])))
+        if len(upper) == len(pieces):
+            high.append(max(upper, key=lambda x: Version(x[1])))
+        outer = SpecifierSet(_join(low + high))
+    except (InvalidSpecifier, InvalidVersion):
+        return TooComplicated(f"can't parse {constraint!r}")
+
+    def allowed(version: str) -> bool:
+        return any(version in s for s in sets)
+
+    excluded = [
+        ("!=", f"{v}.*")
+        for v in PYTHON_VERSIONS
+        if f"{v}.0" in outer and not allowed(f"{v}.0") and not allowed(f"{v}.99")
+    ]
+    result = _join(low + excluded + high)
+    candidate = SpecifierSet(result)
+    for v in PYTHON_VERSIONS:
+        for x in (f"{v}.0", f"{v}.1", f"{v}.99"):
+            if (x in candidate) != allowed(x):
+                return TooComplicated(f"{constraint!r} isn't whole releases")
+    return result
+
+
+def _join(specifiers: Sequence[Specifier]) -> str:
+    return ",".join(f"{op}{version}" for op, version in specifiers)
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def translate_python_marker(constraint: str) -> Union[str, TooComplicated]:
+    """
+    Returns the marker for a dependency's `python` constraint, like
+    'python_version >= "3.6"' for "^3.6" (or "" for "*").
+    """
+    pieces = _union(constraint)
+    if isinstance(pieces, TooComplicated):
+        return pieces
+    conditions: List[Condition] = []
+    for p in pieces:
+        if not p:
+            return ""
+        conditions.append(tuple((_python_variable(v), o, v) for o, v in p))
+    return dnf_to_marker(tuple(conditions))
+
+
+def _python_variable(version: str) -> str:
+    # The same choice poetry makes
+    if version.count(".") >= 2 and not version.endswith(".*"):
+        return "python_full_version"
+    return "python_version"
+
+
+def translate_dependency(name: str, value: Any) -> List[Union[str, TooComplicated]]:
+    """
+    Returns PEP 508 requirements for one entry in
+    `[tool.poetry.dependencies]`, which can be a constraint, a table, or a list
+    of tables with different markers.
+    """
+    if isinstance(value, list):
+        return [r for v in value for r in translate_dependency(name, v)]
+    if not isinstance(value, Mapping):
+        value = {"version": value}
+
+    req = name
+    if value.get("extras"):
+        req += f"[{','.join(value['extras'])}]"
+    if "git" in value:
+        req += f" @ git+{value['git']}"
+        for ref in ("rev", "tag", "branch"):
+            if ref in value:
+                req += f"@{value[ref]}"
+                break
+        if "subdirectory" in value:
+            req += f"#subdirectory={value['subdirectory']}"
+    elif "url" in value:
+        req += f" @ {value['url']}"
+    elif "path" in value:
+        return [TooComplicated(f"{name} is a path dependency")]
+    else:
+        version = translate_constraint(str(value.get("version", "*")))
+        if isinstance(version, TooComplicated):
+            return [version]
+        req += version
+
+    markers = []
+    if "python" in value:
+        python = translate_python_marker(str(value["python"]))
+        if isinstance(python, TooComplicated):
+            return [python]
+        if python:
+            markers.append(python)
+    if "platform" in value:
+        markers.append(f'sys_platform == "{value["platform"]}"')
+    if "markers" in value:
+        markers.append(str(value["markers"]))
+    if len(markers) > 1:
+        markers = [f"({m})" if " or " in m else m for m in markers]
+    if markers:
+        req += "; " + " and ".join(markers)
+    return [req]
+
+
+def _normalize(name: str) -> str:
+    return re.sub(r"[-_.]+", "-", name).lower()
+
 
 class PoetryReader(BaseReader):
-    def __init__(self, path: Path):
+    def __init__(self, path: ProjectPath):
         self.path = path
 
+    # poetry-core doesn't ask for anything beyond `[build-system] requires`,
+    # which dowsing.pep517 already reports.
+
     def get_requires_for_build_sdist(self) -> Sequence[str]:
-        return ()  # TODO
+        return ()
 
     def get_requires_for_build_wheel(self) -> Sequence[str]:
-        return ()  # TODO
+        return ()
 
     def get_metadata(self) -> Distribution:
         pyproject = self.path / "pyproject.toml"
@@ -53,7 +288,7 @@ class PoetryReader(BaseReader):
                 # poetry itself but include can be a glob and there are excludes
                 for x in v:
                     f = x.get("from", ".")
-                    for p in find_packages((self.path / f).as_posix()):
+                    for p in find_packages(self.path / f):
                         if p == x["include"] or p.startswith(f"{x['include']}."):
                             d.packages_dict[p] = posixpath.normpath(
                                 posixpath.join(f, p.replace(".", "/"))
@@ -63,15 +298,33 @@ class PoetryReader(BaseReader):
                 setattr(d, METADATA_MAPPING[k], v)
 
         if not d.packages:
-            for p in find_packages(self.path.as_posix()):
+            for p in find_packages(self.path):
                 d.packages_dict[p] = p.replace(".", "/")
                 d.packages.append(p)
 
+        # Optional dependencies are only installed through an extra
+        extras = poetry.get("extras", {})
+        optional: Dict[str, List[str]] = {}
+        for extra, names in extras.items():
+            for n in names:
+                optional.setdefault(_normalize(n), []).append(extra)
+        extras_require: Dict[str, List[Any]] = {extra: [] for extra in extras}
+
         for k, v in poetry.get("dependencies", {}).items():
             if k == "python":
-                pass  # TODO translate to requires_python
-            else:
-                d.requires_dist.append(k)  # TODO something with version
+                d.requires_python = translate_python(str(v))  # type: ignore[assignment]
+                continue
+            for table in v if isinstance(v, list) else [v]:
+                reqs = translate_dependency(k, table)
+                if isinstance(table, Mapping) and table.get("optional"):
+                    for extra in optional.get(_normalize(k), ()):
+                        extras_require[extra].extend(reqs)
+                else:
+                    d.requires_dist.extend(reqs)  # type: ignore[arg-type]
+
+        if extras:
+            d.extras_require = extras_require
+            d.provides_extras = list(extras)
 
         for k, v in poetry.get("urls", {}).items():
             d.project_urls.append(f"{k}={v}")
@@ -0,0 +1,82 @@
+import posixpath
+import re
+from typing import Any, Dict, Mapping, Sequence
+
+import tomlkit
+
+from .pep621 import Pep621Reader, read_version
+from .scm import get_version
+from .types import Confidence, Distribution, ProjectPath, TooComplicated
+
+# What scikit-build-core asks for when they aren't already installed, which is
+# the case in a fresh isolated build.
+DEFAULT_CMAKE = "cmake>=3.15"
+NINJA = 'ninja; sys_platform != "win32"'
+
+
+class ScikitBuildReader(Pep621Reader):
+    """
+    Reads projects using scikit-build-core.  The compiled parts come from
+    CMake, so only the python packages are in the source mapping.
+    """
+
+    def __init__(self, path: ProjectPath):
+        self.path = path
+
+    def _config(self) -> Mapping[str, Any]:
+        pyproject = self.path / "pyproject.toml"
+        doc = tomlkit.parse(pyproject.read_text())
+        config: Mapping[str, Any] = doc.get("tool", {}).get("scikit-build", {})
+        return config
+
+    def get_requires_for_build_sdist(self) -> Sequence[str]:
+        return ()
+
+    def get_requires_for_build_wheel(self) -> Sequence[str]:
+        cmake = self._config().get("cmake", {})
+        version = cmake.get("version", cmake.get("minimum-version"))
+        if version is None:
+            return (DEFAULT_CMAKE, NINJA)
+        if version[:1].isdigit():
+            # minimum-version is a plain version
+            version = f">={version}"
+        return (f"cmake{version}", NINJA)
+
+    def get_metadata(self) -> Distribution:
+        config = self._config()
+        d = self.get_pep621_metadata()
+        if d.get_confidence("version") == Confidence.UNKNOWN:
+            version = config.get("metadata", {}).get("version", {})
+            self._set_version(d, self._version(d, version))
+
+        packages = config.get("wheel", {}).get("packages")
+        layout: Dict[str, str] = {}
+        if isinstance(packages, Mapping):
+            layout = {k: v for k, v in packages.items()}
+        elif packages is not None:
+            for p in packages:
+                layout[posixpath.basename(p.rstrip("/"))] = p
+        else:
+            name = re.sub(r"[-_.]+", "_", d.name or "").lower()
+            for candidate in (f"src/{name}", f"python/{name}", name):
+                if (self.path / candidate).is_dir():
+                    layout[name] = candidate
+                    break
+
+        self._set_layout(d, layout)
+        return d
+
+    def _version(self, d: Distribution, version: Mapping[str, Any]) -> Any:
+        provider = version.get("provider")
+        if provider == "scikit_build_core.metadata.regex" and "input" in version:
+            d.input_files = (version["input"],)
+            regex = version.get("regex")
+            if isinstance(regex, str):
+                return read_version(self.path, version["input"], regex)
+            return read_version(self.path, version["input"])
+        elif provider == "scikit_build_core.metadata.setuptools_scm":
+            tool = tomlkit.parse((self.path / "pyproject.toml").read_text())
+            config = tool.get("tool", {}).get("setuptools_scm", {})
+            d.scm_config = dict(config)
+            return get_version(self.path, config)
+        return TooComplicated(f"version provider {provider!r} isn't supported")
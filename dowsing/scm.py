@@ -0,0 +1,234 @@
+"""
+Versions that come from version control, the way setuptools_scm (and
+hatch-vcs, which uses it) would work them out, without running it.
+
+The version is found from, in order: `git describe` in a local checkout (or
+the revision a `GitTree` is reading), `PKG-INFO` in an sdist, the configured
+`version_file`/`write_to`, and finally `fallback_version`.
+"""
+
+import datetime
+import email.parser
+import re
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, List, Mapping, Optional, Union
+
+from packaging.version import InvalidVersion, Version
+
+from .tree import GitTree, TreePath
+from .types import ProjectPath, TooComplicated
+
+# setuptools_scm's default tag_regex
+TAG_REGEX = re.compile(
+    r"^(?:[\w-]+-)?(?P<version>[vV]?\d+(?:\.\d+){0,2}[^\+]*)(?:\+.*)?$"
+)
+
+# What setuptools_scm writes to version_file, in its various templates.
+VERSION_FILE_REGEX = re.compile(
+    r"""^(?:__version__|version)\s*(?::\s*str\s*)?=\s*"""
+    r"""(?:version\s*=\s*)?['"]([^'"]+)['"]""",
+    re.MULTILINE,
+)
+
+
+@dataclass
+class ScmVersion:
+    """
+    Where a checkout is relative to the most recent tag.
+    """
+
+    # The version from the tag, or None if there aren't any.
+    tag: Optional[str]
+    distance: int
+    # Abbreviated commit hash, without the "g"
+    node: str
+    dirty: bool = False
+
+
+def parse_describe(output: str) -> ScmVersion:
+    """
+    Parses `git describe --tags --long --dirty` output like
+    "v1.0-3-gabc1234-dirty".
+    """
+    output = output.strip()
+    dirty = output.endswith("-dirty")
+    if dirty:
+        output = output[: -len("-dirty")]
+    tag, distance, node = output.rsplit("-", 2)
+    return ScmVersion(tag, int(distance), node[1:], dirty)
+
+
+def tag_to_version(tag: str) -> Union[str, TooComplicated]:
+    match = TAG_REGEX.match(tag)
+    if not match:
+        return TooComplicated(f"tag {tag!r} isn't a version")
+    try:
+        return str(Version(match.group("version")))
+    except InvalidVersion:
+        return TooComplicated(f"tag {tag!r} isn't a version")
+
+
+def _guess_next(version: str) -> str:
+    version = version.partition("+")[0]
+    if ".dev" in version:
+        return version.rsplit(".dev", 1)[0]
+    match = re.match(r"^(.*?)(\d+)$", version)
+    assert match is not None  # versions always end in a number
+    return f"{match.group(1)}{int(match.group(2)) + 1}"
+
+
+VERSION_SCHEMES = ("guess-next-dev", "no-guess-dev", "post-release")
+LOCAL_SCHEMES = ("node-and-date", "node-and-timestamp", "dirty-tag", "no-local-version")
+
+
+def format_version(
+    scm: ScmVersion,
+    version_scheme: str = "guess-next-dev",
+    local_scheme: str = "node-and-date",
+    now: Optional[datetime.datetime] = None,
+) -> Union[str, TooComplicated]:
+    """
+    Applies one of setuptools_scm's builtin version and local schemes.
+    """
+    if version_scheme not in VERSION_SCHEMES:
+        return TooComplicated(f"version_scheme {version_scheme!r} isn't supported")
+    if local_scheme not in LOCAL_SCHEMES:
+        return TooComplicated(f"local_scheme {local_scheme!r} isn't supported")
+
+    if scm.tag is None:
+        tag = "0.0"
+    else:
+        v = tag_to_version(scm.tag)
+        if isinstance(v, TooComplicated):
+            return v
+        tag = v
+    exact = scm.distance == 0 and not scm.dirty and scm.tag is not None
+
+    if exact:
+        main = tag
+    elif version_scheme == "guess-next-dev":
+        main = f"{_guess_next(tag)}.dev{scm.distance}"
+    elif version_scheme == "no-guess-dev":
+        main = f"{tag}.post1.dev{scm.distance}"
+    else:
+        main = f"{tag}.post{scm.distance}"
+
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    if local_scheme == "no-local-version":
+        local = ""
+    elif local_scheme == "dirty-tag":
+        local = "+dirty" if scm.dirty else ""
+    else:
+        time = now.strftime(
+            "%Y%m%d" if local_scheme == "node-and-date" else "%Y%m%d%H%M%S"
+        )
+        if scm.distance == 0 and scm.tag is not None:
+            local = f"+d{time}" if scm.dirty else ""
+        else:
+            local = f"+g{scm.node}" + (f".d{time}" if scm.dirty else "")
+    return main + local
+
+
+def _git(cwd: Path, *args: str) -> Optional[str]:
+    try:
+        proc = subprocess.run(
+            ["git", *args],
+            cwd=cwd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+    except OSError:
+        return None
+    if proc.returncode != 0:
+        return None
+    return proc.stdout.decode().strip()
+
+
+def describe(repo: Path, rev: Optional[str] = None) -> Optional[ScmVersion]:
+    """
+    Returns where rev (or the work tree, including whether it's dirty) is, or
+    None if repo isn't in a git checkout.
+    """
+    target: List[str] = [rev] if rev else ["--dirty"]
+    out = _git(repo, "describe", "--tags", "--long", "--match", "*[0-9]*", *target)
+    if out:
+        return parse_describe(out)
+
+    # No tags
+    commit = rev or "HEAD"
+    node = _git(repo, "rev-parse", "--short", commit)
+    count = _git(repo, "rev-list", "--count", commit)
+    if node is None or count is None:
+        return None
+    dirty = False
+    if rev is None:
+        status = _git(repo, "status", "--porcelain", "--untracked-files=no")
+        dirty = bool(status)
+    return ScmVersion(None, int(count), node, dirty)
+
+
+def git_version(path: ProjectPath, config: Mapping[str, Any]) -> Optional[ScmVersion]:
+    """
+    Returns where the checkout that the version comes from is, or None if it
+    isn't from git.
+    """
+    if isinstance(path, TreePath):
+        if isinstance(path.tree, GitTree):
+            return describe(path.tree.repo, path.tree.rev)
+        return None
+
+    root = (path / str(config.get("root", "."))).resolve()
+    toplevel = _git(root, "rev-parse", "--show-toplevel")
+    if toplevel is None:
+        return None
+    if Path(toplevel).resolve() != root and not config.get("search_parent_directories"):
+        # Like setuptools_scm, a checkout further up doesn't count unless
+        # asked for; this is probably an unpacked sdist inside something else.
+        return None
+    return describe(root)
+
+
+def _pkg_info_version(path: ProjectPath) -> Optional[str]:
+    pkg_info = path / "PKG-INFO"
+    if not pkg_info.is_file():
+        return None
+    headers = email.parser.Parser().parsestr(pkg_info.read_text(), headersonly=True)
+    return headers.get("Version")
+
+
+def _version_file_version(
+    path: ProjectPath, config: Mapping[str, Any]
+) -> Optional[str]:
+    filename = config.get("version_file") or config.get("write_to")
+    if not isinstance(filename, str):
+        return None
+    version_file = path / filename
+    if not version_file.is_file():
+        return None
+    match = VERSION_FILE_REGEX.search(version_file.read_text())
+    return match.group(1) if match else None
+
+
+def get_version(
+    path: ProjectPath, config: Mapping[str, Any]
+) -> Union[str, TooComplicated]:
+    """
+    Returns the version for the project at path, where config is the
+    `[tool.setuptools_scm]` table (or `use_scm_version` dict).
+    """
+    scm = git_version(path, config)
+    if scm is not None:
+        return format_version(
+            scm,
+            str(config.get("version_scheme", "guess-next-dev")),
+            str(config.get("local_scheme", "node-and-date")),
+        )
+
+    version = _pkg_info_version(path) or _version_file_version(path, config)
+    if version:
+        return version
+    if isinstance(config.get("fallback_version"), str):
+        return str(config["fallback_version"])
+    return TooComplicated("no version control, PKG-INFO or version file")
@@ -1,14 +1,101 @@
 import posixpath
-from pathlib import Path
-from typing import Generator, Mapping, Sequence, Tuple
+from typing import Any, Dict, Generator, Mapping, Optional, Sequence, Tuple
 
-from setuptools import find_packages
+import tomlkit
 
-from ..types import BaseReader, Distribution
+from ..discovery import find_layout, find_packages
+from ..manifest import read_manifest, wheel_mapping
+from ..pep621 import FIELDS, Pep621Reader
+from ..scm import get_version
+from ..types import (
+    BaseReader,
+    Confidence,
+    Distribution,
+    has_unknown,
+    ProjectPath,
+    TooComplicated,
+)
+from .directives import resolve_directives
 from .setup_cfg_parsing import from_setup_cfg
 from .setup_py_parsing import FindPackages, from_setup_py
 
 
+# Not copied from [project], since setuptools has its own ideas about layout
+LAYOUT_FIELDS = ("packages", "packages_dict", "py_modules")
+
+# What setuptools' flat-layout discovery ignores
+FLAT_EXCLUDE = tuple(
+    pattern
+    for name in (
+        "ci",
+        "bin",
+        "debian",
+        "doc",
+        "docs",
+        "documentation",
+        "manpages",
+        "news",
+        "newsfragments",
+        "changelog",
+        "test",
+        "tests",
+        "unit_test",
+        "unit_tests",
+        "example",
+        "examples",
+        "scripts",
+        "tools",
+        "util",
+        "utils",
+        "python",
+        "build",
+        "dist",
+        "venv",
+        "env",
+        "requirements",
+        "tasks",
+        "fabfile",
+        "site_scons",
+        "benchmark",
+        "benchmarks",
+        "exercise",
+        "exercises",
+        "htmlcov",
+        "[._]*",
+    )
+    for pattern in (name, f"{name}.*")
+)
+FLAT_MODULE_EXCLUDE = frozenset(
+    {
+        "setup",
+        "conftest",
+        "test",
+        "tests",
+        "example",
+        "examples",
+        "build",
+        "toolchain",
+        "manage",
+        "fabfile",
+        "noxfile",
+        "tasks",
+        "dodo",
+    }
+)
+
+
+def _directive(value: Mapping[str, Any]) -> str:
+    """
+    Turns `{attr = "x"}` or `{file = ["a", "b"]}` into setup.cfg's spelling.
+    """
+    if "attr" in value:
+        return f"attr: {value['attr']}"
+    files = value.get("file", ())
+    if isinstance(files, str):
+        files = [files]
+    return "file: " + ", ".join(files)
+
+
 def _prefixes(dotted_name: str) -> Generator[Tuple[str, str], None, None]:
     parts = dotted_name.split(".")
     for i in range(len(parts), -1, -1):
@@ -16,7 +103,7 @@ def _prefixes(dotted_name: str) -> Generator[Tuple[str, str], None, None]:
 
 
 class SetuptoolsReader(BaseReader):
-    def __init__(self, path: Path):
+    def __init__(self, path: ProjectPath):
         self.path = path
 
     def get_requires_for_build_sdist(self) -> Sequence[str]:
@@ -39,9 +126,37 @@ class SetuptoolsReader(BaseReader):
 
         if (self.path / "setup.py").exists():
             d2 = from_setup_py(self.path, {})
+            confidence = dict(d1.confidence)
             for k in d2:
                 if getattr(d2, k):
                     setattr(d1, k, getattr(d2, k))
+                    confidence.pop(k, None)
+                    if k in d2.confidence:
+                        confidence[k] = d2.confidence[k]
+            d1.provenance = {k: v for k, v in d2.provenance.items() if getattr(d2, k)}
+            d1.confidence = confidence
+            d1.default_confidence = d2.default_confidence
+            d1.input_files = d2.input_files
+
+        pyproject = self._pyproject()
+        if "project" in pyproject:
+            self._merge_project(d1)
+        tool = pyproject.get("tool", {}).get("setuptools", {})
+        if tool:
+            self._merge_tool(d1, tool)
+        if "project" in pyproject and not d1.packages and not d1.py_modules:
+            self._discover(d1)
+
+        resolve_directives(self.path, d1)
+
+        scm = self._scm_config(d1)
+        if scm is not None:
+            d1.scm_config = scm
+            d1.version = get_version(self.path, scm)  # type: ignore[assignment]
+            if not isinstance(d1.version, TooComplicated):
+                d1.confidence = {
+                    k: v for k, v in d1.confidence.items() if k != "version"
+                }
 
         # This is the bare minimum to get pbr projects to show as having any
         # sources.  I don't want to use pbr.util.cfg_to_args because it appears
@@ -60,8 +175,8 @@ class SetuptoolsReader(BaseReader):
         # package_dir can both add and remove components, see docs
         # https://docs.python.org/2/distutils/setupscript.html#listing-whole-packages
         package_dir: Mapping[str, str] = d1.package_dir
-        # If there was an error, we might have written "??"
-        if package_dir != "??":  # type: ignore
+        packages_known = not has_unknown(package_dir)
+        if packages_known:
             if not package_dir:
                 package_dir = {"": "."}
 
@@ -78,35 +193,190 @@ class SetuptoolsReader(BaseReader):
 
             d1.packages_dict = {}  # Break shared class-level dict
 
-            # The following as_posix calls are necessary for Windows, but don't
-            # hurt elsewhere.
             if isinstance(d1.packages, FindPackages):
+                packages_known = not has_unknown(vars(d1.packages))
                 # This encodes a lot of sketchy logic, and deserves more test cases,
                 # plus some around py_modules
+                if packages_known:
+                    for p in find_packages(
+                        self.path / d1.packages.where,
+                        d1.packages.exclude,
+                        d1.packages.include,
+                        d1.packages.namespaces,
+                    ):
+                        d1.packages_dict[p] = mangle(p)
+            elif d1.packages in (["find:"], ["find_namespace:"]):
                 for p in find_packages(
-                    (self.path / d1.packages.where).as_posix(),
-                    d1.packages.exclude,
-                    d1.packages.include,
-                ):
-                    d1.packages_dict[p] = mangle(p)
-            elif d1.packages == ["find:"]:
-                for p in find_packages(
-                    (self.path / d1.find_packages_where).as_posix(),
+                    self.path / d1.find_packages_where,
                     d1.find_packages_exclude,
                     d1.find_packages_include,
+                    d1.packages == ["find_namespace:"],
                 ):
                     d1.packages_dict[p] = mangle(p)
-            elif d1.packages not in ("??", "????"):
+            elif isinstance(d1.packages, TooComplicated):
+                packages_known = False
+            else:
                 assert isinstance(
                     d1.packages, (list, tuple)
                 ), f"{d1.packages!r} is not a list/tuple"
                 for p in d1.packages:
-                    if p:
+                    if isinstance(p, TooComplicated):
+                        packages_known = False
+                    elif p:
                         d1.packages_dict[p] = mangle(p)
 
-        d1.source_mapping = d1._source_mapping(self.path)
+        d1.source_mapping = self.get_source_mapping(d1)
+        if not packages_known or d1.source_mapping is None:
+            d1.confidence = {
+                **d1.confidence,
+                "packages_dict": Confidence.UNKNOWN,
+                "source_mapping": Confidence.UNKNOWN,
+            }
         return d1
 
+    def get_source_mapping(self, dist: Distribution) -> Optional[Dict[str, str]]:
+        source_mapping = dist._source_mapping(self.path)
+        if source_mapping is None or has_unknown(dist.package_data):
+            return source_mapping
+
+        # setuptools only copies data files that are asked for
+        pyproject = self._pyproject()
+        include_package_data = dist.include_package_data
+        if include_package_data is None:
+            include_package_data = "project" in pyproject
+        return wheel_mapping(
+            source_mapping,
+            read_manifest(self.path),
+            dist.packages_dict,
+            dist.package_data,
+            include_package_data is True,
+            # setuptools_scm's file finder adds every file in git, whether or
+            # not it's what sets the version
+            all_files=bool(dist.use_scm_version)
+            or "setuptools_scm" in pyproject.get("tool", {}),
+        )
+
+    def _pyproject(self) -> Mapping[str, Any]:
+        pyproject = self.path / "pyproject.toml"
+        if not pyproject.exists():
+            return {}
+        doc: Mapping[str, Any] = tomlkit.parse(pyproject.read_text())
+        return doc
+
+    def _merge_project(self, dist: Distribution) -> None:
+        """
+        Static `[project]` fields win over setup.cfg and setup.py; dynamic ones
+        are left to them (or `[tool.setuptools.dynamic]`).
+        """
+        project = Pep621Reader(self.path).get_pep621_metadata()
+        confidence = dict(dist.confidence)
+        provenance = dict(dist.provenance)
+        for k in project:
+            if k in LAYOUT_FIELDS:
+                continue
+            if getattr(project, k):
+                setattr(dist, k, getattr(project, k))
+                confidence.pop(k, None)
+                provenance.pop(k, None)
+                if k in project.confidence:
+                    confidence[k] = project.confidence[k]
+            elif k in project.confidence and not getattr(dist, k):
+                confidence[k] = project.confidence[k]
+        dist.confidence = confidence
+        dist.provenance = provenance
+
+    def _merge_tool(self, dist: Distribution, tool: Mapping[str, Any]) -> None:
+        """
+        Applies `[tool.setuptools]`, which are the same as the setup() keywords.
+        """
+        packages = tool.get("packages")
+        if isinstance(packages, Mapping):
+            find = packages.get("find", {})
+            where = list(find.get("where", ["."]))
+            if len(where) > 1:
+                too_many = TooComplicated("multiple packages.find where")
+                dist.packages = too_many  # type: ignore[assignment]
+            else:
+                # Unlike setup.cfg's find:, this finds namespace packages too
+                namespaces = find.get("namespaces", True)
+                dist.packages = ["find_namespace:" if namespaces else "find:"]
+                dist.find_packages_where = where[0] if where else "."
+                dist.find_packages_include = list(find.get("include", ["*"]))
+                dist.find_packages_exclude = list(find.get("exclude", []))
+        elif packages is not None:
+            dist.packages = list(packages)
+        if "package-dir" in tool:
+            dist.package_dir = dict(tool["package-dir"])
+        if "package-data" in tool:
+            dist.package_data = {k: list(v) for k, v in tool["package-data"].items()}
+        if "py-modules" in tool:
+            dist.py_modules = list(tool["py-modules"])
+        if "zip-safe" in tool:
+            dist.zip_safe = bool(tool["zip-safe"])
+        if "include-package-data" in tool:
+            dist.include_package_data = bool(tool["include-package-data"])
+
+        # These keep the same "attr: x" and "file: x" strings as setup.cfg
+        confidence = dict(dist.confidence)
+        for k, v in tool.get("dynamic", {}).items():
+            key = FIELDS.get(k, k.replace("-", "_"))
+            if key not in dist:
+                continue
+            if k == "optional-dependencies":
+                dist.extras_require = {x: [_directive(y)] for x, y in v.items()}
+                dist.provides_extras = list(v)
+            elif k == "dependencies":
+                dist.requires_dist = [_directive(v)]
+            else:
+                if k == "readme" and "content-type" in v:
+                    dist.description_content_type = v["content-type"]
+                setattr(dist, key, _directive(v))
+            confidence[key] = Confidence.UNKNOWN
+        dist.confidence = confidence
+
+    def _discover(self, dist: Distribution) -> None:
+        """
+        setuptools' automatic discovery, for the src and flat layouts.
+        """
+        if (self.path / "src").is_dir():
+            # Everything in src is meant to be installed, namespaces included
+            layout = find_layout(self.path / "src", namespaces=True, prefix="src")
+            dist.package_dir = {"": "src"}
+            dist.packages = layout.packages
+            dist.py_modules = layout.py_modules
+            return
+
+        layout = find_layout(self.path, FLAT_EXCLUDE)
+        if layout.packages:
+            dist.packages = layout.packages
+        else:
+            dist.py_modules = [
+                m
+                for m in layout.py_modules
+                if m not in FLAT_MODULE_EXCLUDE and not m.startswith("_")
+            ]
+
+    def _scm_config(self, dist: Distribution) -> Optional[Mapping[str, Any]]:
+        """
+        Returns the setuptools_scm config, if it's going to set the version.
+        """
+        config: Dict[str, Any] = {}
+        configured = False
+        tool = self._pyproject().get("tool", {})
+        if "setuptools_scm" in tool:
+            config = dict(tool["setuptools_scm"])
+            configured = True
+
+        if isinstance(dist.use_scm_version, Mapping):
+            return {**config, **dist.use_scm_version}
+        elif dist.use_scm_version:
+            return config
+        elif configured and not dist.version:
+            # With just [tool.setuptools_scm], it only fills in a missing
+            # version.
+            return config
+        return None
+
     def _get_requires(self) -> Tuple[str, ...]:
         dist = self.get_metadata()
         return tuple(dist.setup_requires)
@@ -0,0 +1,147 @@
+"""
+setup.cfg's `attr:` and `file:` directives, which `[tool.setuptools.dynamic]`
+and flit's `description-file` are read into as well.
+
+`attr:` values come from the same static module summaries that setup.py
+imports use, so they're cached by the module's hash; `file:` contents go
+through the size-bounded `FileCache`.  Nothing is read unless a field actually
+has a directive.
+"""
+
+import posixpath
+from typing import Any, List, Mapping, Optional, Sequence, Tuple, Union
+
+from ..cache import FILE_CACHE, FileCache, FileTooLarge, SUMMARY_CACHE, SummaryCache
+from ..types import Distribution, has_unknown, ProjectPath, TooComplicated
+from .setup_py_parsing import import_value
+
+PREFIXES = ("attr:", "file:")
+
+
+def resolve(
+    path: ProjectPath,
+    directive: str,
+    package_dir: Optional[Mapping[str, str]] = None,
+    file_cache: FileCache = FILE_CACHE,
+    summary_cache: SummaryCache = SUMMARY_CACHE,
+) -> Tuple[Any, List[str]]:
+    """
+    Returns the value of one directive and the files that were read for it.
+    """
+    kind, _, rest = directive.partition(":")
+    rest = rest.strip()
+    if kind == "attr":
+        roots = _import_roots(package_dir or {}, rest)
+        if isinstance(roots, TooComplicated):
+            return roots, []
+        return import_value(path, rest, roots, file_cache, summary_cache)
+
+    files = [posixpath.normpath(f.strip()) for f in rest.split(",") if f.strip()]
+    texts = []
+    for rel in files:
+        if rel.startswith("../") or rel == ".." or posixpath.isabs(rel):
+            return TooComplicated(f"{rel} is outside the project"), files
+        # setuptools skips missing files, but here that more likely means we
+        # weren't given the whole project.
+        try:
+            texts.append(file_cache.read_text(path / rel))
+        except FileTooLarge:
+            return TooComplicated(f"{rel} is too large"), files
+        except (OSError, UnicodeDecodeError):
+            return TooComplicated(f"{rel} can't be read"), files
+    return "\n".join(texts), files
+
+
+def resolve_directives(
+    path: ProjectPath,
+    dist: Distribution,
+    file_cache: FileCache = FILE_CACHE,
+    summary_cache: SummaryCache = SUMMARY_CACHE,
+) -> None:
+    """
+    Replaces every field of dist that's a directive with what it refers to,
+    in place.
+    """
+    package_dir = None if has_unknown(dist.package_dir) else dist.package_dir
+    confidence = dict(dist.confidence)
+    input_files = list(dist.input_files)
+
+    def field(key: str, value: Any) -> Any:
+        directive = _directive(value)
+        if directive is None:
+            return value
+        resolved, files = resolve(
+            path, directive, package_dir, file_cache, summary_cache
+        )
+        input_files.extend(f for f in files if f not in input_files)
+        if isinstance(resolved, str) and not isinstance(value, str):
+            resolved = _lines(resolved)
+        elif key == "version":
+            resolved = _version(resolved)
+        return resolved
+
+    for k in dist:
+        value = getattr(dist, k)
+        if k == "extras_require" and isinstance(value, Mapping):
+            if not any(_directive(v) for v in value.values()):
+                continue
+            resolved: Any = {x: field(k, y) for x, y in value.items()}
+        else:
+            resolved = field(k, value)
+            if resolved is value:
+                continue
+        setattr(dist, k, resolved)
+        if not has_unknown(resolved):
+            confidence.pop(k, None)
+
+    dist.confidence = confidence
+    dist.input_files = tuple(input_files)
+
+
+def _directive(value: Any) -> Optional[str]:
+    """
+    Returns the directive in a field, which is either the string itself or
+    (in a list field) its only item.
+    """
+    if isinstance(value, (list, tuple)) and len(value) == 1:
+        value = value[0]
+    if isinstance(value, str) and value.startswith(PREFIXES):
+        return value
+    return None
+
+
+def _import_roots(
+    package_dir: Mapping[str, str], dotted: str
+) -> Union[Sequence[str], TooComplicated]:
+    """
+    Where to look for the module in an `attr:`, which setuptools finds using
+    package_dir.
+    """
+    top = dotted.split(".")[0]
+    if top in package_dir:
+        where = posixpath.normpath(package_dir[top])
+        if posixpath.basename(where) != top:
+            return TooComplicated(f"package_dir renames {top}")
+        return (posixpath.dirname(where),)
+    if "" in package_dir:
+        where = posixpath.normpath(package_dir[""])
+        return ("" if where == "." else where,)
+    return ("",)
+
+
+def _lines(text: str) -> List[str]:
+    # The same as setuptools' _parse_requirements_list, for list fields
+    lines = (line.strip() for line in text.splitlines())
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def _version(value: Any) -> Any:
+    if isinstance(value, str):
+        return value.strip()
+    elif isinstance(value, (tuple, list)) and all(
+        isinstance(v, (int, str)) for v in value
+    ):
+        return ".".join(str(v) for v in value)
+    elif isinstance(value, TooComplicated):
+        return value
+    return TooComplicated(f"version is {type(value)}")
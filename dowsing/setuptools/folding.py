@@ -0,0 +1,347 @@
+"""
+Operations that setup.py can do on values we already know, which are safe to
+just do: no side effects, and nothing that can take much time or memory.
+
+Everything here returns TooComplicated rather than raising.
+"""
+
+import operator
+import re
+import string
+from typing import Any, Callable, Dict, List
+
+from ..types import TooComplicated
+
+# Bounds on what a single operation can build, so that `"x" * 10**10` or
+# `"{:1000000000}".format(x)` don't.  This is still plenty for READMEs.
+MAX_SIZE = 4 * 1024 * 1024
+
+CONSTANT_TYPES = (str, int, float, bool, type(None))
+
+
+def is_constant(value: Any) -> bool:
+    """
+    Whether value is made up of only plain python values (not TooComplicated,
+    Sometimes, FileReference and so on).
+    """
+    if isinstance(value, CONSTANT_TYPES):
+        return True
+    if isinstance(value, (list, tuple)):
+        return all(is_constant(v) for v in value)
+    if isinstance(value, dict):
+        return all(is_constant(k) and is_constant(v) for k, v in value.items())
+    return False
+
+
+def _size(value: Any) -> int:
+    if isinstance(value, (str, list, tuple, dict)):
+        return len(value)
+    return 0
+
+
+def _check(value: Any) -> Any:
+    if _size(value) > MAX_SIZE:
+        return TooComplicated("result is too large")
+    return value
+
+
+def _not_constant(values: List[Any], what: str) -> Any:
+    for v in values:
+        if isinstance(v, TooComplicated):
+            return v
+    return TooComplicated(f"{what} of non-constant values isn't supported")
+
+
+def _widths_ok(spec: str) -> bool:
+    return all(int(n) <= MAX_SIZE for n in re.findall(r"\d+", spec))
+
+
+def _fits(template: str, fields: int, values: List[Any]) -> bool:
+    """
+    Whether filling in `fields` placeholders in template with (the str of)
+    values could stay under MAX_SIZE, without doing it.
+    """
+    largest = max((len(str(v)) for v in values), default=0)
+    return len(template) + fields * largest <= MAX_SIZE
+
+
+def safe_format(fmt: str, args: List[Any], kwargs: Dict[str, Any]) -> Any:
+    """
+    str.format, without attribute access or huge widths.
+    """
+    try:
+        fields = 0
+        for _, field, spec, _ in string.Formatter().parse(fmt):
+            if field is None:
+                continue
+            if "." in field or "[" in field:
+                return TooComplicated("format fields with attributes aren't supported")
+            if spec and ("{" in spec or not _widths_ok(spec)):
+                return TooComplicated("format spec isn't supported")
+            fields += 1
+        if not _fits(fmt, fields, args + list(kwargs.values())):
+            return TooComplicated("result is too large")
+        return _check(fmt.format(*args, **kwargs))
+    except Exception as e:
+        return TooComplicated(f"format failed: {e}")
+
+
+def format_value(value: Any, spec: str, conversion: str = "") -> Any:
+    """
+    One `{value!conversion:spec}` in an f-string.
+    """
+    if not is_constant(value):
+        return _not_constant([value], "f-string")
+    if not _widths_ok(spec):
+        return TooComplicated("format width is too large")
+    if conversion == "r":
+        value = repr(value)
+    elif conversion == "a":
+        value = ascii(value)
+    elif conversion == "s":
+        value = str(value)
+    try:
+        return _check(format(value, spec))
+    except Exception as e:
+        return TooComplicated(f"format failed: {e}")
+
+
+STR_METHODS = frozenset(
+    {
+        "capitalize",
+        "casefold",
+        "count",
+        "endswith",
+        "find",
+        "format",
+        "index",
+        "isalnum",
+        "isalpha",
+        "isdigit",
+        "islower",
+        "isspace",
+        "isupper",
+        "join",
+        "lower",
+        "lstrip",
+        "partition",
+        "replace",
+        "rfind",
+        "rindex",
+        "rpartition",
+        "rsplit",
+        "rstrip",
+        "split",
+        "splitlines",
+        "startswith",
+        "strip",
+        "title",
+        "upper",
+    }
+)
+
+DICT_METHODS = frozenset({"get", "items", "keys", "values"})
+
+
+def call_method(
+    receiver: Any, method: str, args: List[Any], kwargs: Dict[str, Any]
+) -> Any:
+    """
+    Calls one of STR_METHODS or DICT_METHODS.  Only the receiver of a dict
+    method can contain things that aren't constant, like `d.get("x")` where
+    the value is a Sometimes.
+    """
+    everything = args + list(kwargs.values())
+    if not all(is_constant(v) for v in everything):
+        return _not_constant(everything, f".{method}()")
+
+    if isinstance(receiver, str) and method in STR_METHODS:
+        if method == "format":
+            return safe_format(receiver, args, kwargs)
+        if method == "replace" and len(args) >= 2 and isinstance(args[0], str):
+            count = receiver.count(args[0])
+            if not _fits(receiver, count, args[1:2]):
+                return TooComplicated("result is too large")
+        try:
+            return _check(getattr(receiver, method)(*args, **kwargs))
+        except Exception as e:
+            return TooComplicated(f".{method}() failed: {e}")
+    elif isinstance(receiver, dict) and method in DICT_METHODS:
+        try:
+            result = getattr(receiver, method)(*args, **kwargs)
+        except Exception as e:
+            return TooComplicated(f".{method}() failed: {e}")
+        if method == "get":
+            return result
+        # Views become lists, which is close enough for what setup.py does
+        # with them.
+        return [list(x) if isinstance(x, tuple) else x for x in result]
+    return _not_constant([receiver], f".{method}()")
+
+
+def multiply(lhs: Any, rhs: Any) -> Any:
+    if not is_constant(lhs) or not is_constant(rhs):
+        return _not_constant([lhs, rhs], "*")
+    for seq, n in ((lhs, rhs), (rhs, lhs)):
+        if isinstance(n, int) and _size(seq) * n > MAX_SIZE:
+            return TooComplicated("result is too large")
+    try:
+        return _check(lhs * rhs)
+    except Exception as e:
+        return TooComplicated(f"* failed: {e}")
+
+
+def modulo(lhs: Any, rhs: Any) -> Any:
+    """
+    Only %-formatting; numbers aren't much use in setup.py.
+    """
+    if not isinstance(lhs, str) or not is_constant(rhs):
+        return _not_constant([lhs, rhs], "%")
+    if not all(int(n) <= MAX_SIZE for n in re.findall(r"%[-#0 +]*(\d+)", lhs)):
+        return TooComplicated("format width is too large")
+    values = list(rhs.values()) if isinstance(rhs, dict) else [rhs]
+    if isinstance(rhs, tuple):
+        values = list(rhs)
+    if not _fits(lhs, lhs.count("%"), values):
+        return TooComplicated("result is too large")
+    try:
+        return _check(lhs % rhs)
+    except Exception as e:
+        return TooComplicated(f"% failed: {e}")
+
+
+def subscript(value: Any, key: Any) -> Any:
+    if not is_constant(key):
+        return _not_constant([key], "subscript")
+    if isinstance(value, dict):
+        try:
+            if key in value:
+                return value[key]
+        except TypeError:
+            return TooComplicated(f"unhashable key {key!r}")
+        return TooComplicated(f"missing key {key!r}")
+    elif isinstance(value, (str, list, tuple)) and isinstance(key, int):
+        try:
+            return value[key]
+        except IndexError:
+            return TooComplicated(f"index {key} out of range")
+    return _not_constant([value], "subscript")
+
+
+def slice_(value: Any, lower: Any, upper: Any, step: Any) -> Any:
+    if not isinstance(value, (str, list, tuple)):
+        return _not_constant([value], "slice")
+    if not all(x is None or isinstance(x, int) for x in (lower, upper, step)):
+        return _not_constant([lower, upper, step], "slice")
+    try:
+        return value[lower:upper:step]
+    except Exception:
+        return TooComplicated("slice failed")
+
+
+COMPARISONS: Dict[str, Callable[[Any, Any], Any]] = {
+    "Equal": operator.eq,
+    "NotEqual": operator.ne,
+    "LessThan": operator.lt,
+    "LessThanEqual": operator.le,
+    "GreaterThan": operator.gt,
+    "GreaterThanEqual": operator.ge,
+    "In": lambda a, b: a in b,
+    "NotIn": lambda a, b: a not in b,
+    "Is": lambda a, b: a is b,
+    "IsNot": lambda a, b: a is not b,
+}
+
+UNARY_OPERATIONS: Dict[str, Callable[[Any], Any]] = {
+    "Not": operator.not_,
+    "Minus": operator.neg,
+    "Plus": operator.pos,
+    "BitInvert": operator.invert,
+}
+
+
+def compare(op: str, lhs: Any, rhs: Any) -> Any:
+    """
+    op is the name of the libcst operator node, like "NotIn".
+    """
+    if op not in COMPARISONS or not is_constant(lhs) or not is_constant(rhs):
+        return _not_constant([lhs, rhs], op)
+    if op in ("Is", "IsNot") and not (lhs is None or rhs is None):
+        # Identity of anything else depends on interning
+        return TooComplicated(f"{op} is only supported for None")
+    try:
+        return bool(COMPARISONS[op](lhs, rhs))
+    except Exception as e:
+        return TooComplicated(f"{op} failed: {e}")
+
+
+def unary(op: str, value: Any) -> Any:
+    if op not in UNARY_OPERATIONS or not is_constant(value):
+        return _not_constant([value], op)
+    try:
+        return UNARY_OPERATIONS[op](value)
+    except Exception as e:
+        return TooComplicated(f"{op} failed: {e}")
+
+
+def boolean(op: str, lhs: Any, rhs: Any) -> Any:
+    """
+    `lhs and rhs` or `lhs or rhs`, which only needs to know whether lhs is
+    true.
+    """
+    if not is_constant(lhs):
+        return _not_constant([lhs], op)
+    if op == "And":
+        return rhs if lhs else lhs
+    return lhs if lhs else rhs
+
+
+def _iterable(value: Any) -> bool:
+    return isinstance(value, (str, list, tuple, dict)) and is_constant(value)
+
+
+def _builtin(fn: Callable[..., Any], iterable: bool = False) -> Callable[..., Any]:
+    def wrapper(*args: Any) -> Any:
+        if not all(is_constant(a) for a in args):
+            return _not_constant(list(args), f"{fn.__name__}()")
+        if iterable and args and not _iterable(args[0]):
+            return TooComplicated(f"{fn.__name__}() of {type(args[0]).__name__}")
+        try:
+            return _check(fn(*args))
+        except Exception as e:
+            return TooComplicated(f"{fn.__name__}() failed: {e}")
+
+    return wrapper
+
+
+def _reversed(value: Any) -> List[Any]:
+    return list(reversed(value))
+
+
+# qualified name -> function, for builtins that are safe to call on constants
+BUILTINS: Dict[str, Callable[..., Any]] = {
+    "builtins.bool": _builtin(bool),
+    "builtins.int": _builtin(int),
+    "builtins.len": _builtin(len),
+    "builtins.list": _builtin(list, iterable=True),
+    "builtins.reversed": _builtin(_reversed, iterable=True),
+    "builtins.sorted": _builtin(sorted, iterable=True),
+    "builtins.str": _builtin(str),
+    "builtins.tuple": _builtin(tuple, iterable=True),
+}
+
+
+# Total iterations of a comprehension (including nested ones).
+MAX_ITERATIONS = 10_000
+
+
+def iterate(value: Any) -> Any:
+    """
+    Returns the items of value as a list, or TooComplicated.  The items
+    themselves don't need to be constant.
+    """
+    if isinstance(value, dict):
+        return list(value)
+    elif isinstance(value, (str, list, tuple)):
+        return list(value)
+    return _not_constant([value], "iteration")
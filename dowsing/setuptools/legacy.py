@@ -0,0 +1,401 @@
+"""
+Reading setup.py (and the modules it imports) when it's written for python 2.
+
+libcst only parses python 3, and a whole project shouldn't fall back to a build
+over a `print "x"`.  Source that doesn't parse is split into statements with a
+tokenizer that doesn't mind python 2: syntax with an exact python 3 spelling
+(`except E, e:`, `0755`, `10L`, `ur""`, `<>`, backticks, `exec code in ns`,
+`raise E, msg` and mixed tabs) is respelled, print statements become `pass`,
+and any other statement that still doesn't parse on its own is dropped.  Line
+numbers stay the same, so spans still point into the original file.
+
+What a dropped statement did isn't known, so `Dependencies` is for working out
+which values could have been changed by one.
+"""
+
+import io
+import keyword
+import re
+import tokenize
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+import libcst as cst
+
+# More statements than this not parsing means it isn't python 2 either.
+MAX_DROPPED = 20
+
+TOKEN_RE = re.compile(
+    r"""
+    (?P<string>(?i:[bru]{0,2})(?:'''(?:\\.|[^\\])*?'''|\"\"\"(?:\\.|[^\\])*?\"\"\"
+        |'(?:\\.|[^'\\\n])*'|"(?:\\.|[^"\\\n])*"))
+    |(?P<comment>\#[^\n]*)
+    |(?P<continuation>\\\r?\n)
+    |(?P<newline>\r?\n)
+    |(?P<number>\.?\d[\w.]*)
+    |(?P<name>\w+)
+    |(?P<space>[^\S\n]+)
+    |(?P<op><>|\*\*|//|<<|>>|[<>=!]=|->|\S)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+OCTAL_RE = re.compile(r"^0+([0-7]+)$")
+LONG_RE = re.compile(r"^(0[xX][0-9a-fA-F]+|\d+)[lL]$")
+
+# Statements that end at a `:` and have a block
+COMPOUND_KEYWORDS = frozenset(
+    {
+        "if",
+        "elif",
+        "else",
+        "for",
+        "while",
+        "try",
+        "except",
+        "finally",
+        "with",
+        "def",
+        "class",
+    }
+)
+OPEN_BRACKETS = frozenset("([{")
+CLOSE_BRACKETS = frozenset(")]}")
+INSIGNIFICANT = frozenset({"space", "comment", "continuation", "newline"})
+
+
+def decode(data: bytes) -> str:
+    """
+    Decodes python source the way the interpreter does (PEP 263), except that
+    bytes the encoding doesn't allow (which python 2 let through in strings
+    and comments) are read as latin-1 rather than failing.
+    """
+    try:
+        encoding, _ = tokenize.detect_encoding(io.BytesIO(data).readline)
+        return data.decode(encoding)
+    except (SyntaxError, LookupError, UnicodeDecodeError):
+        return data.decode("latin-1")
+
+
+def parse_module(text: str) -> Tuple[cst.Module, Dict[int, FrozenSet[str]]]:
+    """
+    Returns the parsed module and the statements that had to be dropped to
+    parse it, as line -> the names they mention; raises the original
+    ParserSyntaxError if it can't be parsed at all.
+    """
+    try:
+        return cst.parse_module(text), {}
+    except cst.ParserSyntaxError as e:
+        error = e
+
+    source = _Source(text)
+    source.respell()
+    try:
+        return cst.parse_module(source.text()), {}
+    except cst.ParserSyntaxError:
+        pass
+
+    dropped: Dict[int, FrozenSet[str]] = {}
+    count = 0
+    for statement in source.statements:
+        first, _, header = statement
+        # Other compound statements can't be parsed without their block
+        if (header and source.tokens[first] != "def") or source.parses(statement):
+            continue
+        if count == MAX_DROPPED:
+            raise error
+        count += 1
+        line = source.line(first)
+        dropped[line] = dropped.get(line, frozenset()) | source.names(statement)
+        source.drop(statement)
+    try:
+        return cst.parse_module(source.text()), dropped
+    except cst.ParserSyntaxError:
+        raise error
+
+
+# (first significant token, terminator, whether it's a compound header)
+Statement = Tuple[int, int, bool]
+
+
+class _Source:
+    def __init__(self, text: str) -> None:
+        self.kinds: List[str] = []
+        self.tokens: List[str] = []
+        for match in TOKEN_RE.finditer(text):
+            assert match.lastgroup is not None
+            self.kinds.append(match.lastgroup)
+            self.tokens.append(match.group())
+        self.out = list(self.tokens)
+        self.statements = list(self._statements())
+
+    def text(self) -> str:
+        return "".join(self.out)
+
+    def line(self, index: int) -> int:
+        return 1 + sum(t.count("\n") for t in self.tokens[:index])
+
+    def _statements(self) -> Iterator[Statement]:
+        depth = 0
+        first: Optional[int] = None
+        for i, (kind, token) in enumerate(zip(self.kinds, self.tokens)):
+            if kind in INSIGNIFICANT:
+                if kind == "newline" and depth == 0 and first is not None:
+                    yield first, i, False
+                    first = None
+                continue
+            if first is None:
+                first = i
+            if token in OPEN_BRACKETS:
+                depth += 1
+            elif token in CLOSE_BRACKETS:
+                depth = max(depth - 1, 0)
+            elif token == ";" and depth == 0:
+                yield first, i, False
+                first = None
+            elif (
+                token == ":" and depth == 0 and self.tokens[first] in COMPOUND_KEYWORDS
+            ):
+                yield first, i, True
+                first = None
+        if first is not None:
+            yield first, len(self.tokens), False
+
+    def _significant(self, start: int, end: int) -> List[int]:
+        return [i for i in range(start, end) if self.kinds[i] not in INSIGNIFICANT]
+
+    def _top_level(self, start: int, end: int, token: str) -> List[int]:
+        """
+        Returns where token is in start:end outside of any brackets.
+        """
+        found = []
+        depth = 0
+        for i in self._significant(start, end):
+            if self.tokens[i] in OPEN_BRACKETS:
+                depth += 1
+            elif self.tokens[i] in CLOSE_BRACKETS:
+                depth -= 1
+            elif depth == 0 and self.tokens[i] == token:
+                found.append(i)
+        return found
+
+    def respell(self) -> None:
+        in_backticks = False
+        for i, (kind, token) in enumerate(zip(self.kinds, self.tokens)):
+            if kind == "number":
+                token = LONG_RE.sub(r"\1", token)
+                self.out[i] = OCTAL_RE.sub(r"0o\1", token)
+            elif kind == "string":
+                prefix = token[: len(token) - len(token.lstrip("bBrRuU"))]
+                if len(prefix) == 2 and prefix.lower() in ("ur", "ru"):
+                    self.out[i] = prefix.replace("u", "").replace("U", "") + token[2:]
+            elif kind == "space" and (i == 0 or self.kinds[i - 1] == "newline"):
+                # python 2's tabs were to the next multiple of 8
+                self.out[i] = token.expandtabs(8)
+            elif token == "<>":
+                self.out[i] = "!="
+            elif token == "`":
+                self.out[i] = ")" if in_backticks else "repr("
+                in_backticks = not in_backticks
+
+        for statement in self.statements:
+            self._respell_statement(statement)
+
+    def _respell_statement(self, statement: Statement) -> None:
+        first, end, _ = statement
+        keyword = self.tokens[first]
+        significant = self._significant(first, end)
+        following = self.tokens[significant[1]] if len(significant) > 1 else None
+        if keyword == "print" and following not in (None, "("):
+            self.drop(statement)
+        elif keyword == "exec" and following is not None:
+            ins = self._top_level(first + 1, end, "in")
+            if ins or following != "(":
+                self.out[first] = "exec("
+                for i in ins[:1]:
+                    self.out[i] = ","
+                self.out[significant[-1]] += ")"
+        elif keyword == "raise":
+            commas = self._top_level(first + 1, end, ",")
+            if commas:
+                self.out[commas[0]] = "("
+                if len(commas) > 1:
+                    # The traceback can't be passed like this in python 3
+                    self._blank(commas[1] + 1, end)
+                    self.out[commas[1]] = ")"
+                else:
+                    self.out[significant[-1]] += ")"
+        elif keyword == "except":
+            commas = self._top_level(first + 1, end, ",")
+            if len(commas) == 1:
+                self.out[commas[0]] = " as"
+
+    def names(self, statement: Statement) -> FrozenSet[str]:
+        """
+        Returns the names a statement mentions, other than attributes.
+        """
+        first, end, _ = statement
+        significant = self._significant(first, end)
+        return frozenset(
+            self.tokens[i]
+            for n, i in enumerate(significant)
+            if self.kinds[i] == "name"
+            and not keyword.iskeyword(self.tokens[i])
+            and (n == 0 or self.tokens[significant[n - 1]] != ".")
+        )
+
+    def parses(self, statement: Statement) -> bool:
+        first, end, header = statement
+        block = ":\n    pass" if header else ""
+        try:
+            cst.parse_statement("".join(self.out[first:end]) + block + "\n")
+        except cst.ParserSyntaxError:
+            return False
+        return True
+
+    def drop(self, statement: Statement) -> None:
+        """
+        Replaces a statement with `pass` (or a function's parameters, like
+        python 2's tuple parameters, with `*args, **kwargs`), keeping the lines
+        it was on.
+        """
+        first, end, header = statement
+        if header:
+            significant = self._significant(first, end)
+            self.out[significant[1]] += "(*args, **kwargs)"
+            self._blank(significant[1] + 1, end)
+        else:
+            self.out[first] = "pass"
+            self._blank(first + 1, end)
+
+    def _blank(self, start: int, end: int) -> None:
+        for i in range(start, end):
+            self.out[i] = "\n" * self.tokens[i].count("\n")
+
+
+def names_in(node: cst.CSTNode) -> Set[str]:
+    """
+    Returns the names used in node, other than attributes and keywords.
+    """
+    found: Set[str] = set()
+    todo = [node]
+    while todo:
+        n = todo.pop()
+        if isinstance(n, cst.Name):
+            found.add(n.value)
+        elif isinstance(n, cst.Attribute):
+            todo.append(n.value)
+        elif isinstance(n, cst.Arg):
+            todo.append(n.value)
+        else:
+            todo.extend(n.children)
+    return found
+
+
+def _receiver(node: cst.BaseExpression) -> Optional[str]:
+    """
+    Returns `x` for `x.y[0].append`, which a call to it can change.
+    """
+    while isinstance(node, (cst.Attribute, cst.Subscript, cst.Call)):
+        node = node.value if not isinstance(node, cst.Call) else node.func
+    return node.value if isinstance(node, cst.Name) else None
+
+
+class Dependencies(cst.CSTVisitor):
+    """
+    Which names the value of each name might depend on, going by where they're
+    used together.
+
+    Scopes are ignored, a function depends on everything in it (and what it's
+    called with) and its parameters on it, and calling a method on something
+    makes it depend on the arguments.  This is only ever too broad.
+    """
+
+    def __init__(self) -> None:
+        self.deps: Dict[str, Set[str]] = {}
+        # Names in enclosing conditions and loops
+        self._context: List[Set[str]] = []
+
+    def depends_on(self, names: Iterable[str], others: Iterable[str]) -> bool:
+        """
+        Returns whether any of names (or what they depend on) is in others.
+        """
+        others = set(others)
+        seen: Set[str] = set()
+        todo = list(names)
+        while todo:
+            name = todo.pop()
+            if name in seen:
+                continue
+            if name in others:
+                return True
+            seen.add(name)
+            todo.extend(self.deps.get(name, ()))
+        return False
+
+    def _bind(self, targets: Iterable[str], refs: Iterable[str]) -> None:
+        refs = set(refs).union(*self._context)
+        for t in targets:
+            self.deps.setdefault(t, set()).update(refs)
+
+    def visit_Assign(self, node: cst.Assign) -> None:
+        for t in node.targets:
+            self._bind(names_in(t.target), names_in(node.value))
+
+    def visit_AugAssign(self, node: cst.AugAssign) -> None:
+        self._bind(names_in(node.target), names_in(node.value))
+
+    def visit_AnnAssign(self, node: cst.AnnAssign) -> None:
+        if node.value is not None:
+            self._bind(names_in(node.target), names_in(node.value))
+
+    def visit_NamedExpr(self, node: cst.NamedExpr) -> None:
+        self._bind(names_in(node.target), names_in(node.value))
+
+    def visit_Call(self, node: cst.Call) -> None:
+        receiver = _receiver(node.func)
+        if receiver is not None:
+            refs = names_in(node.func)
+            for arg in node.args:
+                refs |= names_in(arg.value)
+            self._bind([receiver], refs)
+
+    def visit_FunctionDef(self, node: cst.FunctionDef) -> None:
+        self._bind([node.name.value], names_in(node))
+        params = node.params
+        for p in (*params.posonly_params, *params.params, *params.kwonly_params):
+            self._bind([p.name.value], [node.name.value])
+        for star in (params.star_arg, params.star_kwarg):
+            if isinstance(star, cst.Param):
+                self._bind([star.name.value], [node.name.value])
+
+    def visit_ClassDef(self, node: cst.ClassDef) -> None:
+        self._bind([node.name.value], names_in(node))
+
+    def visit_For(self, node: cst.For) -> None:
+        self._bind(names_in(node.target), names_in(node.iter))
+        self._context.append(names_in(node.iter))
+
+    def leave_For(self, original_node: cst.For) -> None:
+        self._context.pop()
+
+    def visit_If(self, node: cst.If) -> None:
+        self._context.append(names_in(node.test))
+
+    def leave_If(self, original_node: cst.If) -> None:
+        self._context.pop()
+
+    def visit_While(self, node: cst.While) -> None:
+        self._context.append(names_in(node.test))
+
+    def leave_While(self, original_node: cst.While) -> None:
+        self._context.pop()
+
+    def visit_With(self, node: cst.With) -> None:
+        refs: Set[str] = set()
+        for item in node.items:
+            refs |= names_in(item.item)
+            if item.asname is not None:
+                self._bind(names_in(item.asname.name), names_in(item.item))
+        self._context.append(refs)
+
+    def leave_With(self, original_node: cst.With) -> None:
+        self._context.pop()
@@ -230,6 +230,12 @@ SETUP_ARGS = [
         SetupCfg("options.packages.find", "include", writer_cls=ListCommaWriter),
         sample_value=None,
     ),
+    # setuptools_scm, see dowsing.scm
+    ConfigField(
+        "use_scm_version",
+        SetupCfg("--unused--", "--unused--"),
+        sample_value=None,
+    ),
     ConfigField(
         "pbr",
         SetupCfg("--unused--", "--unused--"),
@@ -1,19 +1,19 @@
-from pathlib import Path
 from typing import Any, Dict
 
 import imperfect
 
-from ..types import Distribution
+from ..types import Confidence, Distribution, ProjectPath
 from .setup_and_metadata import SETUP_ARGS
 from .types import SectionWriter
 
 
-def from_setup_cfg(path: Path, markers: Dict[str, Any]) -> Distribution:
+def from_setup_cfg(path: ProjectPath, markers: Dict[str, Any]) -> Distribution:
 
     cfg = imperfect.parse_string((path / "setup.cfg").read_text())
 
     d = Distribution()
     d.metadata_version = "2.1"
+    confidence: Dict[str, Confidence] = {}
 
     for field in SETUP_ARGS:
         name = field.get_distribution_key()
@@ -41,4 +41,9 @@ def from_setup_cfg(path: Path, markers: Dict[str, Any]) -> Distribution:
             parsed = cls().from_ini(raw_data)
 
         setattr(d, name, parsed)
+        # These refer to other files or code; see directives.py
+        if isinstance(parsed, str) and parsed.startswith(("attr:", "file:")):
+            confidence[name] = Confidence.UNKNOWN
+
+    d.confidence = confidence
     return d
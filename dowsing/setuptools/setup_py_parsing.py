@@ -2,33 +2,62 @@
 This is mostly compatible with pkginfo's metadata classes.
 """
 
+import ast
+import functools
+import hashlib
 import logging
+import operator
+import posixpath
 from dataclasses import dataclass
-from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
 
 import libcst as cst
+from libcst.helpers import get_full_name_for_node_or_raise
 from libcst.metadata import (
     ParentNodeProvider,
     PositionProvider,
     QualifiedNameProvider,
+    QualifiedNameSource,
     ScopeProvider,
 )
 
-from ..types import Distribution
+from ..cache import FILE_CACHE, FileCache, FileTooLarge, SUMMARY_CACHE, SummaryCache
+from ..markers import (
+    and_,
+    conjoin,
+    Dnf,
+    FALSE,
+    flatten_extras,
+    flatten_requirements,
+    not_,
+    or_,
+    TRUE,
+)
+from ..types import (
+    Condition,
+    Confidence,
+    Distribution,
+    has_sometimes,
+    ProjectPath,
+    Sometimes,
+    Span,
+    TooComplicated,
+)
+from . import folding, legacy
 from .setup_and_metadata import SETUP_ARGS
 
 LOG = logging.getLogger(__name__)
 
 
-def from_setup_py(path: Path, markers: Dict[str, Any]) -> Distribution:
+def from_setup_py(path: ProjectPath, markers: Dict[str, Any]) -> Distribution:
     """
     Reads setup.py (and possibly some imports).
 
-    Will not actually "run" the code but will evaluate some conditions based on
-    the markers you provide, since much real-world setup.py checks things like
-    version, platform, or even `sys.argv` to come up with what it passes to
-    `setup()`.
+    Will not actually "run" the code but will evaluate both sides of conditions
+    it recognizes, since much real-world setup.py checks things like version,
+    platform, or even `sys.argv` to come up with what it passes to `setup()`.
+    Requirements come out with the equivalent markers; other values that
+    differ are `Sometimes`.
 
     There should be some other class to read pyproject.toml.
 
@@ -36,8 +65,8 @@ def from_setup_py(path: Path, markers: Dict[str, Any]) -> Distribution:
     it.
     """
 
-    # TODO: This does not take care of encodings or py2 syntax.
-    module = cst.parse_module((path / "setup.py").read_text())
+    text = legacy.decode((path / "setup.py").read_bytes())
+    module, dropped = legacy.parse_module(text)
 
     # TODO: This is not a good example of LibCST integration.  The right way to
     # do this is with a scope provider and transformer, and perhaps multiple
@@ -46,12 +75,25 @@ def from_setup_py(path: Path, markers: Dict[str, Any]) -> Distribution:
     d = Distribution()
     d.metadata_version = "2.1"
 
-    analyzer = SetupCallAnalyzer()
-    wrapper = cst.MetadataWrapper(module)
-    wrapper.visit(analyzer)
+    analyzer = SetupCallAnalyzer(root=path)
+    cst.MetadataWrapper(module).visit(analyzer)
+    dependencies = legacy.Dependencies()
+    if dropped:
+        module.visit(dependencies)
+    # Nothing below holds on to the tree (or the metadata maps computed for it),
+    # so let it go before doing anything else.
+    del module
     if not analyzer.found_setup:
         raise SyntaxError("No simple setup call found")
 
+    # Python 2 statements that couldn't be read might have changed what
+    # they mention, and so anything that depends on those.
+    changed: Set[str] = set().union(*dropped.values())
+    if dropped:
+        LOG.debug("Dropped unparseable statements on lines %s", sorted(dropped))
+
+    provenance: Dict[str, Span] = {}
+    confidence: Dict[str, Confidence] = {}
     for field in SETUP_ARGS:
         name = field.get_distribution_key()
         if not hasattr(d, name):
@@ -60,28 +102,180 @@ def from_setup_py(path: Path, markers: Dict[str, Any]) -> Distribution:
         if field.keyword in analyzer.saved_args:
             v = analyzer.saved_args[field.keyword]
             if isinstance(v, Literal):
-                setattr(d, name, v.value)
+                value = v.value
+                # Requirements can say when they apply themselves, so they get
+                # markers instead of staying Sometimes.
+                if has_sometimes(value) and field.keyword in REQUIREMENT_KEYWORDS:
+                    value = flatten_requirements(value)
+                    confidence[name] = Confidence.SOMETIMES
+                elif has_sometimes(value) and field.keyword == "extras_require":
+                    value = flatten_extras(value)
+                    confidence[name] = Confidence.SOMETIMES
+                setattr(d, name, value)
+                if v.span is not None:
+                    provenance[name] = v.span
             else:
-                LOG.warning(f"Want to save {field.keyword} but is {type(v)}")
+                setattr(d, name, TooComplicated(f"{field.keyword} is {type(v)}"))
+            mentions = analyzer.arg_names.get(field.keyword, ())
+            if dependencies.depends_on(mentions, changed):
+                confidence[name] = Confidence.UNKNOWN
 
+    d.provenance = provenance
+    d.confidence = confidence
+    d.input_files = tuple(analyzer.input_files)
+    if analyzer.opaque_kwargs or dependencies.depends_on(
+        analyzer.star_arg_names, changed
+    ):
+        # Any field could have come from there.
+        d.default_confidence = Confidence.UNKNOWN
     return d
 
 
-@dataclass
-class TooComplicated:
-    reason: str
+def import_value(
+    path: ProjectPath,
+    dotted: str,
+    import_roots: Optional[Sequence[str]] = None,
+    file_cache: FileCache = FILE_CACHE,
+    summary_cache: SummaryCache = SUMMARY_CACHE,
+) -> Tuple[Any, List[str]]:
+    """
+    Returns what `from module import name` would get for `module.name` in the
+    project, without running it, and the files that were read.
+    """
+    analyzer = SetupCallAnalyzer("setup.cfg", path, file_cache, summary_cache)
+    if import_roots is not None:
+        analyzer.IMPORT_ROOTS = tuple(import_roots)
+    value = analyzer._import_value(dotted)
+    if value is None:
+        value = TooComplicated(f"{dotted} isn't in the project")
+    return value, analyzer.input_files
 
 
-@dataclass
-class Sometimes:
-    # TODO list of 'when' and 'else'
-    pass
+REQUIREMENT_KEYWORDS = ("install_requires", "setup_requires", "tests_require")
+
+OPEN_FUNCTIONS = ("builtins.open", "io.open", "codecs.open")
+
+# Statements in these run an unknown number of times, if at all.
+UNKNOWN_BLOCKS = (cst.For, cst.While, cst.Try, cst.ExceptHandler)
+
+FIND_FUNCTIONS = ("setuptools.find_packages", "setuptools.find_namespace_packages")
+
+# Methods that change a list or dict in place; the ones not in
+# SUPPORTED_MUTATIONS make the value unknown.
+MUTATING_METHODS = frozenset(
+    {
+        "append",
+        "extend",
+        "insert",
+        "update",
+        "remove",
+        "pop",
+        "popitem",
+        "clear",
+        "setdefault",
+        "sort",
+        "reverse",
+    }
+)
+
+COMPARISON_OPS = {
+    cst.Equal: "==",
+    cst.NotEqual: "!=",
+    cst.LessThan: "<",
+    cst.LessThanEqual: "<=",
+    cst.GreaterThan: ">",
+    cst.GreaterThanEqual: ">=",
+    cst.In: "in",
+    cst.NotIn: "not in",
+}
+
+# For when the environment is on the right: `"win32" == sys.platform`
+SWAPPED_OPS = {"<": ">", "<=": ">=", ">": "<", ">=": "<=", "==": "==", "!=": "!="}
+
+PYTHON_OPS: Dict[str, Callable[[Any, Any], Any]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda a, b: a in b,
+    "not in": lambda a, b: a not in b,
+}
+
+# qualified name -> PEP 508 variable, for things compared to strings
+ENVIRONMENT_NAMES = {
+    "sys.platform": "sys_platform",
+    "os.name": "os_name",
+}
+ENVIRONMENT_CALLS = {
+    "platform.system": "platform_system",
+    "platform.machine": "platform_machine",
+    "platform.python_implementation": "platform_python_implementation",
+}
+
+# sys.platform.startswith(x) -> what sys.platform is, on the python versions
+# that setup.py files check for
+PLATFORM_PREFIXES = {
+    "linux": "linux",
+    "win": "win32",
+    "win32": "win32",
+    "darwin": "darwin",
+    "cygwin": "cygwin",
+    "aix": "aix",
+}
+
+CONSTANT_CONDITIONS: Dict[str, Dnf] = {
+    "six.PY2": ((("python_version", "<", "3"),),),
+    "six.PY3": ((("python_version", ">=", "3"),),),
+}
+
+
+def _version_condition(
+    prefix: Optional[int], op: str, value: Tuple[int, ...]
+) -> Optional[Dnf]:
+    """
+    Returns the condition for `sys.version_info[:prefix] <op> value`, where a
+    prefix of None is all of sys.version_info.
+    """
+    n = len(value)
+    if prefix is None or prefix > n:
+        # Longer tuples compare like their first n items, except that they're
+        # never equal.
+        if op == "==":
+            return FALSE
+        elif op == "!=":
+            return TRUE
+        op = {">": ">=", "<=": "<"}.get(op, op)
+    elif prefix < n:
+        return None
+
+    if n == 1:
+        below = ("python_version", "<", str(value[0]))
+        at_least = ("python_version", ">=", str(value[0]))
+        above = ("python_version", ">=", str(value[0] + 1))
+        not_above = ("python_version", "<", str(value[0] + 1))
+        table: Dict[str, Dnf] = {
+            "<": ((below,),),
+            "<=": ((not_above,),),
+            ">": ((above,),),
+            ">=": ((at_least,),),
+            "==": ((at_least, not_above),),
+            "!=": ((below,), (above,)),
+        }
+        return table.get(op)
+    elif n == 2:
+        return ((("python_version", op, f"{value[0]}.{value[1]}"),),)
+    elif n == 3:
+        return ((("python_full_version", op, ".".join(map(str, value))),),)
+    return None
 
 
 @dataclass
 class Literal:
     value: Any
-    cst_node: Optional[cst.CSTNode]
+    # The `setup()` arg it came from; for `**kwargs` this is the whole `**` arg.
+    span: Optional[Span]
 
 
 @dataclass
@@ -89,28 +283,66 @@ class FindPackages:
     where: Any = None
     exclude: Any = None
     include: Any = None
+    # find_namespace_packages, which doesn't need __init__.py
+    namespaces: bool = False
 
 
+@dataclass
+class ModuleSummary:
+    """
+    The values of a module's top-level names, as far as they could be worked
+    out, and what was read to get them.
+    """
+
+    values: Dict[str, Any]
+    input_files: List[str]
+
+
+@dataclass
 class FileReference:
-    def __init__(self, filename: str) -> None:
-        self.filename = filename
+    """
+    A path from `open()` or `pathlib.Path`, relative to the project root, which
+    is the current directory when setup.py runs.
+    """
+
+    filename: str
+    binary: bool = False
+    encoding: str = "utf-8"
 
 
 class SetupCallTransformer(cst.CSTTransformer):
-    METADATA_DEPENDENCIES = (ScopeProvider, ParentNodeProvider, QualifiedNameProvider)
+    METADATA_DEPENDENCIES = (
+        ScopeProvider,
+        ParentNodeProvider,
+        QualifiedNameProvider,
+        PositionProvider,
+    )
 
     def __init__(
         self,
-        call_node: cst.CSTNode,
+        call_node: Union[cst.CSTNode, Span],
         keywords_to_change: Dict[str, Optional[cst.CSTNode]],
     ) -> None:
+        # call_node can be the `setup_span` from SetupCallAnalyzer, in which case
+        # this needs to be run through a MetadataWrapper to match on position.
         self.call_node = call_node
         self.keywords_to_change = keywords_to_change
 
+    def _is_target(self, node: cst.Call) -> bool:
+        if isinstance(self.call_node, Span):
+            pos = self.get_metadata(PositionProvider, node)
+            return (
+                pos.start.line,
+                pos.start.column,
+                pos.end.line,
+                pos.end.column,
+            ) == tuple(self.call_node[1:])
+        return node == self.call_node
+
     def leave_Call(
         self, original_node: cst.Call, updated_node: cst.Call
     ) -> cst.BaseExpression:
-        if original_node == self.call_node:
+        if self._is_target(original_node):
             new_args = []
             for arg in updated_node.args:
                 if isinstance(arg.keyword, cst.Name):
@@ -138,19 +370,141 @@ class SetupCallAnalyzer(cst.CSTVisitor):
 
     # TODO names resulting from other than 'from setuptools import setup'
     # TODO wrapper funcs that modify args
-    # TODO **args
-    def __init__(self) -> None:
+    # How deep imports (and exec) are followed from setup.py.
+    MAX_IMPORT_DEPTH = 3
+    # How deep calls to functions in setup.py are followed.
+    MAX_CALL_DEPTH = 5
+    # Where top-level packages can be, relative to the project root.
+    IMPORT_ROOTS: Tuple[str, ...] = ("", "src")
+
+    def __init__(
+        self,
+        filename: str = "setup.py",
+        root: Optional[ProjectPath] = None,
+        file_cache: FileCache = FILE_CACHE,
+        summary_cache: SummaryCache = SUMMARY_CACHE,
+        package: str = "",
+        summarize: bool = False,
+        importing: Tuple[str, ...] = (),
+    ) -> None:
         super().__init__()
-        # TODO Union[TooComplicated, Sometimes, Literal, FileReference]
+        self.filename = filename
+        # Files are only read when this is set.
+        self.root = root
+        self.file_cache = file_cache
+        self.summary_cache = summary_cache
+        # What relative imports are relative to.
+        self.package = package
+        # When set, this is analyzing an imported module rather than setup.py,
+        # and `summary` is filled in at the end.
+        self.summarize = summarize
+        self.summary: Optional[ModuleSummary] = None
+        # The files being imported, to stop at cycles and MAX_IMPORT_DEPTH.
+        self.importing = importing
+        # Whether the summary can be reused for another file with the same
+        # source; not when it depends on where the file is or what's around it.
+        self.portable = True
+        # Relative paths of every file that was (or would have been) read.
+        self.input_files: List[str] = []
+        # Top-level `exec(code)` statements
+        self.exec_calls: List[cst.Call] = []
+        # Values of the parameters of the functions being evaluated.
+        self.arguments: Dict[cst.Param, Any] = {}
+        self.call_depth = 0
+        # Values of the targets of the comprehensions being evaluated.
+        self.iteration: Dict[cst.CSTNode, Any] = {}
+        self._modules: Dict[str, Optional[Tuple[str, bool]]] = {}
+        self._summaries: Dict[Tuple[str, str, str], ModuleSummary] = {}
+        # TODO Union[TooComplicated, Sometimes, Literal]
         self.saved_args: Dict[str, Any] = {}
         self.found_setup = False
-        self.setup_node: Optional[cst.CSTNode] = None
+        # Set when there's a `**kwargs` we can't see into.
+        self.opaque_kwargs = False
+        # The names each `setup()` arg mentions, and all of the `**` ones
+        self.arg_names: Dict[str, Set[str]] = {}
+        self.star_arg_names: Set[str] = set()
+        # Where the expression being evaluated runs; names are only looked up
+        # in assignments that can happen under the same conditions.
+        self.context: Dnf = TRUE
+        # Only positions are kept, so that the tree can be freed once the visit
+        # is done.
+        self.setup_span: Optional[Span] = None
+
+    def _span(self, node: cst.CSTNode) -> Span:
+        pos = self.get_metadata(PositionProvider, node)
+        return Span(
+            self.filename,
+            pos.start.line,
+            pos.start.column,
+            pos.end.line,
+            pos.end.column,
+        )
+
+    def visit_Module(self, node: cst.Module) -> None:
+        todo: List[cst.CSTNode] = list(node.body)
+        while todo:
+            statement = todo.pop(0)
+            if isinstance(statement, cst.SimpleStatementLine):
+                for small in statement.body:
+                    if (
+                        isinstance(small, cst.Expr)
+                        and isinstance(small.value, cst.Call)
+                        and self._callee(small.value) == "builtins.exec"
+                        and len(small.value.args) == 1
+                    ):
+                        self.exec_calls.append(small.value)
+            elif isinstance(statement, (cst.If, cst.With, cst.Try, cst.Else)):
+                # `with open(...) as f: exec(f.read())` and the like
+                todo.extend(statement.body.body)
+                if isinstance(statement, cst.If) and statement.orelse:
+                    todo.append(statement.orelse)
+                if isinstance(statement, cst.Try) and statement.orelse:
+                    todo.append(statement.orelse)
+
+    def leave_Module(self, original_node: cst.Module) -> None:
+        if not self.summarize:
+            return
+        # Only simple top-level assignments and imports; functions and classes
+        # would need much more than this to be useful.
+        targets: Dict[str, Union[cst.Name, str]] = {}
+        for statement in original_node.body:
+            if not isinstance(statement, cst.SimpleStatementLine):
+                continue
+            for small in statement.body:
+                if isinstance(small, cst.Assign):
+                    for t in small.targets:
+                        if isinstance(t.target, cst.Name):
+                            targets[t.target.value] = t.target
+                elif isinstance(small, cst.ImportFrom) and not isinstance(
+                    small.names, cst.ImportStar
+                ):
+                    module = "." * len(small.relative)
+                    if small.module is not None:
+                        module += get_full_name_for_node_or_raise(small.module)
+                    for alias in small.names:
+                        n = alias.asname.name if alias.asname else alias.name
+                        if isinstance(n, cst.Name):
+                            dotted = get_full_name_for_node_or_raise(alias.name)
+                            sep = "" if module.endswith(".") else "."
+                            targets[n.value] = module + sep + dotted
+
+        scope = self.get_metadata(ScopeProvider, original_node)
+        values = {}
+        for name, target in targets.items():
+            if isinstance(target, str):
+                value = self._import_value(target)
+                if value is None:
+                    value = TooComplicated(f"{target} isn't from the project")
+                values[name] = value
+            else:
+                values[name] = self.evaluate_in_scope(target, scope)
+        self.summary = ModuleSummary(values, self.input_files)
 
     def visit_Call(self, node: cst.Call) -> Optional[bool]:
         names = self.get_metadata(QualifiedNameProvider, node)
         # TODO sometimes there is more than one setup call, we might
         # prioritize/merge...
-        if any(
+        if not self.summarize and any(
             q.name
             in (
                 "setuptools.setup",
@@ -161,26 +515,40 @@ class SetupCallAnalyzer(cst.CSTVisitor):
             for q in names
         ):
             self.found_setup = True
-            self.setup_node = node
+            self.setup_span = self._span(node)
             scope = self.get_metadata(ScopeProvider, node)
+            # Only what happens before the call matters.
+            line = self.setup_span.start_line
+            # In a wrapper like `def main(**kwargs): setup(**kwargs)`, the
+            # parameters come from where that's called.
+            function = self._enclosing_function(node)
+            if function is not None:
+                self.arguments = self._bindings_for(function)
             for arg in node.args:
-                # TODO **kwargs
                 if isinstance(arg.keyword, cst.Name):
                     key = arg.keyword.value
-                    value = self.evaluate_in_scope(arg.value, scope)
-                    self.saved_args[key] = Literal(value, arg)
+                    value = self.evaluate_in_scope(arg.value, scope, line)
+                    self.saved_args[key] = Literal(value, self._span(arg))
+                    self.arg_names[key] = legacy.names_in(arg.value)
                 elif arg.star == "**":
                     # kwargs
-                    d = self.evaluate_in_scope(arg.value, scope)
+                    self.star_arg_names |= legacy.names_in(arg.value)
+                    d = self.evaluate_in_scope(arg.value, scope, line)
+                    if isinstance(d, Sometimes) and all(
+                        isinstance(v, dict) for _, v in d.options
+                    ):
+                        d = _split_dicts(d)
                     if isinstance(d, dict):
+                        span = self._span(arg)
                         for k, v in d.items():
-                            self.saved_args[k] = Literal(v, None)
+                            self.saved_args[k] = Literal(v, span)
+                            self.arg_names[k] = legacy.names_in(arg.value)
                     else:
-                        # GRR
-                        pass
+                        self.opaque_kwargs = True
                 else:
                     raise ValueError(repr(arg))
 
+            self.arguments = {}
             return False
 
         return None
@@ -193,30 +561,68 @@ class SetupCallAnalyzer(cst.CSTVisitor):
     ) -> Any:
         qnames = self.get_metadata(QualifiedNameProvider, item)
 
+        if (
+            isinstance(item, (cst.Name, cst.Attribute))
+            and qnames
+            and all(q.source == QualifiedNameSource.IMPORT for q in qnames)
+        ):
+            # From a module in the project, like `from foo import __version__`
+            imported = self._import_value(min(q.name for q in qnames))
+            if imported is not None:
+                return imported
+
         if isinstance(item, cst.SimpleString):
             return item.evaluated_value
-        elif isinstance(item, (cst.Integer, cst.Float)):
-            return int(item.value)
+        elif isinstance(item, cst.Integer):
+            return int(item.value, 0)
+        elif isinstance(item, cst.Float):
+            return float(item.value)
+        elif isinstance(item, cst.ConcatenatedString):
+            lhs = self.evaluate_in_scope(item.left, scope, target_line)
+            rhs = self.evaluate_in_scope(item.right, scope, target_line)
+            return self._lift(_add, lhs, rhs)
+        elif isinstance(item, cst.FormattedString):
+            return self._format(item.start, item.parts, scope, target_line)
         elif isinstance(item, cst.Name) and item.value in self.BOOL_NAMES:
             return self.BOOL_NAMES[item.value]
+        elif isinstance(item, cst.Name) and item.value == "__file__":
+            self.portable = False
+            return self.filename
         elif isinstance(item, cst.Name):
             name = item.value
             assignments = scope[name]
             assignment_nodes = sorted(
-                (
+                [
                     (self.get_metadata(PositionProvider, a.node).start.line, a.node)
                     for a in assignments
                     if a.node
-                ),
+                ]
+                + self._execs(scope),
+                key=lambda x: x[0],
                 reverse=True,
             )
             # Walk assignments from bottom to top, evaluating them recursively.
+            # Each one is the value when its own condition holds and none of
+            # those below did.
+            remaining = self.context
+            options: List[Tuple[Condition, Any]] = []
             for lineno, node in assignment_nodes:
+                if node in self.iteration:
+                    # The target of a comprehension; see _comprehension
+                    return self.iteration[node]
 
                 # When recursing, only look at assignments above the "target line".
                 if target_line and lineno >= target_line:
                     continue
 
+                if isinstance(node, cst.Param):
+                    # Nothing in the function comes before its parameters.
+                    result = self._argument(node)
+                    if isinstance(result, TooComplicated) and not options:
+                        return result
+                    options.extend(_options(result, remaining))
+                    break
+
                 # Assign(
                 #   targets=[AssignTarget(target=Name(value="v"))],
                 #   value=SimpleString(value="'x'"),
@@ -228,42 +634,80 @@ class SetupCallAnalyzer(cst.CSTVisitor):
                 #   value=SimpleString(value="'x'"),
                 # )
                 #
-                # TODO or an import...
                 # TODO builtins have BuiltinAssignment
 
-                try:
-                    if node:
-                        parent = self.get_metadata(ParentNodeProvider, node)
-                        if parent:
-                            gp = self.get_metadata(ParentNodeProvider, parent)
+                # This presumes a single assignment
+                statement: cst.CSTNode
+                value: cst.CSTNode
+                is_exec = isinstance(node, cst.Call)
+                if is_exec:
+                    # exec(code), which can set any name; see _execs
+                    statement, value = node, node.args[0].value
+                else:
+                    try:
+                        if node:
+                            parent = self.get_metadata(ParentNodeProvider, node)
+                            if parent:
+                                gp = self.get_metadata(ParentNodeProvider, parent)
+                            else:
+                                raise KeyError
                         else:
                             raise KeyError
-                    else:
-                        raise KeyError
-                except (KeyError, AttributeError):
-                    continue
+                    except (KeyError, AttributeError):
+                        continue
 
-                try:
-                    scope = self.get_metadata(ScopeProvider, gp)
-                except KeyError:
-                    # module scope isn't in the dict
-                    continue
+                    try:
+                        scope = self.get_metadata(ScopeProvider, gp)
+                    except KeyError:
+                        # module scope isn't in the dict
+                        continue
 
-                # This presumes a single assignment
-                if isinstance(gp, cst.Assign) and len(gp.targets) == 1:
-                    result = self.evaluate_in_scope(gp.value, scope, lineno)
-                elif isinstance(parent, cst.AugAssign):
-                    result = self.evaluate_in_scope(parent, scope, lineno)
-                else:
-                    # too complicated?
-                    continue
+                    if isinstance(gp, cst.Assign) and len(gp.targets) == 1:
+                        statement, value = gp, gp.value
+                    elif isinstance(parent, cst.AugAssign):
+                        statement, value = parent, parent
+                    elif isinstance(gp, cst.WithItem):
+                        # with open(...) as f:
+                        statement, value = gp, gp.item
+                    else:
+                        # too complicated?
+                        continue
 
-                # keep trying assignments until we get something other than ??
-                if result != "??":
-                    return result
+                try:
+                    cond = self._statement_condition(statement, scope, lineno)
+                    if cond is None:
+                        return TooComplicated(f"{name} is set where it might not run")
+                    if isinstance(value, cst.Name) and self._mutations(
+                        value.value, scope, lineno, target_line
+                    ):
+                        # name = other, then other.append(x)
+                        return TooComplicated(f"{name} is changed through an alias")
+                    here = and_(remaining, cond)
+                    if not here:
+                        continue
+                    result = self._evaluate_under(here, value, scope, lineno)
+                    if is_exec:
+                        result = self._lift(
+                            lambda code: self._exec_value(code, name), result
+                        )
+                    result = self._apply_mutations(
+                        name, scope, lineno, target_line, here, result
+                    )
+                    # keep trying assignments until we get something we
+                    # understand
+                    if isinstance(result, TooComplicated):
+                        continue
+                    options.extend(_options(result, here))
+                    remaining = and_(remaining, not_(cond))
+                except ValueError:
+                    return TooComplicated(f"conditions for {name} are too complicated")
+                if not remaining:
+                    break
 
+            if options:
+                return self._merge(options)
             # give up
-            return "??"
+            return TooComplicated(f"can't evaluate {name}")
         elif isinstance(item, (cst.Tuple, cst.List)):
             lst = []
             for el in item.elements:
@@ -279,7 +723,7 @@ class SetupCallAnalyzer(cst.CSTVisitor):
             else:
                 return lst
         elif isinstance(item, cst.Call) and any(
-            q.name == "setuptools.find_packages" for q in qnames
+            q.name in FIND_FUNCTIONS for q in qnames
         ):
             default_args = [".", (), ("*",)]
             args = default_args.copy()
@@ -296,74 +740,1433 @@ class SetupCallAnalyzer(cst.CSTVisitor):
                     i += 1
 
             # TODO clear ones that are still default
-            return FindPackages(*args)
+            namespaces = any(
+                q.name == "setuptools.find_namespace_packages" for q in qnames
+            )
+            return FindPackages(args[0], args[1], args[2], namespaces)
         elif (
             isinstance(item, cst.Call)
             and isinstance(item.func, cst.Name)
             and item.func.value == "dict"
         ):
-            d = {}
+            d: Any = {}
             for arg in item.args:
                 if isinstance(arg.keyword, cst.Name):
-                    d[arg.keyword.value] = self.evaluate_in_scope(
-                        arg.value, scope, target_line
-                    )
-                # TODO something with **kwargs
+                    v = self.evaluate_in_scope(arg.value, scope, target_line)
+                    d = self._with_item(d, arg.keyword.value, v)
+                else:
+                    # dict(other) or dict(**other)
+                    other = self.evaluate_in_scope(arg.value, scope, target_line)
+                    d = self._lift(_update, d, other)
             return d
         elif isinstance(item, cst.Dict):
             d = {}
             for el2 in item.elements:
                 if isinstance(el2, cst.DictElement):
-                    d[self.evaluate_in_scope(el2.key, scope)] = self.evaluate_in_scope(
-                        el2.value, scope, target_line
-                    )
+                    k = self.evaluate_in_scope(el2.key, scope, target_line)
+                    v = self.evaluate_in_scope(el2.value, scope, target_line)
+                    d = self._with_item(d, k, v)
+                else:
+                    # {**other}
+                    other = self.evaluate_in_scope(el2.value, scope, target_line)
+                    d = self._lift(_update, d, other)
             return d
+        elif (
+            isinstance(item, cst.Call)
+            and isinstance(item.func, cst.Attribute)
+            and item.func.attr.value == "copy"
+            and not item.args
+        ):
+            value = self.evaluate_in_scope(item.func.value, scope, target_line)
+            return self._lift(_copy, value)
+        elif isinstance(item, cst.Call) and self._callee(item) in PURE_FUNCTIONS:
+            fn = PURE_FUNCTIONS[self._callee(item)]
+            call_args = self._positional_args(item, scope, target_line)
+            if isinstance(call_args, TooComplicated):
+                return call_args
+            return self._lift(fn, *call_args)
+        elif isinstance(item, cst.Call) and self._local_function(
+            item.func, scope, target_line
+        ):
+            function = self._local_function(item.func, scope, target_line)
+            assert function is not None
+            return self._call(function, item, scope, target_line)
+        elif isinstance(item, cst.Call) and self._callee(item) in OPEN_FUNCTIONS:
+            return self._open(item, scope, target_line)
+        elif isinstance(item, cst.Call) and isinstance(item.func, cst.Attribute):
+            receiver = self.evaluate_in_scope(item.func.value, scope, target_line)
+            arguments = self._arguments(item, scope, target_line)
+            if isinstance(arguments, TooComplicated):
+                return arguments
+            call_args, kwargs = arguments
+            method = item.func.attr.value
+            n = len(call_args)
+            return self._lift(
+                lambda r, *a: self._call_method(
+                    r, method, list(a[:n]), dict(zip(kwargs, a[n:]))
+                ),
+                receiver,
+                *call_args,
+                *kwargs.values(),
+            )
+        elif isinstance(item, cst.Attribute) and item.attr.value == "parent":
+            value = self.evaluate_in_scope(item.value, scope, target_line)
+            return self._lift(_parent, value)
         elif isinstance(item, cst.Subscript):
             lhs = self.evaluate_in_scope(item.value, scope, target_line)
-            if isinstance(lhs, str):
-                # A "??" entry, propagate
-                return "??"
-
-            # TODO: Figure out why this is Sequence
-            if isinstance(item.slice[0].slice, cst.Index):
-                rhs = self.evaluate_in_scope(
-                    item.slice[0].slice.value, scope, target_line
-                )
-                try:
-                    if isinstance(lhs, dict):
-                        return lhs.get(rhs, "??")
-                    else:
-                        return lhs[rhs]
-                except Exception:
-                    return "??"
-
-            else:
-                # LOG.warning(f"Omit2 {type(item.slice[0].slice)!r}")
-                return "??"
+            if len(item.slice) != 1:
+                return TooComplicated("multiple subscripts aren't supported")
+            index = item.slice[0].slice
+            if isinstance(index, cst.Index):
+                rhs = self.evaluate_in_scope(index.value, scope, target_line)
+                return self._lift(folding.subscript, lhs, rhs)
+            assert isinstance(index, cst.Slice)
+            bounds = [
+                None if x is None else self.evaluate_in_scope(x, scope, target_line)
+                for x in (index.lower, index.upper, index.step)
+            ]
+            return self._lift(folding.slice_, lhs, *bounds)
         elif isinstance(item, cst.BinaryOperation):
             lhs = self.evaluate_in_scope(item.left, scope, target_line)
             rhs = self.evaluate_in_scope(item.right, scope, target_line)
-            if lhs == "??" or rhs == "??":
-                return "??"
-            if isinstance(item.operator, cst.Add):
-                try:
-                    return lhs + rhs
-                except Exception:
-                    return "??"
+            op = type(item.operator).__name__
+            if op in BINARY_OPERATIONS:
+                return self._lift(BINARY_OPERATIONS[op], lhs, rhs)
             else:
-                return "??"
+                return TooComplicated(f"{op} isn't supported")
         elif isinstance(item, cst.AugAssign):
             lhs = self.evaluate_in_scope(item.target, scope, target_line)
             rhs = self.evaluate_in_scope(item.value, scope, target_line)
-            if lhs == "??" or rhs == "??":
-                return "??"
-            if isinstance(item.operator, cst.AddAssign):
+            op = type(item.operator).__name__[: -len("Assign")]
+            if op in BINARY_OPERATIONS and op != "Divide":
+                return self._lift(BINARY_OPERATIONS[op], lhs, rhs)
+            else:
+                return TooComplicated(f"{op}Assign isn't supported")
+        elif isinstance(item, cst.Comparison):
+            lhs = self.evaluate_in_scope(item.left, scope, target_line)
+            result = True
+            for target in item.comparisons:
+                op = type(target.operator).__name__
+                rhs = self.evaluate_in_scope(target.comparator, scope, target_line)
+                # a < b < c is a < b and b < c
+                this = self._lift(functools.partial(folding.compare, op), lhs, rhs)
+                result = self._lift(
+                    functools.partial(folding.boolean, "And"), result, this
+                )
+                lhs = rhs
+            return result
+        elif isinstance(item, cst.BooleanOperation):
+            lhs = self.evaluate_in_scope(item.left, scope, target_line)
+            rhs = self.evaluate_in_scope(item.right, scope, target_line)
+            op = type(item.operator).__name__
+            return self._lift(functools.partial(folding.boolean, op), lhs, rhs)
+        elif isinstance(item, cst.UnaryOperation):
+            value = self.evaluate_in_scope(item.expression, scope, target_line)
+            op = type(item.operator).__name__
+            return self._lift(functools.partial(folding.unary, op), value)
+        elif isinstance(item, (cst.ListComp, cst.GeneratorExp, cst.DictComp)):
+            return self._comprehension(item, target_line)
+        elif isinstance(item, cst.IfExp):
+            test = self._condition(item.test, scope, target_line)
+            if test is None:
+                # Not about the environment, but maybe something we can work
+                # out, like `x if x else y`.
+                value = self.evaluate_in_scope(item.test, scope, target_line)
+                if not folding.is_constant(value):
+                    return _unknown(value, "condition")
+                branch = item.body if value else item.orelse
+                return self.evaluate_in_scope(branch, scope, target_line)
+            try:
+                options = []
+                for cond, branch in ((test, item.body), (not_(test), item.orelse)):
+                    here = and_(self.context, cond)
+                    if here:
+                        result = self._evaluate_under(here, branch, scope, target_line)
+                        options.extend(_options(result, here))
+            except ValueError:
+                return TooComplicated("conditions are too complicated")
+            return self._merge(options)
+        else:
+            return TooComplicated(f"{type(item).__name__} isn't supported")
+
+    def _callee(self, item: cst.Call) -> str:
+        """
+        Returns the qualified name of the function item calls, when that's a
+        plain (dotted) name.
+        """
+        node = item.func
+        while isinstance(node, cst.Attribute):
+            node = node.value
+        if not isinstance(node, cst.Name):
+            # libcst gives `open(f).read()` the name of open
+            return ""
+        names = self.get_metadata(QualifiedNameProvider, item.func, set())
+        return min((q.name for q in names), default="")
+
+    def _local_function(
+        self, func: cst.CSTNode, scope: Any, target_line: int
+    ) -> Optional[cst.FunctionDef]:
+        """
+        Returns the definition of func, if it's a function defined in setup.py
+        (the last definition above target_line, if there's more than one).
+        """
+        if not isinstance(func, cst.Name):
+            return None
+        try:
+            assignments = scope[func.value]
+        except Exception:
+            return None
+        best: Optional[Tuple[int, cst.CSTNode]] = None
+        for a in assignments:
+            if not isinstance(getattr(a, "node", None), cst.CSTNode):
+                continue
+            lineno = self.get_metadata(PositionProvider, a.node).start.line
+            if target_line and lineno >= target_line:
+                continue
+            if best is None or lineno > best[0]:
+                best = (lineno, a.node)
+        if best is not None and isinstance(best[1], cst.FunctionDef):
+            return best[1]
+        return None
+
+    def _enclosing_function(self, node: cst.CSTNode) -> Optional[cst.FunctionDef]:
+        while True:
+            try:
+                node = self.get_metadata(ParentNodeProvider, node)
+            except KeyError:
+                return None
+            if isinstance(node, cst.FunctionDef):
+                return node
+            if isinstance(node, (cst.Module, cst.ClassDef)):
+                return None
+
+    def _call(
+        self, function: cst.FunctionDef, call: cst.Call, scope: Any, target_line: int
+    ) -> Any:
+        """
+        Returns what calling a function in setup.py returns, for functions with
+        a single `return`.
+        """
+        if self.call_depth >= self.MAX_CALL_DEPTH:
+            return TooComplicated(f"calls to {function.name.value}() are too deep")
+        returns = _returns(function.body)
+        if len(returns) != 1:
+            return TooComplicated(
+                f"{function.name.value}() has {len(returns)} return statements"
+            )
+        bindings = self._bind(function, call, scope, target_line)
+        if isinstance(bindings, TooComplicated):
+            return bindings
+        if returns[0].value is None:
+            return None
+
+        saved = self.arguments
+        self.arguments = {**saved, **bindings}
+        self.call_depth += 1
+        try:
+            return self.evaluate_in_scope(
+                returns[0].value,
+                self.get_metadata(ScopeProvider, returns[0]),
+                self.get_metadata(PositionProvider, returns[0]).start.line,
+            )
+        finally:
+            self.call_depth -= 1
+            self.arguments = saved
+
+    def _bind(
+        self, function: cst.FunctionDef, call: cst.Call, scope: Any, target_line: int
+    ) -> Union[Dict[cst.Param, Any], TooComplicated]:
+        """
+        Returns the parameters of function that call passes, and their values.
+        """
+        positional: List[Any] = []
+        keywords: Dict[str, Any] = {}
+        for arg in call.args:
+            value = self.evaluate_in_scope(arg.value, scope, target_line)
+            if isinstance(arg.keyword, cst.Name):
+                keywords[arg.keyword.value] = value
+            elif arg.star == "*":
+                if not isinstance(value, (list, tuple)):
+                    return _unknown(value, "*args")
+                positional.extend(value)
+            elif arg.star == "**":
+                if isinstance(value, Sometimes) and all(
+                    isinstance(v, dict) for _, v in value.options
+                ):
+                    value = _split_dicts(value)
+                if not isinstance(value, dict):
+                    return _unknown(value, "**kwargs")
+                keywords.update(value)
+            else:
+                positional.append(value)
+
+        params = function.params
+        result: Dict[cst.Param, Any] = {}
+        for p in list(params.posonly_params) + list(params.params):
+            if positional:
+                result[p] = positional.pop(0)
+            elif p.name.value in keywords:
+                result[p] = keywords.pop(p.name.value)
+        if isinstance(params.star_arg, cst.Param):
+            result[params.star_arg] = tuple(positional)
+            positional = []
+        for p in params.kwonly_params:
+            if p.name.value in keywords:
+                result[p] = keywords.pop(p.name.value)
+        if isinstance(params.star_kwarg, cst.Param):
+            result[params.star_kwarg] = keywords
+            keywords = {}
+        if positional or keywords:
+            return TooComplicated(f"bad call to {function.name.value}()")
+        return result
+
+    def _bindings_for(
+        self, function: cst.FunctionDef, depth: int = 0
+    ) -> Dict[cst.Param, Any]:
+        """
+        Returns the parameters of function, from the one place it's called (if
+        there's only one).
+        """
+        if depth >= self.MAX_CALL_DEPTH:
+            return {}
+        scope = self.get_metadata(ScopeProvider, function, None)
+        if scope is None:
+            return {}
+        sites = []
+        for assignment in scope.assignments[function.name.value]:
+            if getattr(assignment, "node", None) is not function:
+                continue
+            # Unlike scope.accesses, this includes calls from other functions.
+            for access in assignment.references:
+                parent = self.get_metadata(ParentNodeProvider, access.node, None)
+                if isinstance(parent, cst.Call) and parent.func is access.node:
+                    sites.append(parent)
+        if len(sites) != 1:
+            return {}
+
+        outer = self._enclosing_function(sites[0])
+        saved = self.arguments
+        self.arguments = {} if outer is None else self._bindings_for(outer, depth + 1)
+        try:
+            bindings = self._bind(
+                function,
+                sites[0],
+                self.get_metadata(ScopeProvider, sites[0]),
+                self.get_metadata(PositionProvider, sites[0]).start.line,
+            )
+        finally:
+            self.arguments = saved
+        return {} if isinstance(bindings, TooComplicated) else bindings
+
+    def _argument(self, param: cst.Param) -> Any:
+        if param in self.arguments:
+            return self.arguments[param]
+        if param.default is not None:
+            function = self._enclosing_function(param)
+            assert function is not None
+            return self.evaluate_in_scope(
+                param.default,
+                self.get_metadata(ScopeProvider, function),
+                self.get_metadata(PositionProvider, function).start.line,
+            )
+        return TooComplicated(f"{param.name.value} isn't known")
+
+    def _execs(self, scope: Any) -> List[Tuple[int, cst.CSTNode]]:
+        return [
+            (self.get_metadata(PositionProvider, c).start.line, c)
+            for c in self.exec_calls
+            if self.get_metadata(ScopeProvider, c, None) is scope
+        ]
+
+    def _exec_value(self, code: Any, name: str) -> Any:
+        summary = self._exec_globals(code)
+        if isinstance(summary, TooComplicated):
+            return summary
+        return summary.get(name, TooComplicated(f"{name} isn't set by exec"))
+
+    def _exec_globals(self, code: Any) -> Any:
+        """
+        Returns the names that exec(code) sets, as a dict.
+        """
+        if not isinstance(code, str):
+            return _unknown(code, "exec")
+        summary = self._summarize(code, self.filename, self.package)
+        if isinstance(summary, TooComplicated):
+            return summary
+        return dict(summary.values)
+
+    def _find_module(self, dotted: str) -> Optional[Tuple[str, bool]]:
+        """
+        Returns (relative path, whether it's a package) for a module in the
+        project, or None.
+        """
+        if dotted not in self._modules:
+            self._modules[dotted] = None
+            if self.root is not None:
+                for base in self.IMPORT_ROOTS:
+                    d = posixpath.join(base, *dotted.split("."))
+                    for rel, is_package in (
+                        (d + "/__init__.py", True),
+                        (d + ".py", False),
+                    ):
+                        if (self.root / rel).is_file():
+                            self._modules[dotted] = (rel, is_package)
+                            break
+                    if self._modules[dotted]:
+                        break
+        return self._modules[dotted]
+
+    def _import_value(self, dotted: str) -> Any:
+        """
+        Returns the value of an imported name when it's from a module in the
+        project, or None when it isn't.
+        """
+        if dotted.startswith("."):
+            rest = dotted.lstrip(".")
+            up = len(dotted) - len(rest) - 1
+            package = self.package.split(".") if self.package else []
+            if not package or up >= len(package):
+                return None
+            dotted = ".".join(package[: len(package) - up] + [rest])
+
+        parts = dotted.split(".")
+        for i in range(len(parts) - 1, 0, -1):
+            module = ".".join(parts[:i])
+            found = self._find_module(module)
+            if found is None:
+                continue
+            rel, is_package = found
+            if rel == self.filename or rel in self.importing:
+                return TooComplicated(f"circular import of {module}")
+            if len(self.importing) >= self.MAX_IMPORT_DEPTH:
+                return TooComplicated(f"{module} is imported too deep")
+
+            text = self._read(FileReference(rel))
+            if not isinstance(text, str):
+                return _unknown(text, f"import of {module}")
+            summary = self._summarize(
+                text, rel, module if is_package else module.rpartition(".")[0]
+            )
+            if isinstance(summary, TooComplicated):
+                return summary
+            if parts[i] not in summary.values:
+                return TooComplicated(f"{parts[i]} isn't simply assigned in {rel}")
+            if i + 1 < len(parts):
+                return TooComplicated(f"attributes of {dotted} aren't supported")
+            return summary.values[parts[i]]
+        return None
+
+    def _summarize(
+        self, text: str, filename: str, package: str
+    ) -> Union[ModuleSummary, TooComplicated]:
+        """
+        Returns what's known about the top-level names that running text (as
+        filename, in package) would set.
+        """
+        digest = hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+        key = (digest, filename, package)
+        if key in self._summaries:
+            summary = self._summaries[key]
+        else:
+            cached = self.summary_cache.get(digest)
+            if cached is not None:
+                summary = cached
+            else:
+                try:
+                    module, dropped = legacy.parse_module(text)
+                except cst.ParserSyntaxError:
+                    return TooComplicated(f"{filename} can't be parsed")
+                if dropped:
+                    return TooComplicated(f"{filename} can't all be parsed")
+                sub = SetupCallAnalyzer(
+                    filename,
+                    self.root,
+                    self.file_cache,
+                    self.summary_cache,
+                    package,
+                    summarize=True,
+                    importing=self.importing + (self.filename,),
+                )
+                cst.MetadataWrapper(module).visit(sub)
+                assert sub.summary is not None
+                summary = sub.summary
+                if sub.portable:
+                    self.summary_cache.put(digest, summary)
+                else:
+                    self.portable = False
+            self._summaries[key] = summary
+
+        for f in summary.input_files:
+            if f not in self.input_files:
+                self.input_files.append(f)
+        return summary
+
+    def _arguments(
+        self, item: cst.Call, scope: Any, target_line: int
+    ) -> Union[Tuple[List[Any], Dict[str, Any]], TooComplicated]:
+        args = []
+        kwargs = {}
+        for arg in item.args:
+            if arg.star:
+                return TooComplicated("* and ** args aren't supported")
+            value = self.evaluate_in_scope(arg.value, scope, target_line)
+            if arg.keyword is not None:
+                kwargs[arg.keyword.value] = value
+            else:
+                args.append(value)
+        return args, kwargs
+
+    def _format(
+        self,
+        start: str,
+        parts: Sequence[cst.BaseFormattedStringContent],
+        scope: Any,
+        target_line: int,
+    ) -> Any:
+        """
+        Evaluates the parts of an f-string (or of a format spec in one).
+        """
+        result: Any = ""
+        for part in parts:
+            value: Any
+            if isinstance(part, cst.FormattedStringText):
+                value = _string_text(start, part.value)
+            else:
+                assert isinstance(part, cst.FormattedStringExpression)
+                inner = self.evaluate_in_scope(part.expression, scope, target_line)
+                spec = self._format(start, part.format_spec or (), scope, target_line)
+                value = self._lift(
+                    functools.partial(
+                        folding.format_value, conversion=part.conversion or ""
+                    ),
+                    inner,
+                    spec,
+                )
+            result = self._lift(_add, result, value)
+        return result
+
+    def _comprehension(
+        self,
+        item: Union[cst.ListComp, cst.GeneratorExp, cst.DictComp],
+        target_line: int,
+    ) -> Any:
+        """
+        Runs a list (or dict) comprehension, when what it iterates over is
+        known.  Generator expressions become lists.
+        """
+        items: List[Any] = []
+        budget = [folding.MAX_ITERATIONS]
+
+        def run(comp: cst.CompFor) -> Optional[TooComplicated]:
+            if comp.asynchronous:
+                return TooComplicated("async comprehensions aren't supported")
+            iterable = self.evaluate_in_scope(
+                comp.iter, self.get_metadata(ScopeProvider, comp.iter), target_line
+            )
+            values = folding.iterate(iterable)
+            if isinstance(values, TooComplicated):
+                return values
+            for value in values:
+                budget[0] -= 1
+                if budget[0] < 0:
+                    return TooComplicated("comprehension is too long")
+                bound = self._bind_target(comp.target, value)
+                if isinstance(bound, TooComplicated):
+                    return bound
+                keep: Any = True
+                for test in comp.ifs:
+                    keep = self._element(test.test, target_line)
+                    if not folding.is_constant(keep):
+                        return _unknown(keep, "comprehension condition")
+                    if not keep:
+                        break
+                if not keep:
+                    continue
+                if comp.inner_for_in is not None:
+                    problem = run(comp.inner_for_in)
+                    if problem is not None:
+                        return problem
+                elif isinstance(item, cst.DictComp):
+                    items.append(
+                        (
+                            self._element(item.key, target_line),
+                            self._element(item.value, target_line),
+                        )
+                    )
+                else:
+                    items.append(self._element(item.elt, target_line))
+            return None
+
+        saved = self.iteration
+        self.iteration = dict(saved)
+        try:
+            problem = run(item.for_in)
+        finally:
+            self.iteration = saved
+        if problem is not None:
+            return problem
+        if isinstance(item, cst.DictComp):
+            d: Any = {}
+            for k, v in items:
+                d = self._with_item(d, k, v)
+            return d
+        return items
+
+    def _element(self, node: cst.CSTNode, target_line: int) -> Any:
+        return self.evaluate_in_scope(
+            node, self.get_metadata(ScopeProvider, node), target_line
+        )
+
+    def _bind_target(self, target: cst.CSTNode, value: Any) -> Any:
+        """
+        Records value for the names in target, `x` or `(k, v)`.
+        """
+        if isinstance(target, cst.Name):
+            self.iteration[target] = value
+            return None
+        elif isinstance(target, (cst.Tuple, cst.List)):
+            values = folding.iterate(value)
+            if isinstance(values, TooComplicated):
+                return values
+            if len(values) != len(target.elements) or any(
+                isinstance(el, cst.StarredElement) for el in target.elements
+            ):
+                return TooComplicated("can't unpack comprehension target")
+            for el, v in zip(target.elements, values):
+                problem = self._bind_target(el.value, v)
+                if problem is not None:
+                    return problem
+            return None
+        return TooComplicated(f"{type(target).__name__} target isn't supported")
+
+    def _positional_args(
+        self, item: cst.Call, scope: Any, target_line: int
+    ) -> Union[List[Any], TooComplicated]:
+        args = []
+        for arg in item.args:
+            if arg.keyword is not None or arg.star:
+                return TooComplicated("only positional args are supported")
+            args.append(self.evaluate_in_scope(arg.value, scope, target_line))
+        return args
+
+    def _open(self, item: cst.Call, scope: Any, target_line: int) -> Any:
+        """
+        Returns a FileReference for `open(...)` (or io.open, codecs.open).
+        """
+        params = ["file", "mode", "encoding"]
+        values: Dict[str, Any] = {"mode": "r", "encoding": "utf-8"}
+        for i, arg in enumerate(item.args):
+            if isinstance(arg.keyword, cst.Name):
+                key = arg.keyword.value
+            elif not arg.star and i < len(params):
+                key = params[i]
+            else:
+                return TooComplicated("unsupported open() args")
+            if key in params:
+                values[key] = self.evaluate_in_scope(arg.value, scope, target_line)
+
+        def make(file: Any, mode: Any, encoding: Any) -> Any:
+            if isinstance(file, FileReference):
+                file = file.filename
+            if not isinstance(file, str) or not isinstance(mode, str):
+                return TooComplicated("unsupported open() args")
+            if not isinstance(encoding, str):
+                return TooComplicated("unsupported open() encoding")
+            return FileReference(file, "b" in mode, encoding)
+
+        if "file" not in values:
+            return TooComplicated("open() without a file")
+        return self._lift(make, values["file"], values["mode"], values["encoding"])
+
+    def _call_method(
+        self, receiver: Any, method: str, args: List[Any], kwargs: Dict[str, Any]
+    ) -> Any:
+        if isinstance(receiver, FileReference):
+            if method == "read_text" and set(kwargs) <= {"encoding"}:
+                args = args + list(kwargs.values())
+            elif kwargs:
+                return TooComplicated(f"unsupported {method}() args")
+            if method in ("resolve", "absolute") and not args:
+                return receiver
+            elif method == "joinpath":
+                return _join_path(receiver, *args)
+            elif method == "open" and len(args) <= 1:
+                mode = args[0] if args else "r"
+                if not isinstance(mode, str):
+                    return TooComplicated("unsupported open() args")
+                return FileReference(receiver.filename, "b" in mode)
+            elif method in ("read", "read_text", "read_bytes", "readlines"):
+                if method == "read_text" and args:
+                    if not isinstance(args[0], str):
+                        return TooComplicated("unsupported read_text() args")
+                    receiver = FileReference(receiver.filename, False, args[0])
+                elif method == "read_bytes":
+                    receiver = FileReference(receiver.filename, True)
+                elif args:
+                    return TooComplicated(f"unsupported {method}() args")
+                data = self._read(receiver)
+                if method == "readlines" and isinstance(data, (str, bytes)):
+                    return data.splitlines(True)
+                return data
+        return folding.call_method(receiver, method, args, kwargs)
+
+    def _read(self, ref: FileReference) -> Any:
+        rel = posixpath.normpath(ref.filename)
+        if rel.startswith("../") or rel == ".." or posixpath.isabs(rel):
+            return TooComplicated(f"{ref.filename} is outside the project")
+        self.portable = False
+        if rel not in self.input_files:
+            self.input_files.append(rel)
+        if self.root is None:
+            return TooComplicated(f"{rel} wasn't read")
+        try:
+            data = self.file_cache.read_bytes(self.root / rel)
+        except FileTooLarge:
+            return TooComplicated(f"{rel} is too large")
+        except OSError:
+            return TooComplicated(f"{rel} can't be read")
+        if ref.binary:
+            return data
+        try:
+            return data.decode(ref.encoding)
+        except (LookupError, UnicodeDecodeError):
+            return TooComplicated(f"{rel} can't be decoded as {ref.encoding}")
+
+    def _mutations(
+        self, name: str, scope: Any, after: int, before: int
+    ) -> List[Tuple[int, cst.CSTNode, str, List[cst.Arg]]]:
+        """
+        Returns the statements that change name in place (like `name.append(x)`
+        or `name[k] = v`) between two lines, in order, as (line, statement,
+        method, args).
+        """
+        found = []
+        for access in scope.accesses[name]:
+            node = access.node
+            try:
+                parent = self.get_metadata(ParentNodeProvider, node)
+                grandparent = self.get_metadata(ParentNodeProvider, parent)
+                statement = self.get_metadata(ParentNodeProvider, grandparent)
+            except KeyError:
+                continue
+
+            if (
+                isinstance(parent, cst.Attribute)
+                and parent.value is node
+                and isinstance(grandparent, cst.Call)
+                and grandparent.func is parent
+                and parent.attr.value in MUTATING_METHODS
+            ):
+                method = parent.attr.value
+                args = list(grandparent.args)
+            elif (
+                isinstance(parent, cst.Subscript)
+                and parent.value is node
+                and isinstance(grandparent, cst.AssignTarget)
+                and isinstance(statement, cst.Assign)
+                and len(parent.slice) == 1
+                and isinstance(parent.slice[0].slice, cst.Index)
+            ):
+                method = "__setitem__"
+                args = [cst.Arg(parent.slice[0].slice.value), cst.Arg(statement.value)]
+            elif (
+                isinstance(parent, cst.Arg)
+                and isinstance(grandparent, cst.Call)
+                and len(grandparent.args) >= 2
+                and grandparent.args[1] is parent
+                and self._callee(grandparent) == "builtins.exec"
+            ):
+                # exec(code, name)
+                method = "__exec__"
+                args = [grandparent.args[0]]
+                statement = grandparent
+            elif (
+                isinstance(parent, cst.Subscript)
+                and parent.value is node
+                and isinstance(grandparent, cst.Attribute)
+                and grandparent.attr.value in MUTATING_METHODS
+            ):
+                # name[k].append(v) changes name too, but isn't modeled.
+                method = "__getitem__"
+                args = []
+                statement = grandparent
+            elif isinstance(parent, cst.Assign) and parent.value is node:
+                # other = name, after which other.append(x) changes name too
+                method = "__alias__"
+                args = []
+                statement = parent
+            else:
+                continue
+
+            lineno = self.get_metadata(PositionProvider, statement).start.line
+            if lineno <= after or (before and lineno >= before):
+                continue
+            if self.get_metadata(ScopeProvider, statement, None) is not scope:
+                continue
+            found.append((lineno, statement, method, args))
+        found.sort(key=lambda x: x[0])
+        return found
+
+    def _apply_mutations(
+        self,
+        name: str,
+        scope: Any,
+        after: int,
+        before: int,
+        context: Dnf,
+        value: Any,
+    ) -> Any:
+        """
+        Returns value (assigned to name on line `after`, where context holds),
+        changed by what happens to it in place before line `before`.
+        """
+        for lineno, statement, method, arg_nodes in self._mutations(
+            name, scope, after, before
+        ):
+            if isinstance(value, TooComplicated):
+                break
+            if method == "__alias__":
+                assert isinstance(statement, cst.Assign)
+                for t in statement.targets:
+                    if not isinstance(t.target, cst.Name) or self._mutations(
+                        t.target.value, scope, lineno, before
+                    ):
+                        return TooComplicated(f"{name} is changed through an alias")
+                continue
+            if method not in SUPPORTED_MUTATIONS and method != "__exec__":
+                return TooComplicated(f"{name}.{method}() changes it")
+            if self._in_loop(statement):
+                return TooComplicated(f"{name} is changed in a loop")
+
+            cond = self._statement_condition(statement, scope, lineno)
+            if cond is None:
+                return TooComplicated(f"{name} is changed where it might not run")
+            on = and_(context, cond)
+            if not on:
+                continue
+            args = []
+            kwargs = {}
+            for a in arg_nodes:
+                v = self._evaluate_under(on, a.value, scope, lineno)
+                if isinstance(a.keyword, cst.Name):
+                    kwargs[a.keyword.value] = v
+                elif a.star:
+                    return TooComplicated(f"{name}.{method}(*args) isn't supported")
+                else:
+                    args.append(v)
+            if kwargs:
+                if method != "update":
+                    return TooComplicated(f"{name}.{method}(**kwargs) isn't supported")
+                args.append(kwargs)
+            if method == "__exec__":
+                method = "update"
+                args = [self._lift(self._exec_globals, args[0])]
+            fn, lifted = SUPPORTED_MUTATIONS[method]
+            if lifted is None:
+                lifted = len(args)
+            rest = args[lifted:]
+            saved = self.context
+            self.context = on
+            try:
+                changed = self._lift(lambda *a: fn(*a, *rest), value, *args[:lifted])
+            finally:
+                self.context = saved
+            off = and_(context, not_(cond))
+            if not off:
+                value = changed
+            elif isinstance(changed, TooComplicated):
+                value = changed
+            else:
+                saved = self.context
+                self.context = context
                 try:
-                    return lhs + rhs
-                except Exception:
-                    return "??"
+                    value = self._merge(_options(value, off) + _options(changed, on))
+                finally:
+                    self.context = saved
+        return value
+
+    def _with_item(self, d: Any, k: Any, v: Any) -> Any:
+        # The value is kept as-is, even when it's unknown or Sometimes.
+        return self._lift(lambda d2, k2: _set_item(d2, k2, v), d, k)
+
+    def _in_loop(self, statement: cst.CSTNode) -> bool:
+        child = statement
+        while True:
+            try:
+                parent = self.get_metadata(ParentNodeProvider, child)
+            except KeyError:
+                return False
+            if isinstance(parent, (cst.Module, cst.FunctionDef, cst.ClassDef)):
+                return False
+            if isinstance(parent, (cst.For, cst.While)):
+                return True
+            child = parent
+
+    def _evaluate_under(
+        self, context: Dnf, item: cst.CSTNode, scope: Any, target_line: int
+    ) -> Any:
+        saved = self.context
+        self.context = context
+        try:
+            return self.evaluate_in_scope(item, scope, target_line)
+        finally:
+            self.context = saved
+
+    def _merge(self, options: List[Tuple[Condition, Any]]) -> Any:
+        """
+        Returns a Sometimes for options, unless they all have the same value
+        wherever this is being evaluated.
+        """
+        first = options[0][1]
+        if all(v == first for _, v in options):
+            conds = tuple(c for c, _ in options)
+            if () in conds or not and_(self.context, not_(conds)):
+                return first
+        return Sometimes(options)
+
+    def _lift(self, fn: Callable[..., Any], *values: Any) -> Any:
+        """
+        Applies fn to values, once per combination of conditions if any of them
+        are Sometimes.
+        """
+        for v in values:
+            if isinstance(v, TooComplicated):
+                return v
+        if not any(isinstance(v, Sometimes) for v in values):
+            return fn(*values)
+
+        combos: List[Tuple[Condition, List[Any]]] = [((), [])]
+        for v in values:
+            choices = v.options if isinstance(v, Sometimes) else [((), v)]
+            combos = [
+                (c, args + [x])
+                for c1, args in combos
+                for c2, x in choices
+                for c in [conjoin(c1, c2)]
+                if c is not None
+            ]
+        options = []
+        for c, args in combos:
+            result = fn(*args)
+            if isinstance(result, TooComplicated):
+                return result
+            options.append((c, result))
+        if not options:
+            return TooComplicated("no conditions are possible")
+        return self._merge(options)
+
+    def _statement_condition(
+        self, statement: cst.CSTNode, scope: Any, target_line: int
+    ) -> Optional[Dnf]:
+        """
+        Returns when statement runs, from the `if` blocks around it (within its
+        function, if any), or None if one of them can't be worked out.  Loops
+        and `try` blocks might run it any number of times, or stop partway, so
+        those are None too.
+        """
+        result = TRUE
+        child = statement
+        while True:
+            try:
+                parent = self.get_metadata(ParentNodeProvider, child)
+            except KeyError:
+                break
+            if isinstance(parent, (cst.Module, cst.FunctionDef, cst.ClassDef)):
+                break
+            if isinstance(parent, UNKNOWN_BLOCKS):
+                return None
+            if isinstance(parent, cst.If):
+                test = self._condition(parent.test, scope, target_line)
+                if test is None:
+                    test = self._constant_condition(parent.test, scope, target_line)
+                if test is None:
+                    return None
+                result = and_(result, test if child is parent.body else not_(test))
+            child = parent
+        return result
+
+    def _constant_condition(
+        self, node: cst.CSTNode, scope: Any, target_line: int
+    ) -> Optional[Dnf]:
+        """
+        Returns TRUE or FALSE for a test that doesn't depend on the
+        environment, like `if __name__ == "__main__"` or `if extras:`, or None.
+        """
+        if (
+            isinstance(node, cst.Comparison)
+            and len(node.comparisons) == 1
+            and isinstance(node.comparisons[0].operator, cst.Equal)
+        ):
+            sides = (node.left, node.comparisons[0].comparator)
+            if any(
+                isinstance(n, cst.Name) and n.value == "__name__" for n in sides
+            ) and any(
+                isinstance(n, cst.SimpleString) and n.evaluated_value == "__main__"
+                for n in sides
+            ):
+                # setup.py is run as a script, the modules it imports aren't
+                return FALSE if self.summarize else TRUE
+        value = self.evaluate_in_scope(node, scope, target_line)
+        if not folding.is_constant(value):
+            return None
+        return TRUE if value else FALSE
+
+    def _condition(
+        self,
+        node: cst.CSTNode,
+        scope: Any,
+        target_line: int,
+        seen: Optional[Set[str]] = None,
+    ) -> Optional[Dnf]:
+        """
+        Returns the condition equivalent to node, or None if it's not one we
+        recognize.
+        """
+        qnames = {q.name for q in self.get_metadata(QualifiedNameProvider, node, set())}
+        for q in qnames:
+            if q in CONSTANT_CONDITIONS:
+                return CONSTANT_CONDITIONS[q]
+
+        if isinstance(node, cst.Name):
+            if node.value in ("True", "False"):
+                return TRUE if node.value == "True" else FALSE
+            # Something like `PY2 = sys.version_info[0] == 2`
+            seen = seen or set()
+            if node.value in seen:
+                return None
+            value = self._last_assigned_value(node.value, scope, target_line)
+            if value is None:
+                return None
+            return self._condition(value, scope, target_line, seen | {node.value})
+        elif isinstance(node, cst.UnaryOperation) and isinstance(
+            node.operator, cst.Not
+        ):
+            inner = self._condition(node.expression, scope, target_line, seen)
+            return None if inner is None else not_(inner)
+        elif isinstance(node, cst.BooleanOperation):
+            lhs = self._condition(node.left, scope, target_line, seen)
+            rhs = self._condition(node.right, scope, target_line, seen)
+            if isinstance(node.operator, cst.And):
+                if lhs == FALSE or rhs == FALSE:
+                    return FALSE
+                return None if lhs is None or rhs is None else and_(lhs, rhs)
             else:
-                return "??"
+                if lhs == TRUE or rhs == TRUE:
+                    return TRUE
+                return None if lhs is None or rhs is None else or_(lhs, rhs)
+        elif isinstance(node, cst.Comparison) and len(node.comparisons) == 1:
+            comparison = node.comparisons[0]
+            op = COMPARISON_OPS.get(type(comparison.operator))
+            if op is None:
+                return None
+            return self._comparison(
+                node.left, op, comparison.comparator, scope, target_line
+            )
+        elif (
+            isinstance(node, cst.Call)
+            and isinstance(node.func, cst.Attribute)
+            and node.func.attr.value == "startswith"
+            and len(node.args) == 1
+            and self._has_name(node.func.value, "sys.platform")
+        ):
+            prefix = self.evaluate_in_scope(node.args[0].value, scope, target_line)
+            if prefix in PLATFORM_PREFIXES:
+                return ((("sys_platform", "==", PLATFORM_PREFIXES[prefix]),),)
+        return None
+
+    def _comparison(
+        self,
+        left: cst.BaseExpression,
+        op: str,
+        right: cst.BaseExpression,
+        scope: Any,
+        target_line: int,
+    ) -> Optional[Dnf]:
+        # sys.argv is known (see PRETEND_ARGV), so these are constant.
+        if self._mentions_argv(left) or self._mentions_argv(right):
+            lhs = self._argv_value(left, scope, target_line)
+            rhs = self._argv_value(right, scope, target_line)
+            if isinstance(lhs, TooComplicated) or isinstance(rhs, TooComplicated):
+                return None
+            try:
+                return TRUE if PYTHON_OPS[op](lhs, rhs) else FALSE
+            except Exception:
+                return None
+
+        for env, other, env_op in (
+            (left, right, op),
+            (right, left, SWAPPED_OPS.get(op)),
+        ):
+            version_prefix = self._version_prefix(env)
+            var = self._environment_var(env)
+            if env_op is None or (version_prefix is None and var is None):
+                continue
+            value = self.evaluate_in_scope(other, scope, target_line)
+            if version_prefix is not None:
+                if isinstance(value, int):
+                    value = (value,)
+                if (
+                    isinstance(value, tuple)
+                    and value
+                    and all(isinstance(x, int) for x in value)
+                ):
+                    prefix = version_prefix[0]
+                    return _version_condition(prefix, env_op, value)
+            elif var is not None and isinstance(value, str):
+                if env_op in ("==", "!="):
+                    return (((var, env_op, value),),)
+            elif (
+                var is not None
+                and isinstance(value, (tuple, list))
+                and env_op in ("in", "not in")
+            ):
+                # sys.platform in ("win32", "cygwin")
+                if value and all(isinstance(x, str) for x in value):
+                    dnf = tuple(((var, "==", x),) for x in value)
+                    return dnf if env_op == "in" else not_(dnf)
+            return None
+
+        # "linux" in sys.platform
+        if op in ("in", "not in") and self._has_name(right, "sys.platform"):
+            value = self.evaluate_in_scope(left, scope, target_line)
+            if value in PLATFORM_PREFIXES:
+                atom = ("sys_platform", "==", PLATFORM_PREFIXES[value])
+                return ((atom,),) if op == "in" else not_(((atom,),))
+        return None
+
+    def _has_name(self, node: cst.CSTNode, name: str) -> bool:
+        return any(
+            q.name == name
+            for q in self.get_metadata(QualifiedNameProvider, node, set())
+        )
+
+    def _environment_var(self, node: cst.CSTNode) -> Optional[str]:
+        for name, var in ENVIRONMENT_NAMES.items():
+            if self._has_name(node, name):
+                return var
+        if isinstance(node, cst.Call) and not node.args:
+            for name, var in ENVIRONMENT_CALLS.items():
+                if self._has_name(node.func, name):
+                    return var
+        return None
+
+    def _version_prefix(self, node: cst.CSTNode) -> Optional[Tuple[Optional[int]]]:
+        """
+        For `sys.version_info` and parts of it, returns (how many leading items
+        it is, or None for all of them,), otherwise None.
+        """
+        if isinstance(node, cst.Attribute) and node.attr.value == "major":
+            if self._has_name(node.value, "sys.version_info"):
+                return (1,)
+        if (
+            isinstance(node, cst.Subscript)
+            and len(node.slice) == 1
+            and self._has_name(node.value, "sys.version_info")
+        ):
+            s = node.slice[0].slice
+            if isinstance(s, cst.Index) and isinstance(s.value, cst.Integer):
+                if s.value.value == "0":
+                    return (1,)
+            elif (
+                isinstance(s, cst.Slice)
+                and s.lower is None
+                and s.step is None
+                and isinstance(s.upper, cst.Integer)
+            ):
+                return (int(s.upper.value),)
+            return None
+        if self._has_name(node, "sys.version_info"):
+            return (None,)
+        return None
+
+    def _mentions_argv(self, node: cst.CSTNode) -> bool:
+        if self._has_name(node, "sys.argv"):
+            return True
+        if isinstance(node, cst.Subscript):
+            return self._mentions_argv(node.value)
+        if isinstance(node, cst.Call) and len(node.args) == 1:
+            return self._mentions_argv(node.args[0].value)
+        return False
+
+    def _argv_value(self, node: cst.CSTNode, scope: Any, target_line: int) -> Any:
+        if self._has_name(node, "sys.argv"):
+            return list(self.PRETEND_ARGV)
+        elif isinstance(node, cst.Subscript) and len(node.slice) == 1:
+            lhs = self._argv_value(node.value, scope, target_line)
+            s = node.slice[0].slice
+            if isinstance(lhs, list) and isinstance(s, cst.Index):
+                index = self.evaluate_in_scope(s.value, scope, target_line)
+                if isinstance(index, int):
+                    # Out of range would raise at runtime, but in practice these
+                    # are behind a length check.
+                    return lhs[index] if -len(lhs) <= index < len(lhs) else None
+        elif (
+            isinstance(node, cst.Call)
+            and isinstance(node.func, cst.Name)
+            and node.func.value == "len"
+            and len(node.args) == 1
+        ):
+            lhs = self._argv_value(node.args[0].value, scope, target_line)
+            if isinstance(lhs, list):
+                return len(lhs)
+        elif not self._mentions_argv(node):
+            return self.evaluate_in_scope(node, scope, target_line)
+        return TooComplicated("unsupported use of sys.argv")
+
+    def _last_assigned_value(
+        self, name: str, scope: Any, target_line: int
+    ) -> Optional[cst.BaseExpression]:
+        """
+        Returns the value in the last simple `name = value` above target_line.
+        """
+        best: Optional[Tuple[int, cst.BaseExpression]] = None
+        try:
+            assignments = scope[name]
+        except Exception:
+            return None
+        for a in assignments:
+            if not a.node:
+                continue
+            try:
+                gp = self.get_metadata(
+                    ParentNodeProvider, self.get_metadata(ParentNodeProvider, a.node)
+                )
+                lineno = self.get_metadata(PositionProvider, a.node).start.line
+            except KeyError:
+                continue
+            if target_line and lineno >= target_line:
+                continue
+            if isinstance(gp, cst.Assign) and len(gp.targets) == 1:
+                if best is None or lineno > best[0]:
+                    best = (lineno, gp.value)
+        return None if best is None else best[1]
+
+
+def _returns(body: cst.CSTNode) -> List[cst.Return]:
+    """
+    Returns the return statements in a function body, not counting nested
+    functions.
+    """
+    found: List[cst.Return] = []
+
+    class Visitor(cst.CSTVisitor):
+        def visit_Return(self, node: cst.Return) -> None:
+            found.append(node)
+
+        def visit_FunctionDef(self, node: cst.FunctionDef) -> bool:
+            return False
+
+        def visit_ClassDef(self, node: cst.ClassDef) -> bool:
+            return False
+
+        def visit_Lambda(self, node: cst.Lambda) -> bool:
+            return False
+
+    body.visit(Visitor())
+    return found
+
+
+def _options(value: Any, context: Dnf) -> List[Tuple[Condition, Any]]:
+    """
+    Returns (condition, value) pairs for value, which is only evaluated where
+    context holds.
+    """
+    options = []
+    for outer in context:
+        choices = value.options if isinstance(value, Sometimes) else [((), value)]
+        for c, v in choices:
+            both = conjoin(outer, c)
+            if both is not None:
+                options.append((both, v))
+    return options
+
+
+def _split_dicts(value: Sometimes) -> Dict[Any, Any]:
+    """
+    Turns a Sometimes of dicts into a dict of Sometimes, which only has options
+    for the conditions where that key is set.
+    """
+    keys: List[Any] = []
+    for _, d in value.options:
+        keys.extend(k for k in d if k not in keys)
+    result = {}
+    for k in keys:
+        options = [(c, d[k]) for c, d in value.options if k in d]
+        first = options[0][1]
+        if len(options) == len(value.options) and all(v == first for _, v in options):
+            result[k] = first
         else:
-            # LOG.warning(f"Omit1 {type(item)!r}")
-            return "??"
+            result[k] = Sometimes(options)
+    return result
+
+
+def _dirname(path: Any) -> Any:
+    if isinstance(path, str):
+        return posixpath.dirname(path)
+    return _unknown(path, "os.path.dirname")
+
+
+def _normpath(path: Any) -> Any:
+    # Paths stay relative to the project root; see FileReference.
+    if isinstance(path, str):
+        return posixpath.normpath(path)
+    return _unknown(path, "os.path.normpath")
+
+
+def _join(*parts: Any) -> Any:
+    if all(isinstance(p, str) for p in parts) and parts:
+        return posixpath.join(*parts)
+    return TooComplicated("os.path.join is only supported for strings")
+
+
+def _make_path(*parts: Any) -> Any:
+    parts = tuple(p.filename if isinstance(p, FileReference) else p for p in parts)
+    path = _join(*(parts or (".",)))
+    if isinstance(path, str):
+        return FileReference(posixpath.normpath(path))
+    return path
+
+
+def _join_path(lhs: Any, *rhs: Any) -> Any:
+    if isinstance(lhs, FileReference):
+        return _make_path(lhs, *rhs)
+    return TooComplicated(f"/ isn't supported for {type(lhs).__name__}")
+
+
+def _parent(value: Any) -> Any:
+    if isinstance(value, FileReference):
+        return FileReference(posixpath.dirname(value.filename) or ".")
+    return _unknown(value, ".parent")
+
+
+def _copy(value: Any) -> Any:
+    if isinstance(value, (list, dict)):
+        return value.copy()
+    return TooComplicated(f"copy of {type(value).__name__} isn't supported")
+
+
+def _set_item(container: Any, key: Any, value: Any) -> Any:
+    try:
+        new = container.copy()
+        new[key] = value
+        return new
+    except Exception as e:
+        return TooComplicated(f"item assignment failed: {e}")
+
+
+def _update(container: Any, *args: Any) -> Any:
+    if not isinstance(container, dict) or not all(isinstance(a, dict) for a in args):
+        return TooComplicated("update is only supported for dicts")
+    new = container.copy()
+    for a in args:
+        new.update(a)
+    return new
+
+
+def _append(container: Any, item: Any) -> Any:
+    if not isinstance(container, list):
+        return TooComplicated(f"append to {type(container).__name__}")
+    return container + [item]
+
+
+def _extend(container: Any, items: Any) -> Any:
+    if not isinstance(container, list) or not isinstance(items, (list, tuple)):
+        return TooComplicated("extend is only supported for lists")
+    return container + list(items)
+
+
+def _insert(container: Any, index: Any, item: Any) -> Any:
+    if not isinstance(container, list) or not isinstance(index, int):
+        return TooComplicated("insert is only supported for lists")
+    new = container.copy()
+    new.insert(index, item)
+    return new
+
+
+def _remove(container: Any, item: Any) -> Any:
+    if not isinstance(container, list) or item not in container:
+        return TooComplicated("remove failed")
+    new = container.copy()
+    new.remove(item)
+    return new
+
+
+# method -> (function, how many args it needs to be able to see into, or None
+# for all); items that are only stored can stay unknown or Sometimes.
+SUPPORTED_MUTATIONS: Dict[str, Tuple[Callable[..., Any], Optional[int]]] = {
+    "append": (_append, 0),
+    "extend": (_extend, 1),
+    "insert": (_insert, 1),
+    "update": (_update, None),
+    "remove": (_remove, 1),
+    "__setitem__": (_set_item, 1),
+}
+
+
+def _compile(source: Any, *args: Any) -> Any:
+    # Only ever passed to exec
+    return source
+
+
+def _basename(path: Any) -> Any:
+    if isinstance(path, str):
+        return posixpath.basename(path)
+    return _unknown(path, "os.path.basename")
+
+
+def _splitext(path: Any) -> Any:
+    if isinstance(path, str):
+        return posixpath.splitext(path)
+    return _unknown(path, "os.path.splitext")
+
+
+PURE_FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    **folding.BUILTINS,
+    "builtins.compile": _compile,
+    "os.path.basename": _basename,
+    "os.path.dirname": _dirname,
+    "os.path.splitext": _splitext,
+    "os.path.abspath": _normpath,
+    "os.path.realpath": _normpath,
+    "os.path.normpath": _normpath,
+    "os.path.join": _join,
+    "pathlib.Path": _make_path,
+    "pathlib.PurePath": _make_path,
+}
+
+
+def _add(lhs: Any, rhs: Any) -> Any:
+    try:
+        return lhs + rhs
+    except Exception as e:
+        return TooComplicated(f"add failed: {e}")
+
+
+# libcst operator name -> function
+BINARY_OPERATIONS: Dict[str, Callable[[Any, Any], Any]] = {
+    "Add": _add,
+    "Divide": _join_path,
+    "Multiply": folding.multiply,
+    "Modulo": folding.modulo,
+}
+
+
+def _string_text(start: str, text: str) -> str:
+    """
+    The value of literal text in an f-string that starts with `start` (like
+    `f"` or `rf'`), which may have escapes in it.
+    """
+    text = text.replace("{{", "{").replace("}}", "}")
+    if "\\" not in text:
+        return text
+    prefix = "r" if "r" in start.lower() else ""
+    quote = start.lstrip("fFrRbBuU")
+    value = ast.literal_eval(prefix + quote + text + quote)
+    assert isinstance(value, str)
+    return value
+
+
+def _unknown(value: Any, what: str) -> TooComplicated:
+    if isinstance(value, TooComplicated):
+        return value
+    return TooComplicated(f"{what} of {type(value).__name__} isn't supported")
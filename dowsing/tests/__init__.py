@@ -1,21 +1,49 @@
+from .affected import AffectedTest
 from .api import ApiTest
+from .cache import FileCacheTest
 from .flit import FlitReaderTest
+from .hatch import HatchReaderTest
+from .hybrid import HybridTest
+from .in_tree import InTreeTest
+from .manifest import ManifestTest
+from .markers import MarkersTest
 from .maturin import MaturinReaderTest
+from .monorepo import MonorepoTest
+from .pdm import PdmReaderTest
 from .pep517 import Pep517Test
 from .pep621 import Pep621ReaderTest
 from .poetry import PoetryReaderTest
+from .scikit_build import ScikitBuildReaderTest
+from .scm import ScmTest
 from .setuptools import SetuptoolsReaderTest
 from .setuptools_metadata import SetupArgsTest
 from .setuptools_types import WriterTest
+from .tree import FindPackagesTest, GitTreeTest, MemoryTreeTest
+from .watch import WatcherTest
 
 __all__ = [
+    "AffectedTest",
     "ApiTest",
+    "FileCacheTest",
+    "FindPackagesTest",
     "FlitReaderTest",
+    "GitTreeTest",
+    "HatchReaderTest",
+    "HybridTest",
+    "InTreeTest",
+    "ManifestTest",
+    "MarkersTest",
     "MaturinReaderTest",
+    "MemoryTreeTest",
+    "MonorepoTest",
+    "PdmReaderTest",
     "Pep517Test",
     "Pep621ReaderTest",
     "PoetryReaderTest",
+    "ScikitBuildReaderTest",
+    "ScmTest",
     "SetuptoolsReaderTest",
     "WriterTest",
     "SetupArgsTest",
+    "WatcherTest",
 ]
@@ -0,0 +1,102 @@
+import unittest
+from pathlib import Path
+from typing import Dict
+
+import volatile
+
+from ..affected import _owner, affected_projects, changed_paths, get_affected_metadata
+from ..types import Distribution
+from .util import git, make_project
+
+
+class AffectedTest(unittest.TestCase):
+    def test_owner(self) -> None:
+        projects = [".", "a", "a/b"]
+        self.assertEqual("a/b", _owner("a/b/setup.py", projects))
+        self.assertEqual("a", _owner("a/bb/x.py", projects))
+        self.assertEqual(".", _owner("README", projects))
+        self.assertEqual(None, _owner("x/y", ["a"]))
+
+    def test_affected_projects(self) -> None:
+        a = Distribution()
+        a.packages_dict = {"a": "src/a"}
+        a.source_mapping = {"a/__init__.py": "src/a/__init__.py"}
+        a.input_files = ("requirements.txt",)
+        store = {"libs/a": a, "libs/b": Distribution()}
+        projects = ["libs/a", "libs/b", "libs/c"]
+
+        self.assertEqual(
+            {"libs/c"}, affected_projects(["libs/a/docs/x.md"], projects, store)
+        )
+        for path in (
+            "libs/a/src/a/data.json",
+            "libs/a/src/a/__init__.py",
+            "libs/a/pyproject.toml",
+            "libs/a/requirements.txt",
+            "libs/a/new_module.py",
+            "libs/a/other/__init__.py",
+        ):
+            with self.subTest(path):
+                self.assertEqual(
+                    {"libs/a", "libs/c"}, affected_projects([path], projects, store)
+                )
+
+    def test_input_outside_project(self) -> None:
+        a = Distribution()
+        a.input_files = ("../Cargo.toml",)
+        store = {"crates/a": a, "crates/b": Distribution()}
+        projects = ["crates/a", "crates/b"]
+        self.assertEqual(
+            {"crates/a"}, affected_projects(["crates/Cargo.toml"], projects, store)
+        )
+        self.assertEqual(set(), affected_projects(["Cargo.toml"], projects, store))
+
+    def test_scm_version(self) -> None:
+        a = Distribution()
+        a.scm_config = {}
+        store = {"a": a, "b": Distribution()}
+        self.assertEqual({"a"}, affected_projects([], ["a", "b"], store))
+
+    def test_nested_project(self) -> None:
+        store = {".": Distribution(), "libs/a": Distribution()}
+        self.assertEqual(
+            {"libs/a", "libs/a/tools"},
+            affected_projects([], [".", "libs/a", "libs/a/tools"], store),
+        )
+        store["libs/b"] = Distribution()
+        self.assertEqual({"."}, affected_projects([], [".", "libs/a"], store))
+
+    def test_get_affected_metadata(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            git(dp, "init", "-q")
+            make_project(dp / "a", "a", package=True)
+            make_project(dp / "b", "b", package=True)
+            git(dp, "add", "-A")
+            git(dp, "commit", "-q", "-m", "one")
+
+            store: Dict[str, Distribution] = {}
+            first = get_affected_metadata(dp, "HEAD", store, max_workers=1)
+            self.assertEqual(["a", "b"], sorted(first))
+            self.assertEqual(["a", "b"], sorted(store))
+
+            (dp / "b" / "b" / "mod.py").write_text("")
+            (dp / "docs").mkdir()
+            (dp / "docs" / "index.md").write_text("")
+            git(dp, "add", "-A")
+            git(dp, "commit", "-q", "-m", "two")
+
+            self.assertEqual(
+                ["b/b/mod.py", "docs/index.md"], changed_paths(dp, "HEAD~1")
+            )
+
+            second = get_affected_metadata(dp, "HEAD~1", store, max_workers=1)
+            self.assertIs(first["a"], second["a"])
+            self.assertIsNot(first["b"], second["b"])
+            b = second["b"]
+            assert isinstance(b, Distribution)
+            self.assertEqual(
+                {"b/__init__.py": "b/__init__.py", "b/mod.py": "b/mod.py"},
+                b.source_mapping,
+            )
+            self.assertIs(b, store["b"])
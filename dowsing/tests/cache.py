@@ -0,0 +1,91 @@
+import gc
+import unittest
+import weakref
+from pathlib import Path
+
+import volatile
+
+from ..cache import FileCache, FileTooLarge
+from ..tree import GitTree, MemoryTree
+from .util import git
+
+
+class FileCacheTest(unittest.TestCase):
+    def test_read(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            (dp / "a").write_text("abc")
+            cache = FileCache()
+            self.assertEqual(b"abc", cache.read_bytes(dp / "a"))
+            self.assertEqual("abc", cache.read_text(dp / "a"))
+            self.assertEqual(1, len(cache))
+            self.assertEqual(3, cache.size)
+
+            # Edits are noticed
+            (dp / "a").write_text("abcdef")
+            self.assertEqual(b"abcdef", cache.read_bytes(dp / "a"))
+            self.assertEqual(6, cache.size)
+
+            with self.assertRaises(FileNotFoundError):
+                cache.read_bytes(dp / "missing")
+
+    def test_limits(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            for name in ("a", "b", "c"):
+                (dp / name).write_text(name * 4)
+            (dp / "big").write_text("x" * 11)
+
+            cache = FileCache(max_bytes=10, max_file_bytes=10)
+            with self.assertRaises(FileTooLarge):
+                cache.read_bytes(dp / "big")
+            self.assertEqual(0, len(cache))
+
+            cache.read_bytes(dp / "a")
+            cache.read_bytes(dp / "b")
+            cache.read_bytes(dp / "a")
+            cache.read_bytes(dp / "c")
+            # b was least recently used
+            self.assertEqual(8, cache.size)
+            self.assertEqual(2, len(cache))
+            cache.clear()
+            self.assertEqual(0, cache.size)
+
+    def test_tree(self) -> None:
+        root = MemoryTree({"a": b"abc", "big": b"x" * 11}).root
+        cache = FileCache(max_file_bytes=10)
+        self.assertEqual(b"abc", cache.read_bytes(root / "a"))
+        self.assertEqual(b"abc", cache.read_bytes(root / "a"))
+        with self.assertRaises(FileTooLarge):
+            cache.read_bytes(root / "big")
+        # There's nothing to gain from keeping a copy
+        self.assertEqual(0, len(cache))
+
+    def test_tree_not_kept_alive(self) -> None:
+        cache = FileCache()
+        tree = MemoryTree({"a": b"abc"})
+        ref = weakref.ref(tree)
+        self.assertEqual(b"abc", cache.read_bytes(tree.root / "a"))
+        del tree
+        gc.collect()
+        self.assertIsNone(ref())
+
+    def test_git_tree(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            git(dp, "init", "-q")
+            (dp / "a").write_text("abc")
+            git(dp, "add", "-A")
+            git(dp, "commit", "-q", "-m", "one")
+            git(dp, "commit", "-q", "--allow-empty", "-m", "two")
+
+            cache = FileCache()
+            with GitTree(dp, "HEAD~1") as one, GitTree(dp, "HEAD") as two:
+                cache.read_bytes(one.root / "a")
+                # The same blob
+                self.assertEqual(b"abc", cache.read_bytes(two.root / "a"))
+                self.assertEqual(1, len(cache))
+                ref = weakref.ref(one)
+            del one, two
+            gc.collect()
+            self.assertIsNone(ref())
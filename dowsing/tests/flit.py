@@ -110,3 +110,22 @@ Foo = "https://"
                 },
                 md.asdict(),
             )
+
+    def test_description_file(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            (dp / "pyproject.toml").write_text(
+                """\
+[tool.flit.metadata]
+name = "foo"
+module = "foo"
+description-file = "README.rst"
+"""
+            )
+            (dp / "foo.py").write_text("")
+            (dp / "README.rst").write_text("Long text\n")
+
+            md = FlitReader(dp).get_metadata()
+            self.assertEqual("Long text\n", md.description)
+            self.assertEqual(("README.rst",), md.input_files)
+            self.assertEqual({}, md.confidence_map())
@@ -0,0 +1,145 @@
+import unittest
+from pathlib import Path
+
+import volatile
+
+from ..hatch import HatchReader
+from ..pep517 import get_backend
+from ..tree import MemoryTree
+from ..types import Confidence, TooComplicated
+
+
+class HatchReaderTest(unittest.TestCase):
+    def test_default_layout(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            (dp / "pyproject.toml").write_text(
+                """\
+[build-system]
+requires = ["hatchling"]
+build-backend = "hatchling.build"
+
+[project]
+name = "foo-bar"
+version = "1.0"
+dependencies = ["abc"]
+"""
+            )
+            (dp / "src" / "foo_bar" / "sub").mkdir(parents=True)
+            (dp / "src" / "foo_bar" / "__init__.py").write_text("")
+            (dp / "src" / "foo_bar" / "sub" / "__init__.py").write_text("")
+
+            requires, r = get_backend(dp)
+            self.assertEqual(["hatchling"], requires)
+            self.assertIsInstance(r, HatchReader)
+            self.assertEqual([], r.get_requires_for_build_wheel())
+            md = r.get_metadata()
+            self.assertEqual("1.0", md.version)
+            self.assertEqual(["abc"], md.requires_dist)
+            self.assertEqual(["foo_bar", "foo_bar.sub"], md.packages)
+            self.assertEqual(
+                {
+                    "foo_bar/__init__.py": "src/foo_bar/__init__.py",
+                    "foo_bar/sub/__init__.py": "src/foo_bar/sub/__init__.py",
+                },
+                md.source_mapping,
+            )
+            self.assertEqual({}, md.confidence_map())
+
+    def test_targets(self) -> None:
+        tree = MemoryTree(
+            {
+                "pyproject.toml": b"""\
+[project]
+name = "foo"
+version = "1.0"
+
+[tool.hatch.build.hooks.vcs]
+dependencies = ["hatch-vcs"]
+
+[tool.hatch.build.targets.wheel]
+only-include = ["lib/foo", "lib/single.py"]
+sources = ["lib"]
+dependencies = ["cython"]
+
+[tool.hatch.build.targets.wheel.force-include]
+"data/x.json" = "foo/x.json"
+""",
+                "lib/foo/__init__.py": b"",
+                "lib/single.py": b"",
+                "data/x.json": b"",
+            }
+        )
+        r = HatchReader(tree.root)
+        self.assertEqual(["cython", "hatch-vcs"], r.get_requires_for_build_wheel())
+        self.assertEqual(["hatch-vcs"], r.get_requires_for_build_sdist())
+        md = r.get_metadata()
+        self.assertEqual(["foo"], md.packages)
+        self.assertEqual(["single"], md.py_modules)
+        self.assertEqual(
+            {
+                "foo/__init__.py": "lib/foo/__init__.py",
+                "single.py": "lib/single.py",
+            },
+            md.source_mapping,
+        )
+
+    def test_packages(self) -> None:
+        tree = MemoryTree(
+            {
+                "pyproject.toml": b"""\
+[project]
+name = "whatever"
+dynamic = ["version"]
+
+[tool.hatch.version]
+path = "src/foo/__about__.py"
+
+[tool.hatch.build]
+packages = ["src/foo"]
+""",
+                "src/foo/__init__.py": b"",
+                "src/foo/__about__.py": b"__version__ = 'v2.3'\n",
+            }
+        )
+        md = HatchReader(tree.root).get_metadata()
+        self.assertEqual("2.3", md.version)
+        self.assertEqual(("src/foo/__about__.py",), md.input_files)
+        self.assertEqual({"foo": "src/foo"}, md.packages_dict)
+        self.assertEqual({}, md.confidence_map())
+
+    def test_version_sources(self) -> None:
+        pyproject = b"""\
+[project]
+name = "foo"
+dynamic = ["version"]
+
+[tool.hatch.version]
+source = "%s"
+fallback-version = "0.0.1"
+"""
+        tree = MemoryTree({"pyproject.toml": pyproject % b"vcs", "foo.py": b""})
+        md = HatchReader(tree.root).get_metadata()
+        self.assertEqual("0.0.1", md.version)
+        self.assertEqual(["foo"], md.py_modules)
+
+        tree = MemoryTree({"pyproject.toml": pyproject % b"code", "foo.py": b""})
+        md = HatchReader(tree.root).get_metadata()
+        self.assertIsInstance(md.version, TooComplicated)
+
+    def test_globs(self) -> None:
+        tree = MemoryTree(
+            {
+                "pyproject.toml": b"""\
+[project]
+name = "foo"
+version = "1"
+
+[tool.hatch.build.targets.wheel]
+include = ["/foo/**/*.py"]
+""",
+                "foo/__init__.py": b"",
+            }
+        )
+        md = HatchReader(tree.root).get_metadata()
+        self.assertEqual(Confidence.UNKNOWN, md.get_confidence("source_mapping"))
@@ -0,0 +1,134 @@
+import importlib.util
+import subprocess
+import unittest
+from pathlib import Path
+
+import volatile
+
+from ..hybrid import EnvironmentPool, HybridAnalyzer, is_confident, resolve_installed
+from ..tree import MemoryTree
+from ..types import Confidence, Distribution, TooComplicated
+
+IN_TREE_BACKEND = b"""\
+import os
+
+def prepare_metadata_for_build_wheel(metadata_directory, config_settings=None):
+    d = os.path.join(metadata_directory, "foo-1.2.dist-info")
+    os.mkdir(d)
+    with open(os.path.join(d, "METADATA"), "w") as f:
+        f.write("Metadata-Version: 2.1\\nName: foo\\nVersion: 1.2\\n"
+                "Requires-Dist: bar\\n")
+    return "foo-1.2.dist-info"
+"""
+
+PYPROJECT = b"""\
+[build-system]
+requires = []
+build-backend = "backend"
+backend-path = ["."]
+"""
+
+
+class HybridTest(unittest.TestCase):
+    def test_is_confident(self) -> None:
+        d = Distribution()
+        d.metadata_version = "2.1"
+        d.name = "foo"
+        d.requires_dist = ["bar"]
+        self.assertTrue(is_confident(d))
+        d.version = TooComplicated("x")  # type: ignore[assignment]
+        self.assertFalse(is_confident(d))
+        self.assertTrue(is_confident(d, ["name", "requires_dist"]))
+        d.version = "1.0"
+        d.requires_dist = ["bar", TooComplicated("x")]  # type: ignore[list-item]
+        self.assertFalse(is_confident(d, ["requires_dist"]))
+        d.requires_dist = []
+        d.confidence = {"packages_dict": Confidence.UNKNOWN}
+        self.assertFalse(is_confident(d))
+        self.assertTrue(is_confident(d, ["requires_dist"]))
+        d.default_confidence = Confidence.UNKNOWN
+        self.assertFalse(is_confident(d, ["requires_dist"]))
+
+    def test_static_when_confident(self) -> None:
+        tree = MemoryTree(
+            {"setup.py": b"from setuptools import setup\nsetup(name='foo')\n"}
+        )
+        h = HybridAnalyzer(pool=EnvironmentPool(Path("/nonexistent")))
+        self.assertEqual("foo", h.get_metadata(tree.root).name)
+        self.assertEqual("static", h.last_source)
+        self.assertEqual({}, h.cache)
+
+    def test_hooks_and_cache(self) -> None:
+        with volatile.dir() as d, EnvironmentPool() as pool:
+            dp = Path(d)
+            (dp / "pyproject.toml").write_bytes(PYPROJECT)
+            (dp / "backend.py").write_bytes(IN_TREE_BACKEND)
+
+            h = HybridAnalyzer(pool=pool)
+            md = h.get_metadata(dp)
+            self.assertEqual("hooks", h.last_source)
+            self.assertEqual("foo", md.name)
+            self.assertEqual("1.2", md.version)
+            self.assertEqual(["bar"], md.requires_dist)
+
+            self.assertIs(md, h.get_metadata(dp))
+            self.assertEqual("cache", h.last_source)
+            # Edits change the key.
+            (dp / "backend.py").write_bytes(IN_TREE_BACKEND + b"\n")
+            h.get_metadata(dp)
+            self.assertEqual("hooks", h.last_source)
+
+    def test_hooks_memory_tree(self) -> None:
+        tree = MemoryTree({"pyproject.toml": PYPROJECT, "backend.py": IN_TREE_BACKEND})
+        with EnvironmentPool() as pool:
+            h = HybridAnalyzer(pool=pool)
+            self.assertEqual("1.2", h.get_metadata(tree.root).version)
+            self.assertEqual("hooks", h.last_source)
+
+    def test_pool(self) -> None:
+        self.assertEqual(
+            ["setuptools"],
+            [d.metadata["Name"] for d in resolve_installed(["setuptools>=1"])],
+        )
+        with self.assertRaisesRegex(Exception, "not installed"):
+            resolve_installed(["setuptools<1"])
+        with self.assertRaisesRegex(Exception, "not installed"):
+            resolve_installed(["not-a-real-package-name"])
+
+        with EnvironmentPool() as pool:
+            env = pool.get(["setuptools"])
+            self.assertIs(env, pool.get(["setuptools>=1"]))
+            subprocess.run(
+                [str(env.python), "-I", "-c", "import setuptools"], check=True
+            )
+            # Not in the environment, even though it's installed here.
+            proc = subprocess.run(
+                [str(env.python), "-I", "-c", "import volatile"],
+                stderr=subprocess.DEVNULL,
+            )
+            self.assertNotEqual(0, proc.returncode)
+
+            # A second pool with the same root reuses what's there.
+            pool2 = EnvironmentPool(pool.root)
+            self.assertEqual(env.path, pool2.get(["setuptools"]).path)
+
+    @unittest.skipUnless(
+        importlib.util.find_spec("wheel"), "old setuptools needs wheel for metadata"
+    )
+    def test_setuptools_legacy(self) -> None:
+        with volatile.dir() as d, EnvironmentPool() as pool:
+            dp = Path(d)
+            (dp / "foo").mkdir()
+            (dp / "foo" / "__init__.py").write_text("def v(): return '3.0'\n")
+            (dp / "setup.py").write_text(
+                """\
+from setuptools import setup
+import foo
+setup(name="foo", version=foo.v(), packages=["foo"])
+"""
+            )
+            h = HybridAnalyzer(pool=pool)
+            md = h.get_metadata(dp)
+            self.assertEqual("hooks", h.last_source)
+            self.assertEqual("3.0", md.version)
+            self.assertEqual({"foo/__init__.py": "foo/__init__.py"}, md.source_mapping)
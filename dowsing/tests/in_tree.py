@@ -0,0 +1,102 @@
+import unittest
+
+from ..in_tree import inspect_backend, InTreeBackend, InTreeReader
+from ..pep517 import get_backend, get_requires_for_build_wheel, KNOWN_BACKENDS
+from ..setuptools import SetuptoolsReader
+from ..tree import MemoryTree
+
+PYPROJECT = b"""\
+[build-system]
+requires = ["setuptools"]
+build-backend = "backend"
+backend-path = ["_build"]
+"""
+
+
+class InTreeTest(unittest.TestCase):
+    def test_wrapper(self) -> None:
+        tree = MemoryTree(
+            {
+                "pyproject.toml": PYPROJECT,
+                "_build/backend.py": b'''\
+"""Adds cython."""
+from setuptools import build_meta as _orig
+from setuptools.build_meta import *
+
+def get_requires_for_build_wheel(config_settings=None):
+    return _orig.get_requires_for_build_wheel(config_settings) + ["cython"]
+''',
+                "setup.py": b"from setuptools import setup\n"
+                b"setup(name='foo', install_requires=['abc'])\n",
+            }
+        )
+        requires, reader = get_backend(tree.root)
+        self.assertEqual(["setuptools"], requires)
+        self.assertIsInstance(reader, InTreeReader)
+        assert isinstance(reader, InTreeReader)
+        self.assertIsInstance(reader.reader, SetuptoolsReader)
+        self.assertEqual(["abc"], reader.get_metadata().requires_dist)
+        self.assertEqual(
+            ["setuptools", "setuptools", "wheel", "cython"],
+            get_requires_for_build_wheel(tree.root),
+        )
+
+    def test_inspect(self) -> None:
+        cases = [
+            ("from flit_core.buildapi import *\n", "flit_core.buildapi"),
+            (
+                "from setuptools.build_meta import build_wheel, build_sdist\n",
+                "setuptools.build_meta",
+            ),
+            (
+                "import setuptools.build_meta as b\n"
+                "build_wheel = b.build_wheel\n"
+                "def build_sdist(d, config_settings=None):\n"
+                "    return b.build_sdist(d, config_settings)\n",
+                "setuptools.build_meta",
+            ),
+        ]
+        for source, backend in cases:
+            with self.subTest(source=source):
+                self.assertEqual(
+                    InTreeBackend(backend), inspect_backend(source, KNOWN_BACKENDS)
+                )
+
+    def test_not_a_wrapper(self) -> None:
+        cases = [
+            # Does its own thing
+            "from setuptools.build_meta import *\n"
+            "def build_wheel(*args):\n"
+            "    generate()\n"
+            "    return _orig.build_wheel(*args)\n",
+            # Mixes backends
+            "from setuptools.build_meta import build_sdist\n"
+            "from flit_core.buildapi import build_wheel\n",
+            # Not a known one
+            "from mybackend import *\n",
+            "def __getattr__(name): ...\nfrom flit_core.buildapi import *\n",
+        ]
+        for source in cases:
+            with self.subTest(source=source):
+                self.assertIsNone(inspect_backend(source, KNOWN_BACKENDS))
+
+        tree = MemoryTree(
+            {
+                "pyproject.toml": PYPROJECT,
+                "_build/backend.py": cases[0].encode(),
+            }
+        )
+        with self.assertRaisesRegex(Exception, "Unknown in-tree"):
+            get_backend(tree.root)
+
+    def test_known_backend_with_backend_path(self) -> None:
+        tree = MemoryTree(
+            {
+                "pyproject.toml": PYPROJECT.replace(
+                    b'"backend"', b'"setuptools.build_meta"'
+                ),
+                "_build/README": b"",
+            }
+        )
+        _, reader = get_backend(tree.root)
+        self.assertIsInstance(reader, SetuptoolsReader)
@@ -0,0 +1,116 @@
+import unittest
+
+from ..manifest import glob_to_regex, parse_manifest, sdist_files, wheel_mapping
+from ..setuptools import SetuptoolsReader
+from ..tree import MemoryTree
+
+
+class ManifestTest(unittest.TestCase):
+    def test_last_directive_wins(self) -> None:
+        m = parse_manifest(
+            """\
+include *.md LICENSE
+recursive-include foo *.txt *.json
+global-exclude *.pyc  # comment
+prune foo/tests
+graft foo/tests/data
+exclude foo/a.txt \\
+  foo/b.txt
+frobnicate x
+"""
+        )
+        self.assertEqual(["frobnicate x"], m.unknown)
+        for path, expected in (
+            ("README.md", True),
+            ("docs/README.md", None),
+            ("LICENSE", True),
+            ("foo/c.txt", True),
+            ("foo/sub/d.json", True),
+            ("foo/a.txt", False),
+            ("foo/b.txt", False),
+            ("foo/x.pyc", False),
+            ("foo/tests/c.txt", False),
+            ("foo/tests/data/x.pyc", True),
+            ("setup.py", None),
+        ):
+            with self.subTest(path):
+                self.assertEqual(expected, m.includes(path))
+
+    def test_glob(self) -> None:
+        self.assertEqual(r"a/(?:.*/)?b[^x]\.py", glob_to_regex("a/**/b[!x].py"))
+        self.assertEqual(r"[^/]*\.t[^/]t", glob_to_regex("*.t?t"))
+
+    def test_sdist_files(self) -> None:
+        tree = MemoryTree(
+            {
+                "MANIFEST.in": b"graft docs\nexclude README.md\n",
+                "README.md": b"",
+                "LICENSE.txt": b"",
+                "setup.py": b"",
+                "foo/__init__.py": b"",
+                "foo/data.bin": b"",
+                "docs/index.rst": b"",
+                "build/lib/foo/__init__.py": b"",
+                "tox.ini": b"",
+            }
+        )
+        m = parse_manifest((tree.root / "MANIFEST.in").read_text())
+        self.assertEqual(
+            ["LICENSE.txt", "docs/index.rst", "foo/__init__.py", "setup.py"],
+            sdist_files(tree.root, m, {"foo/__init__.py": "foo/__init__.py"}),
+        )
+
+    def test_wheel_mapping(self) -> None:
+        mapping = {
+            "foo/__init__.py": "src/foo/__init__.py",
+            "foo/a.json": "src/foo/a.json",
+            "foo/templates/b.html": "src/foo/templates/b.html",
+            "foo/c.txt": "src/foo/c.txt",
+        }
+        packages_dict = {"foo": "src/foo"}
+        m = parse_manifest("recursive-include src *.html")
+        self.assertEqual(
+            {
+                "foo/__init__.py": "src/foo/__init__.py",
+                "foo/a.json": "src/foo/a.json",
+            },
+            wheel_mapping(mapping, m, packages_dict, {"foo": ["*.json"]}, False),
+        )
+        self.assertEqual(
+            {
+                "foo/__init__.py": "src/foo/__init__.py",
+                "foo/a.json": "src/foo/a.json",
+                "foo/templates/b.html": "src/foo/templates/b.html",
+            },
+            wheel_mapping(mapping, m, packages_dict, {"": ["*.json"]}, True),
+        )
+
+    def test_setuptools(self) -> None:
+        tree = MemoryTree(
+            {
+                "setup.cfg": b"""\
+[metadata]
+name = foo
+version = 1.0
+[options]
+packages = foo
+include_package_data = true
+[options.package_data]
+foo = py.typed
+""",
+                "MANIFEST.in": b"include foo/*.txt\n",
+                "foo/__init__.py": b"",
+                "foo/py.typed": b"",
+                "foo/notes.txt": b"",
+                "foo/scratch.log": b"",
+            }
+        )
+        md = SetuptoolsReader(tree.root).get_metadata()
+        self.assertEqual(
+            {
+                "foo/__init__.py": "foo/__init__.py",
+                "foo/notes.txt": "foo/notes.txt",
+                "foo/py.typed": "foo/py.typed",
+            },
+            md.source_mapping,
+        )
@@ -0,0 +1,71 @@
+import unittest
+
+from dowsing.markers import (
+    and_,
+    dnf_to_marker,
+    FALSE,
+    flatten_extras,
+    flatten_requirements,
+    not_,
+    or_,
+    satisfiable,
+    simplify,
+    TRUE,
+)
+from dowsing.types import Sometimes, TooComplicated
+
+PY2 = ("python_version", "<", "3")
+PY3 = ("python_version", ">=", "3")
+PY37 = ("python_version", ">=", "3.7")
+WIN = ("sys_platform", "==", "win32")
+NOT_WIN = ("sys_platform", "!=", "win32")
+
+
+class MarkersTest(unittest.TestCase):
+    def test_satisfiable(self) -> None:
+        self.assertTrue(satisfiable((PY3, WIN)))
+        self.assertFalse(satisfiable((PY2, PY37)))
+        self.assertFalse(satisfiable((WIN, NOT_WIN)))
+        self.assertFalse(satisfiable((WIN, ("sys_platform", "==", "linux"))))
+
+    def test_and_or_not(self) -> None:
+        self.assertEqual(FALSE, and_(((PY2,),), ((PY3,),)))
+        self.assertEqual(((PY37,),), and_(((PY3,),), ((PY37,),)))
+        self.assertEqual(((PY3,),), or_(((PY3,),), ((PY3, WIN),)))
+        self.assertEqual(((PY3, NOT_WIN),), not_(((PY2,), (WIN,))))
+        self.assertEqual(FALSE, not_(TRUE))
+
+    def test_simplify(self) -> None:
+        self.assertEqual(TRUE, simplify(((PY2,), (PY3, WIN), (PY3, NOT_WIN))))
+        self.assertEqual(((WIN,),), simplify(((PY2, WIN), (PY3, WIN))))
+        self.assertEqual(
+            ((("python_version", "<", "3.7"),),),
+            simplify(((PY2,), (PY3, ("python_version", "<", "3.7")))),
+        )
+
+    def test_dnf_to_marker(self) -> None:
+        self.assertEqual(
+            'python_version < "3" or (python_version >= "3" and sys_platform == "win32")',
+            dnf_to_marker(((PY2,), (PY3, WIN))),
+        )
+
+    def test_flatten_requirements(self) -> None:
+        value = [
+            "a",
+            Sometimes([((PY2,), ["b; os_name == 'nt'"]), ((PY3,), [])]),
+            Sometimes([((PY2,), "c"), ((PY3,), "c")]),
+        ]
+        self.assertEqual(
+            ["a", "b; (os_name == 'nt') and (python_version < \"3\")", "c"],
+            flatten_requirements(value),
+        )
+        self.assertIsInstance(
+            flatten_requirements(["a", TooComplicated("x")]), TooComplicated
+        )
+        self.assertIsInstance(flatten_requirements([1]), TooComplicated)
+
+    def test_flatten_extras(self) -> None:
+        value = Sometimes([((WIN,), {"x": ["a", "b"]}), ((NOT_WIN,), {"x": ["a"]})])
+        self.assertEqual(
+            {"x": ["a", 'b; sys_platform == "win32"']}, flatten_extras(value)
+        )
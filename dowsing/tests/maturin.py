@@ -4,6 +4,8 @@ from pathlib import Path
 import volatile
 
 from dowsing.maturin import MaturinReader
+from dowsing.tree import MemoryTree
+from dowsing.types import TooComplicated
 
 
 class MaturinReaderTest(unittest.TestCase):
@@ -48,4 +50,119 @@ classifer = [
             md = r.get_metadata()
             self.assertEqual("orjson", md.name)
             self.assertEqual("3.4.0", md.version)
-            # TODO more tests
+            self.assertEqual("Summary here", md.summary)
+            self.assertEqual(">=3.6", md.requires_python)
+            self.assertEqual("https://example.com/home", md.home_page)
+            self.assertEqual(["Source Code=https://example.com/repo"], md.project_urls)
+
+    def test_workspace(self) -> None:
+        tree = MemoryTree(
+            {
+                "Cargo.toml": b"""\
+[workspace]
+members = ["crates/*", "py"]
+
+[workspace.package]
+version = "0.3.0-beta.2"
+license = "MIT"
+authors = ["A <a@example.com>", "B"]
+""",
+                "py/pyproject.toml": b"""\
+[build-system]
+requires = ["maturin>=1,<2"]
+build-backend = "maturin"
+
+[project]
+name = "foo-bar"
+dynamic = ["version", "license"]
+dependencies = ["abc"]
+
+[tool.maturin]
+python-source = "python"
+module-name = "foo_bar._native"
+bindings = "cffi"
+""",
+                "py/Cargo.toml": b"""\
+[package]
+name = "foo-bar-py"
+version.workspace = true
+license.workspace = true
+authors.workspace = true
+readme = "README.md"
+""",
+                "py/README.md": b"Hello",
+                "py/python/foo_bar/__init__.py": b"",
+                "py/src/lib.rs": b"",
+            }
+        )
+        r = MaturinReader(tree.root / "py")
+        self.assertEqual(("cffi",), r.get_requires_for_build_wheel())
+        md = r.get_metadata()
+        self.assertEqual("foo-bar", md.name)
+        self.assertEqual("0.3.0b2", md.version)
+        self.assertEqual("MIT", md.license)
+        self.assertEqual("A, B", md.author)
+        self.assertEqual("A <a@example.com>", md.author_email)
+        self.assertEqual("Hello", md.description)
+        self.assertEqual(["abc"], md.requires_dist)
+        self.assertEqual(["foo_bar"], md.packages)
+        self.assertEqual(
+            {"foo_bar/__init__.py": "python/foo_bar/__init__.py"}, md.source_mapping
+        )
+        self.assertEqual({}, md.confidence_map())
+        self.assertEqual(("../Cargo.toml", "README.md"), md.input_files)
+
+    def test_workspace_on_disk(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            (dp / "Cargo.toml").write_text(
+                """\
+[workspace]
+members = ["py"]
+
+[workspace.package]
+version = "1.2.3"
+"""
+            )
+            (dp / "py").mkdir()
+            (dp / "py" / "pyproject.toml").write_text(
+                """\
+[project]
+name = "foo"
+dynamic = ["version"]
+
+[tool.maturin]
+manifest-path = "rust/Cargo.toml"
+"""
+            )
+            (dp / "py" / "rust").mkdir()
+            (dp / "py" / "rust" / "Cargo.toml").write_text(
+                """\
+[package]
+name = "foo"
+version.workspace = true
+"""
+            )
+            md = MaturinReader(dp / "py").get_metadata()
+            self.assertEqual("1.2.3", md.version)
+            self.assertEqual(("rust/Cargo.toml", "../Cargo.toml"), md.input_files)
+
+    def test_missing_workspace(self) -> None:
+        tree = MemoryTree(
+            {
+                "pyproject.toml": b"""\
+[project]
+name = "foo"
+dynamic = ["version"]
+""",
+                "Cargo.toml": b"""\
+[package]
+name = "foo"
+version = { workspace = true }
+""",
+            }
+        )
+        md = MaturinReader(tree.root).get_metadata()
+        self.assertIsInstance(md.version, TooComplicated)
+        self.assertEqual({}, md.source_mapping)
+        self.assertEqual((), md.input_files)
@@ -0,0 +1,75 @@
+import unittest
+from pathlib import Path
+
+import volatile
+
+from ..monorepo import discover, get_metadata_all
+from ..types import Distribution
+from .util import make_project
+
+
+class MonorepoTest(unittest.TestCase):
+    def _tree(self, dp: Path) -> None:
+        make_project(dp, "root")
+        (dp / "tools").mkdir()
+        (dp / "tools" / "__init__.py").write_text("")
+        make_project(dp / "tools" / "inner", "inner")
+        (dp / "tools" / "inner" / "mod.py").write_text("")
+        make_project(dp / "libs" / "a", "a")
+        (dp / "libs" / "a" / "a").mkdir()
+        (dp / "libs" / "a" / "a" / "__init__.py").write_text("")
+        (dp / "libs" / "b").mkdir()
+        (dp / "libs" / "b" / "setup.cfg").write_text("[metadata]\nname = b\n")
+        # Not projects, or not ones we should look at
+        make_project(dp / ".tox" / "x", "x")
+        make_project(dp / "node_modules" / "y", "y")
+        (dp / "venv").mkdir()
+        (dp / "venv" / "pyvenv.cfg").write_text("")
+        make_project(dp / "venv" / "src" / "z", "z")
+
+    def test_discover(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            self._tree(dp)
+            self.assertEqual(
+                [".", "libs/a", "libs/b", "tools/inner"],
+                discover(dp),
+            )
+
+    def test_get_metadata_all(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            self._tree(dp)
+            (dp / "libs" / "broken").mkdir()
+            (dp / "libs" / "broken" / "setup.py").write_text("print('hi')\n")
+
+            for workers in (1, 2):
+                with self.subTest(workers):
+                    results = get_metadata_all(dp, max_workers=workers)
+                    self.assertEqual(
+                        [".", "libs/a", "libs/b", "libs/broken", "tools/inner"],
+                        sorted(results),
+                    )
+                    self.assertIsInstance(results["libs/broken"], Exception)
+
+                    root = results["."]
+                    assert isinstance(root, Distribution)
+                    self.assertEqual("root", root.name)
+                    # tools/inner/setup.py would otherwise be here
+                    self.assertEqual(
+                        {"tools/__init__.py": "tools/__init__.py"},
+                        root.source_mapping,
+                    )
+
+                    a = results["libs/a"]
+                    assert isinstance(a, Distribution)
+                    self.assertEqual(
+                        {"a/__init__.py": "a/__init__.py"}, a.source_mapping
+                    )
+
+    def test_only(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            self._tree(dp)
+            results = get_metadata_all(dp, only=["libs/b"], max_workers=1)
+            self.assertEqual(["libs/b"], list(results))
@@ -0,0 +1,130 @@
+import unittest
+
+from ..pdm import PdmReader
+from ..pep517 import get_backend
+from ..tree import MemoryTree
+from ..types import Confidence, TooComplicated
+
+
+class PdmReaderTest(unittest.TestCase):
+    def test_src_layout(self) -> None:
+        tree = MemoryTree(
+            {
+                "pyproject.toml": b"""\
+[build-system]
+requires = ["pdm-backend"]
+build-backend = "pdm.backend"
+
+[project]
+name = "foo"
+dynamic = ["version"]
+dependencies = ["abc"]
+
+[tool.pdm.version]
+source = "file"
+path = "src/foo/__init__.py"
+""",
+                "src/foo/__init__.py": b'__version__ = "0.3.0"\n',
+                "src/foo/sub/__init__.py": b"",
+                "src/bar.py": b"",
+            }
+        )
+        requires, r = get_backend(tree.root)
+        self.assertEqual(["pdm-backend"], requires)
+        self.assertIsInstance(r, PdmReader)
+        md = r.get_metadata()
+        self.assertEqual("0.3.0", md.version)
+        self.assertEqual(["foo", "foo.sub"], md.packages)
+        self.assertEqual(
+            {
+                "foo/__init__.py": "src/foo/__init__.py",
+                "foo/sub/__init__.py": "src/foo/sub/__init__.py",
+            },
+            md.source_mapping,
+        )
+        self.assertEqual({}, md.confidence_map())
+
+    def test_includes(self) -> None:
+        tree = MemoryTree(
+            {
+                "pyproject.toml": b"""\
+[project]
+name = "foo"
+version = "1"
+
+[tool.pdm.build]
+package-dir = "lib"
+includes = ["lib/foo/", "lib/single.py"]
+""",
+                "lib/foo/__init__.py": b"",
+                "lib/single.py": b"",
+                "lib/other/__init__.py": b"",
+            }
+        )
+        md = PdmReader(tree.root).get_metadata()
+        self.assertEqual(["foo"], md.packages)
+        self.assertEqual(["single"], md.py_modules)
+        self.assertEqual(
+            {"foo/__init__.py": "lib/foo/__init__.py", "single.py": "lib/single.py"},
+            md.source_mapping,
+        )
+
+    def test_modules_and_globs(self) -> None:
+        tree = MemoryTree(
+            {
+                "pyproject.toml": b"""\
+[project]
+name = "foo"
+version = "1"
+""",
+                "foo.py": b"",
+                "setup.py": b"",
+            }
+        )
+        md = PdmReader(tree.root).get_metadata()
+        self.assertEqual(["foo"], md.py_modules)
+
+        tree = MemoryTree(
+            {
+                "pyproject.toml": b"""\
+[project]
+name = "foo"
+version = "1"
+
+[tool.pdm.build]
+includes = ["*.py"]
+""",
+                "foo.py": b"",
+            }
+        )
+        md = PdmReader(tree.root).get_metadata()
+        self.assertEqual(Confidence.UNKNOWN, md.get_confidence("source_mapping"))
+
+    def test_scm_version(self) -> None:
+        pyproject = b"""\
+[project]
+name = "foo"
+dynamic = ["version"]
+
+[tool.pdm%s]
+fallback_version = "0.0.0"
+%s
+"""
+        tree = MemoryTree(
+            {
+                "pyproject.toml": pyproject % (b".version", b'source = "scm"'),
+                "foo.py": b"",
+            }
+        )
+        self.assertEqual("0.0.0", PdmReader(tree.root).get_metadata().version)
+
+        # pdm-pep517
+        tree = MemoryTree(
+            {
+                "pyproject.toml": pyproject % (b"", b"version = {use_scm = true}"),
+                "foo.py": b"",
+            }
+        )
+        self.assertIsInstance(
+            PdmReader(tree.root).get_metadata().version, TooComplicated
+        )
@@ -4,6 +4,7 @@ from pathlib import Path
 import volatile
 
 from ..pep621 import Pep621Reader
+from ..types import Confidence
 
 
 class Pep621ReaderTest(unittest.TestCase):
@@ -56,6 +57,34 @@ Foo = "https://"
                 md.asdict(),
             )
 
+    def test_layout_from_name(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            (dp / "pyproject.toml").write_text(
+                """\
+[project]
+name = "foo-bar"
+"""
+            )
+            (dp / "src" / "foo_bar" / "sub").mkdir(parents=True)
+            (dp / "src" / "foo_bar" / "__init__.py").write_text("")
+            (dp / "src" / "foo_bar" / "sub" / "__init__.py").write_text("")
+            (dp / "src" / "other.py").write_text("")
+
+            md = Pep621Reader(dp).get_pep621_metadata()
+            self.assertEqual(["foo_bar", "foo_bar.sub"], md.packages)
+            self.assertEqual([], md.py_modules)
+            self.assertEqual({"": "src"}, md.package_dir)
+            self.assertEqual(
+                {"foo_bar": "src/foo_bar", "foo_bar.sub": "src/foo_bar/sub"},
+                md.packages_dict,
+            )
+
+            (dp / "foo_bar.py").write_text("")
+            md = Pep621Reader(dp).get_pep621_metadata()
+            self.assertEqual([], md.packages)
+            self.assertEqual(["foo_bar"], md.py_modules)
+
     def test_pep639(self) -> None:
         with volatile.dir() as d:
             dp = Path(d)
@@ -71,3 +100,20 @@ license = "MIT"
             md = r.get_pep621_metadata()
             self.assertEqual("Name", md.name)
             self.assertEqual("MIT", md.license)
+
+    def test_dynamic(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            (dp / "pyproject.toml").write_text(
+                """\
+[project]
+name = "Name"
+dynamic = ["version", "dependencies"]
+"""
+            )
+
+            md = Pep621Reader(dp).get_pep621_metadata()
+            self.assertEqual(Confidence.EXACT, md.get_confidence("name"))
+            self.assertEqual(Confidence.UNKNOWN, md.get_confidence("version"))
+            self.assertEqual(Confidence.UNKNOWN, md.get_confidence("requires_dist"))
+            self.assertEqual(Confidence.EXACT, md.get_confidence("summary"))
@@ -3,7 +3,9 @@ from pathlib import Path
 
 import volatile
 
-from dowsing.poetry import PoetryReader
+from dowsing.poetry import PoetryReader, translate_constraint, translate_python
+from dowsing.tree import MemoryTree
+from dowsing.types import Confidence, TooComplicated
 
 
 class PoetryReaderTest(unittest.TestCase):
@@ -48,4 +50,79 @@ functools32 = { version = "^3.2.3", python = "~2.7" }
                 md.project_urls,
             )
             self.assertEqual(["Not a real classifier"], md.classifiers)
-            self.assertEqual(["functools32"], md.requires_dist)
+            self.assertEqual(
+                [
+                    "functools32>=3.2.3,<4.0.0; "
+                    'python_version >= "2.7" and python_version < "2.8"'
+                ],
+                md.requires_dist,
+            )
+            self.assertEqual(
+                ">=2.7,!=3.0.*,!=3.1.*,!=3.2.*,!=3.3.*,!=3.4.*,<4.0",
+                md.requires_python,
+            )
+            self.assertEqual({}, md.confidence_map())
+
+    def test_dependencies(self) -> None:
+        tree = MemoryTree(
+            {
+                "pyproject.toml": b"""\
+[tool.poetry]
+name = "foo"
+version = "1.0"
+
+[tool.poetry.dependencies]
+python = "^3.8"
+a = "~1.2"
+b = { version = ">= 2, < 3", extras = ["x"], platform = "linux" }
+c = [
+    { version = "^1.0", python = "<3.10" },
+    { version = "^2.0", python = "^3.10", markers = "os_name == 'nt' or os_name == 'posix'" },
+]
+d = { git = "https://example.com/d.git", tag = "v1" }
+e = { version = "*", optional = true }
+f = "1.0 || 2.0"
+
+[tool.poetry.extras]
+E = ["E"]
+""",
+                "foo/__init__.py": b"",
+            }
+        )
+        md = PoetryReader(tree.root).get_metadata()
+        self.assertEqual(">=3.8,<4.0", md.requires_python)
+        self.assertEqual(
+            [
+                "a>=1.2,<1.3",
+                'b[x]>=2,<3; sys_platform == "linux"',
+                'c>=1.0,<2.0; python_version < "3.10"',
+                'c>=2.0,<3.0; python_version >= "3.10" and python_version < "4.0"'
+                " and (os_name == 'nt' or os_name == 'posix')",
+                "d @ git+https://example.com/d.git@v1",
+            ],
+            md.requires_dist[:5],
+        )
+        self.assertIsInstance(md.requires_dist[5], TooComplicated)
+        self.assertEqual({"E": ["e"]}, md.extras_require)
+        self.assertEqual(["E"], md.provides_extras)
+        self.assertEqual({"requires_dist": Confidence.UNKNOWN}, md.confidence_map())
+
+    def test_translate_constraint(self) -> None:
+        for constraint, expected in (
+            ("*", ""),
+            ("^1.2.3", ">=1.2.3,<2.0.0"),
+            ("^0.2.3", ">=0.2.3,<0.3.0"),
+            ("^0.0", ">=0.0,<0.1"),
+            ("~1", ">=1,<2"),
+            ("1.2.*", "==1.2.*"),
+            ("=1.0", "==1.0"),
+            (">= 1.2 <2", ">=1.2,<2"),
+            ("~=1.4", "~=1.4"),
+        ):
+            with self.subTest(constraint):
+                self.assertEqual(expected, translate_constraint(constraint))
+        self.assertIsInstance(translate_constraint("banana"), TooComplicated)
+        self.assertEqual(">=3.6,!=3.7.*,<3.9", translate_python("3.6.* || 3.8.*"))
+        self.assertIsInstance(
+            translate_python(">=3.6.2,<3.7.1 || >=3.9"), TooComplicated
+        )
@@ -0,0 +1,80 @@
+import unittest
+
+from ..pep517 import get_backend
+from ..scikit_build import ScikitBuildReader
+from ..tree import MemoryTree
+
+
+class ScikitBuildReaderTest(unittest.TestCase):
+    def test_default(self) -> None:
+        tree = MemoryTree(
+            {
+                "pyproject.toml": b"""\
+[build-system]
+requires = ["scikit-build-core"]
+build-backend = "scikit_build_core.build"
+
+[project]
+name = "Foo-Ext"
+dynamic = ["version"]
+
+[tool.scikit-build]
+metadata.version.provider = "scikit_build_core.metadata.regex"
+metadata.version.input = "src/foo_ext/__init__.py"
+""",
+                "CMakeLists.txt": b"",
+                "src/foo_ext/__init__.py": b"__version__ = '1.2'\n",
+            }
+        )
+        requires, r = get_backend(tree.root)
+        self.assertEqual(["scikit-build-core"], requires)
+        self.assertIsInstance(r, ScikitBuildReader)
+        self.assertEqual((), r.get_requires_for_build_sdist())
+        self.assertEqual(
+            ("cmake>=3.15", 'ninja; sys_platform != "win32"'),
+            r.get_requires_for_build_wheel(),
+        )
+        md = r.get_metadata()
+        self.assertEqual("1.2", md.version)
+        self.assertEqual({"foo_ext": "src/foo_ext"}, md.packages_dict)
+        self.assertEqual(
+            {"foo_ext/__init__.py": "src/foo_ext/__init__.py"}, md.source_mapping
+        )
+        self.assertEqual({}, md.confidence_map())
+
+    def test_packages(self) -> None:
+        tree = MemoryTree(
+            {
+                "pyproject.toml": b"""\
+[project]
+name = "foo"
+version = "1"
+
+[tool.scikit-build]
+cmake.version = ">=3.26"
+wheel.packages = ["python/foo"]
+""",
+                "python/foo/__init__.py": b"",
+            }
+        )
+        r = ScikitBuildReader(tree.root)
+        self.assertEqual("cmake>=3.26", r.get_requires_for_build_wheel()[0])
+        self.assertEqual({"foo": "python/foo"}, r.get_metadata().packages_dict)
+
+        tree = MemoryTree(
+            {
+                "pyproject.toml": b"""\
+[project]
+name = "foo"
+version = "1"
+
+[tool.scikit-build.wheel.packages]
+"foo/bar" = "src/bar"
+""",
+                "src/bar/__init__.py": b"",
+            }
+        )
+        md = ScikitBuildReader(tree.root).get_metadata()
+        self.assertEqual(
+            {"foo/bar/__init__.py": "src/bar/__init__.py"}, md.source_mapping
+        )
@@ -0,0 +1,129 @@
+import datetime
+import unittest
+from pathlib import Path
+
+import volatile
+
+from ..scm import format_version, get_version, parse_describe, ScmVersion
+from ..setuptools import SetuptoolsReader
+from ..tree import GitTree, MemoryTree
+from ..types import TooComplicated
+from .util import git
+
+NOW = datetime.datetime(2024, 5, 6, 7, 8, 9)
+
+
+class ScmTest(unittest.TestCase):
+    def test_parse_describe(self) -> None:
+        self.assertEqual(
+            ScmVersion("v1.0-rc1", 3, "abc1234", True),
+            parse_describe("v1.0-rc1-3-gabc1234-dirty\n"),
+        )
+
+    def test_format_version(self) -> None:
+        cases = [
+            (ScmVersion("v1.2", 0, "abc"), {}, "1.2"),
+            (ScmVersion("1.2", 0, "abc", True), {}, "1.3.dev0+d20240506"),
+            (ScmVersion("1.2", 3, "abc"), {}, "1.3.dev3+gabc"),
+            (ScmVersion("1.2", 3, "abc", True), {}, "1.3.dev3+gabc.d20240506"),
+            (ScmVersion("1.0rc1", 2, "abc"), {}, "1.0rc2.dev2+gabc"),
+            (ScmVersion("1.0.dev0", 2, "abc"), {}, "1.0.dev2+gabc"),
+            (ScmVersion(None, 5, "abc"), {}, "0.1.dev5+gabc"),
+            (
+                ScmVersion("1.2", 3, "abc"),
+                {"local_scheme": "no-local-version"},
+                "1.3.dev3",
+            ),
+            (
+                ScmVersion("1.2", 3, "abc"),
+                {"version_scheme": "post-release"},
+                "1.2.post3+gabc",
+            ),
+            (
+                ScmVersion("1.2", 3, "abc", True),
+                {"version_scheme": "no-guess-dev", "local_scheme": "dirty-tag"},
+                "1.2.post1.dev3+dirty",
+            ),
+        ]
+        for scm, kwargs, expected in cases:
+            with self.subTest(scm=scm, kwargs=kwargs):
+                self.assertEqual(expected, format_version(scm, now=NOW, **kwargs))
+
+        self.assertIsInstance(
+            format_version(ScmVersion("1.2", 3, "abc"), "calver-by-date"),
+            TooComplicated,
+        )
+        self.assertIsInstance(
+            format_version(ScmVersion("release", 3, "abc")), TooComplicated
+        )
+
+    def test_git(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            git(dp, "init", "-q")
+            (dp / "setup.py").write_text(
+                """\
+from setuptools import setup
+setup(name="foo", use_scm_version={"local_scheme": "no-local-version"})
+"""
+            )
+            git(dp, "add", "-A")
+            git(dp, "commit", "-q", "-m", "one")
+            self.assertEqual("0.1.dev1", SetuptoolsReader(dp).get_metadata().version)
+
+            git(dp, "tag", "v2.0")
+            self.assertEqual("2.0", SetuptoolsReader(dp).get_metadata().version)
+
+            git(dp, "commit", "-q", "--allow-empty", "-m", "two")
+            rev = git(dp, "rev-parse", "HEAD").strip()
+            self.assertEqual("2.1.dev1", str(get_version(dp, {})).partition("+")[0])
+
+            (dp / "setup.py").write_text("# changed\n")
+            self.assertTrue(str(get_version(dp, {})).endswith(".d" + _today()))
+
+            with GitTree(dp, rev) as tree:
+                self.assertEqual(f"2.1.dev1+g{rev[:7]}", get_version(tree.root, {}))
+
+            # Nested in a checkout that isn't its own
+            (dp / "sub").mkdir()
+            self.assertIsInstance(get_version(dp / "sub", {}), TooComplicated)
+            self.assertEqual(
+                "2.1.dev1",
+                get_version(
+                    dp / "sub",
+                    {"root": "..", "local_scheme": "no-local-version"},
+                ),
+            )
+
+    def test_sdist(self) -> None:
+        tree = MemoryTree(
+            {
+                "PKG-INFO": b"Metadata-Version: 2.1\nName: foo\nVersion: 1.4.2\n",
+                "setup.py": b"from setuptools import setup\nsetup(name='foo')\n",
+                "pyproject.toml": b"[tool.setuptools_scm]\n",
+            }
+        )
+        self.assertEqual("1.4.2", SetuptoolsReader(tree.root).get_metadata().version)
+
+    def test_version_file(self) -> None:
+        tree = MemoryTree(
+            {"foo/_version.py": b"__version__ = version = '3.1.dev4+gabc'\n"}
+        )
+        config = {"write_to": "foo/_version.py"}
+        self.assertEqual("3.1.dev4+gabc", get_version(tree.root, config))
+        self.assertEqual("0.0", get_version(tree.root, {"fallback_version": "0.0"}))
+        self.assertIsInstance(get_version(tree.root, {}), TooComplicated)
+
+    def test_static_version_wins(self) -> None:
+        tree = MemoryTree(
+            {
+                "setup.py": b"from setuptools import setup\n"
+                b"setup(name='foo', version='1.0')\n",
+                "pyproject.toml": b"[tool.setuptools_scm]\nfallback_version = '9'\n",
+            }
+        )
+        self.assertEqual("1.0", SetuptoolsReader(tree.root).get_metadata().version)
+
+
+def _today() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%d")
@@ -2,11 +2,19 @@ import unittest
 from pathlib import Path
 from typing import Dict, Optional
 
+import libcst as cst
 import volatile
 
+from dowsing.cache import FileCache, SummaryCache
 from dowsing.setuptools import SetuptoolsReader
-from dowsing.setuptools.setup_py_parsing import FindPackages
-from dowsing.types import Distribution
+from dowsing.setuptools.directives import resolve
+from dowsing.setuptools.setup_py_parsing import (
+    FindPackages,
+    SetupCallAnalyzer,
+    SetupCallTransformer,
+)
+from dowsing.tree import MemoryTree
+from dowsing.types import Confidence, Distribution, Sometimes, Span, TooComplicated
 
 
 class SetuptoolsReaderTest(unittest.TestCase):
@@ -343,7 +351,9 @@ setup(name = a + "1111", packages=[] + p, classifiers=a + p)
         )
         self.assertEqual(d.name, "aaaa1111")
         self.assertEqual(d.packages, ["a", "b", "c"])
-        self.assertEqual(d.classifiers, "??")
+        self.assertIsInstance(d.classifiers, TooComplicated)
+        self.assertEqual(Confidence.UNKNOWN, d.get_confidence("classifiers"))
+        self.assertEqual(Confidence.EXACT, d.get_confidence("name"))
 
     def test_self_reference_assignments(self) -> None:
         d = self._read(
@@ -394,7 +404,7 @@ setup(
             """
         )
         self.assertEqual(d.name, "foo")
-        self.assertEqual(d.version, "??")
+        self.assertEqual(TooComplicated("can't evaluate version"), d.version)
         self.assertEqual(d.classifiers, ())
 
     def test_redefines_builtin(self) -> None:
@@ -416,4 +426,923 @@ setuptools.setup(**kwargs)
 """
         )
         self.assertEqual(d.name, "foo")
-        self.assertEqual(d.description, "??")
+        self.assertIsInstance(d.description, TooComplicated)
+        self.assertEqual({"description": Confidence.UNKNOWN}, d.confidence_map())
+
+    def test_confidence(self) -> None:
+        d = self._read(
+            """\
+from setuptools import setup
+setup(name="foo", packages=get_packages(), **get_kwargs())
+"""
+        )
+        self.assertEqual(Confidence.EXACT, d.get_confidence("name"))
+        self.assertEqual(Confidence.UNKNOWN, d.get_confidence("packages"))
+        self.assertEqual(Confidence.UNKNOWN, d.get_confidence("packages_dict"))
+        # Not set, but could have been
+        self.assertEqual(Confidence.UNKNOWN, d.get_confidence("version"))
+
+        d = self._read(
+            """\
+from setuptools import setup
+setup(name="foo", packages=["foo"])
+"""
+        )
+        self.assertEqual({}, d.confidence_map())
+
+    def test_unknown_py_modules(self) -> None:
+        for py_modules in ("[foo.bar]", "foo.bar"):
+            with self.subTest(py_modules):
+                d = self._read(
+                    f"""\
+from setuptools import setup
+setup(name="x", py_modules={py_modules})
+"""
+                )
+                self.assertEqual("x", d.name)
+                self.assertIsNone(d.source_mapping)
+                self.assertEqual(Confidence.UNKNOWN, d.get_confidence("py_modules"))
+                self.assertEqual(Confidence.UNKNOWN, d.get_confidence("packages_dict"))
+                self.assertEqual(Confidence.UNKNOWN, d.get_confidence("source_mapping"))
+
+    def test_not_exact_when_unsure(self) -> None:
+        # Each of these used to come back as a wrong value that looked EXACT
+        d = self._read(
+            """\
+from setuptools import setup
+try:
+    long_description = open("README").read()
+except IOError:
+    long_description = ""
+packages = []
+for p in ["pkg", "pkg.sub"]:
+    packages = packages + [p]
+reqs = ["a"]
+for extra in ["b"]:
+    reqs.append(extra)
+setup(
+    name="x",
+    long_description=long_description,
+    packages=packages,
+    install_requires=reqs,
+)
+""",
+            extra_files={"README": "Hello"},
+        )
+        self.assertEqual("x", d.name)
+        self.assertEqual(
+            {
+                "description": Confidence.UNKNOWN,
+                "packages": Confidence.UNKNOWN,
+                "requires_dist": Confidence.UNKNOWN,
+            },
+            {
+                k: d.get_confidence(k)
+                for k in ("description", "packages", "requires_dist")
+            },
+        )
+        self.assertEqual(Confidence.UNKNOWN, d.get_confidence("source_mapping"))
+
+    def test_conditions(self) -> None:
+        d = self._read(
+            """\
+import os, platform, sys
+from setuptools import setup
+
+PY2 = sys.version_info[0] == 2
+deps = ["requests"]
+if PY2:
+    deps = deps + ["futures"]
+elif sys.version_info < (3, 7):
+    deps += ["dataclasses"]
+if sys.platform == "win32":
+    deps = deps + ["pywin32"]
+elif platform.system() == "Darwin":
+    deps = deps + ["pyobjc"]
+if "test" in sys.argv:
+    setup_requires = ["pytest-runner"]
+else:
+    setup_requires = []
+
+setup(
+    name="foo",
+    version="1.0" if sys.version_info >= (3,) else "0.9",
+    install_requires=deps,
+    setup_requires=setup_requires,
+    extras_require={"x": ["a"] + (["b"] if os.name == "nt" else [])},
+)
+"""
+        )
+        self.assertEqual(
+            [
+                'dataclasses; python_version < "3.7" and python_version >= "3"',
+                'futures; python_version < "3"',
+                'pyobjc; platform_system == "Darwin" and sys_platform != "win32"',
+                'pywin32; sys_platform == "win32"',
+                "requests",
+            ],
+            sorted(d.requires_dist),
+        )
+        self.assertEqual({"x": ["a", 'b; os_name == "nt"']}, d.extras_require)
+        self.assertFalse(d.setup_requires)
+        self.assertIsInstance(d.version, Sometimes)
+        self.assertEqual(Confidence.SOMETIMES, d.get_confidence("version"))
+        self.assertEqual(Confidence.SOMETIMES, d.get_confidence("requires_dist"))
+        self.assertEqual(Confidence.EXACT, d.get_confidence("name"))
+
+    def test_conditions_unrecognized(self) -> None:
+        d = self._read(
+            """\
+from setuptools import setup
+deps = ["a"]
+if some_function():
+    deps = ["b"]
+setup(name="foo", install_requires=deps)
+"""
+        )
+        # Whether deps is ["a"] or ["b"] can't be known
+        self.assertEqual(Confidence.UNKNOWN, d.get_confidence("requires_dist"))
+
+        d = self._read(
+            """\
+import os
+from setuptools import setup
+deps = ["a"]
+if os.environ.get("X"):
+    deps.append("b")
+setup(name="foo", install_requires=deps)
+"""
+        )
+        self.assertEqual(Confidence.UNKNOWN, d.get_confidence("requires_dist"))
+
+        # Tests that don't depend on the environment are fine
+        d = self._read(
+            """\
+from setuptools import setup
+DEBUG = False
+deps = ["a"]
+if DEBUG:
+    deps.append("b")
+if __name__ == "__main__":
+    deps.append("c")
+setup(name="foo", install_requires=deps)
+"""
+        )
+        self.assertEqual(["a", "c"], d.requires_dist)
+        self.assertEqual({}, d.confidence_map())
+
+    def test_conditions_loops_and_try(self) -> None:
+        # A loop might run any number of times
+        d = self._read(
+            """\
+from setuptools import setup
+v = "1"
+while False:
+    v = "2"
+for x in []:
+    v = "3"
+setup(name="foo", version=v)
+"""
+        )
+        self.assertIsInstance(d.version, TooComplicated)
+        self.assertEqual(Confidence.UNKNOWN, d.get_confidence("version"))
+
+        # Which of try or except sets it depends on whether the import works
+        d = self._read(
+            """\
+from setuptools import setup
+try:
+    from mypkg import __version__ as v
+except ImportError:
+    v = "0.0"
+setup(name="foo", version=v)
+""",
+            extra_files={"mypkg.py": '__version__ = "9"\n'},
+        )
+        self.assertIsInstance(d.version, TooComplicated)
+        self.assertEqual(Confidence.UNKNOWN, d.get_confidence("version"))
+
+    def test_mutations(self) -> None:
+        d = self._read(
+            """\
+import sys
+from setuptools import setup
+
+base = {"name": "foo", "version": "1.0"}
+params = dict(base, license="MIT")
+params.update({"description": "d"})
+params.update(url="u")
+reqs = ["a"]
+reqs.append("b")
+if sys.platform == "win32":
+    reqs.extend(["c"])
+reqs.insert(0, "first")
+params["install_requires"] = reqs
+other = reqs.copy()
+other.append("nope")
+setup(**params, **{**base, "author": "me"})
+reqs.append("after")
+"""
+        )
+        self.assertEqual("foo", d.name)
+        self.assertEqual("1.0", d.version)
+        self.assertEqual("MIT", d.license)
+        self.assertEqual("d", d.summary)
+        self.assertEqual("u", d.home_page)
+        self.assertEqual("me", d.author)
+        self.assertEqual(
+            ["first", "a", "b", 'c; sys_platform == "win32"'], d.requires_dist
+        )
+        self.assertEqual({"requires_dist": Confidence.SOMETIMES}, d.confidence_map())
+
+    def test_mutations_unsupported(self) -> None:
+        d = self._read(
+            """\
+from setuptools import setup
+reqs = ["a", "b"]
+reqs.pop()
+classifiers = []
+for x in ("1", "2"):
+    classifiers.append(x)
+setup(name="foo", install_requires=reqs, classifiers=classifiers)
+"""
+        )
+        self.assertIsInstance(d.requires_dist, TooComplicated)
+        self.assertIsInstance(d.classifiers, TooComplicated)
+
+    def test_mutations_alias(self) -> None:
+        d = self._read(
+            """\
+from setuptools import setup
+reqs = ["a"]
+r2 = reqs
+r2.append("b")
+base = ["c"]
+classifiers = base
+base.append("d")
+keywords = ["e"]
+unchanged = keywords
+setup(
+    name="foo",
+    install_requires=reqs,
+    classifiers=classifiers,
+    keywords=keywords,
+)
+"""
+        )
+        self.assertIsInstance(d.requires_dist, TooComplicated)
+        self.assertIsInstance(d.classifiers, TooComplicated)
+        self.assertEqual(["e"], d.keywords)
+
+    def test_mutations_try(self) -> None:
+        # The pattern from pyasn1-modules
+        d = self._read(
+            """\
+try:
+    from setuptools import setup
+    params = {
+        "zip_safe": True,
+        "install_requires": ["pyasn1>=0.4.6,<0.5.0"],
+    }
+except ImportError:
+    from distutils.core import setup
+    params = {}
+params.update({"name": "pyasn1-modules", "version": "0.2.8"})
+setup(**params)
+"""
+        )
+        # Not "no requirements"
+        self.assertEqual(Confidence.UNKNOWN, d.get_confidence("requires_dist"))
+        self.assertEqual(Confidence.UNKNOWN, d.get_confidence("zip_safe"))
+
+    def test_file_reads(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            (dp / "README.md").write_text("Long text\n")
+            (dp / "VERSION").write_text("1.2.3")
+            (dp / "requirements.txt").write_text("a\nb>=1\n")
+            (dp / "docs").mkdir()
+            (dp / "docs" / "requirements.txt").write_text("c\n")
+            (dp / "setup.py").write_text(
+                """\
+import io
+import os
+from pathlib import Path
+from setuptools import setup
+
+here = os.path.abspath(os.path.dirname(__file__))
+with io.open(os.path.join(here, "README.md"), encoding="utf-8") as f:
+    long_description = f.read()
+
+reqs = open("requirements.txt").read().splitlines()
+reqs += (Path(__file__).parent / "docs" / "requirements.txt").read_text().splitlines()
+
+setup(
+    name="foo",
+    version=open("VERSION").read(),
+    long_description=long_description,
+    install_requires=reqs,
+    tests_require=open("missing.txt").readlines(),
+    license=open("../outside").read(),
+)
+"""
+            )
+            md = SetuptoolsReader(dp).get_metadata()
+            self.assertEqual("1.2.3", md.version)
+            self.assertEqual("Long text\n", md.description)
+            self.assertEqual(["a", "b>=1", "c"], md.requires_dist)
+            self.assertIsInstance(md.tests_require, TooComplicated)
+            self.assertIsInstance(md.license, TooComplicated)
+            self.assertEqual(
+                (
+                    "VERSION",
+                    "README.md",
+                    "requirements.txt",
+                    "docs/requirements.txt",
+                    "missing.txt",
+                ),
+                md.input_files,
+            )
+
+    def test_imports(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            (dp / "src" / "mypkg").mkdir(parents=True)
+            (dp / "src" / "mypkg" / "__init__.py").write_text(
+                "from ._version import __version__ as version_str\n"
+                "import os\n"
+                "def f(): pass\n"
+            )
+            (dp / "src" / "mypkg" / "_version.py").write_text(
+                '__version__ = "2.0" + ".1"\n'
+            )
+            (dp / "src" / "mypkg" / "meta.py").write_text(
+                'AUTHOR = "me"\nEMAIL = AUTHOR + "@example.com"\nX = f()\n'
+            )
+            (dp / "about.py").write_text(
+                '__title__ = "foo"\n__license__ = "MIT"\ninstall_requires = ["a"]\n'
+            )
+            (dp / "setup.py").write_text(
+                """\
+from setuptools import setup
+from mypkg import version_str
+import mypkg.meta
+
+about = {}
+with open("about.py") as f:
+    exec(f.read(), about)
+
+exec(compile(open("about.py").read(), "about.py", "exec"))
+install_requires.append("b")
+
+setup(
+    name=about["__title__"],
+    version=version_str,
+    author=mypkg.meta.AUTHOR,
+    author_email=mypkg.meta.EMAIL,
+    maintainer=mypkg.meta.X,
+    license=__license__,
+    install_requires=install_requires,
+)
+"""
+            )
+            md = SetuptoolsReader(dp).get_metadata()
+            self.assertEqual("foo", md.name)
+            self.assertEqual("2.0.1", md.version)
+            self.assertEqual("me", md.author)
+            self.assertEqual("me@example.com", md.author_email)
+            self.assertIsInstance(md.maintainer, TooComplicated)
+            self.assertEqual("MIT", md.license)
+            self.assertEqual(["a", "b"], md.requires_dist)
+            self.assertEqual(
+                [
+                    "about.py",
+                    "src/mypkg/__init__.py",
+                    "src/mypkg/_version.py",
+                    "src/mypkg/meta.py",
+                ],
+                sorted(md.input_files),
+            )
+
+    def test_import_summaries_are_shared(self) -> None:
+        summaries = SummaryCache()
+        with volatile.dir() as d:
+            for project in ("a", "b"):
+                dp = Path(d, project)
+                (dp / "pkg").mkdir(parents=True)
+                (dp / "pkg" / "version.py").write_text('VERSION = "1.0"\n')
+                source = (
+                    "from setuptools import setup\n"
+                    "from pkg.version import VERSION\n"
+                    "setup(version=VERSION)\n"
+                )
+                analyzer = SetupCallAnalyzer(root=dp, summary_cache=summaries)
+                cst.MetadataWrapper(cst.parse_module(source)).visit(analyzer)
+                self.assertEqual("1.0", analyzer.saved_args["version"].value)
+                self.assertEqual(["pkg/version.py"], analyzer.input_files)
+                self.assertEqual(1, len(summaries))
+
+    def test_local_functions(self) -> None:
+        d = self._read(
+            """\
+import sys
+from setuptools import setup
+
+def get_requires(extra, *more, base="a"):
+    reqs = [base]
+    reqs.append(extra)
+    return reqs + [more[0]]
+
+def get_kwargs():
+    kw = dict(name="foo", install_requires=get_requires("b", "c"))
+    kw.update(version="1.0")
+    return kw
+
+def setup_package(license, **extra):
+    if sys.platform == "win32":
+        return
+    setup(license=license, **get_kwargs(), **extra)
+
+def main():
+    setup_package("MIT", author="me")
+
+if __name__ == "__main__":
+    main()
+"""
+        )
+        self.assertEqual("foo", d.name)
+        self.assertEqual("1.0", d.version)
+        self.assertEqual("MIT", d.license)
+        self.assertEqual("me", d.author)
+        self.assertEqual(["a", "b", "c"], d.requires_dist)
+
+    def test_local_functions_unsupported(self) -> None:
+        d = self._read(
+            """\
+from setuptools import setup
+
+def forever():
+    return forever()
+
+def two(x):
+    if x:
+        return "a"
+    return "b"
+
+def wrapper(version):
+    setup(name="foo", version=version, description=forever(), author=two(1))
+
+wrapper("1.0")
+wrapper("2.0")
+"""
+        )
+        self.assertEqual("foo", d.name)
+        # Called from more than one place
+        self.assertIsInstance(d.version, TooComplicated)
+        self.assertIsInstance(d.summary, TooComplicated)
+        self.assertIsInstance(d.author, TooComplicated)
+
+    def test_constant_folding(self) -> None:
+        d = self._read(
+            """\
+from setuptools import setup
+import os
+import sys
+
+MAJOR = 1
+MINOR = 2
+version = "{}.{}".format(MAJOR, MINOR)
+name = "Foo-Bar".lower().replace("-", "_")
+extras = {k: ["%s>=%d" % (k, 1)] for k in ("a", "b")}
+base = ["  x  ", "y", ""]
+deps = [d.strip() for d in base if d]
+deps += [f"{n}>={version!s}" for n in "zw"]
+if sys.version_info < (3,):
+    deps.append("py2")
+classifiers = [
+    "Programming Language :: Python :: " + v for v in "3.7 3.8".split()
+]
+setup(
+    name=name,
+    version=f"{version}.{MINOR * 2}",
+    description="=" * 3 if len(name) > 3 else "short",
+    author=", ".join(sorted(["b", "a"])),
+    url="https://example.com/" + os.path.join("x", name)[-3:],
+    license=dict(a="MIT").get("a", "?"),
+    install_requires=deps,
+    extras_require=extras,
+    classifiers=classifiers,
+)
+"""
+        )
+        self.assertEqual("foo_bar", d.name)
+        self.assertEqual("1.2.4", d.version)
+        self.assertEqual("===", d.summary)
+        self.assertEqual("a, b", d.author)
+        self.assertEqual("https://example.com/bar", d.home_page)
+        self.assertEqual("MIT", d.license)
+        self.assertEqual(
+            ["x", "y", "z>=1.2", "w>=1.2", 'py2; python_version < "3"'],
+            d.requires_dist,
+        )
+        self.assertEqual({"a": ["a>=1"], "b": ["b>=1"]}, d.extras_require)
+        self.assertEqual(
+            [
+                "Programming Language :: Python :: 3.7",
+                "Programming Language :: Python :: 3.8",
+            ],
+            d.classifiers,
+        )
+
+    def test_constant_folding_unsafe(self) -> None:
+        d = self._read(
+            """\
+from setuptools import setup
+import os
+
+setup(
+    name="x" * 1000000000,
+    version="{0.__class__}".format(1),
+    description="{:999999999}".format(1),
+    author=os.environ.get("AUTHOR", "a").strip(),
+    url=[x for x in range(10)],
+)
+"""
+        )
+        self.assertIsInstance(d.name, TooComplicated)
+        self.assertIsInstance(d.version, TooComplicated)
+        self.assertIsInstance(d.summary, TooComplicated)
+        self.assertIsInstance(d.author, TooComplicated)
+        self.assertIsInstance(d.home_page, TooComplicated)
+
+    def test_confidence_setup_cfg(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            (dp / "setup.cfg").write_text(
+                """\
+[metadata]
+name = foo
+version = attr: foo.__version__
+long_description = file: README.md
+"""
+            )
+            md = SetuptoolsReader(dp).get_metadata()
+            self.assertEqual(
+                {"version": Confidence.UNKNOWN, "description": Confidence.UNKNOWN},
+                md.confidence_map(),
+            )
+
+    def test_provenance(self) -> None:
+        d = self._read(
+            """\
+from setuptools import setup
+kwargs = dict(version="1.0")
+setup(
+    name="foo",
+    **kwargs
+)
+"""
+        )
+        self.assertEqual(
+            {
+                "name": Span("setup.py", 4, 4, 4, 14),
+                "version": Span("setup.py", 5, 4, 5, 12),
+            },
+            d.provenance,
+        )
+
+    def test_transformer_by_span(self) -> None:
+        source = """\
+from setuptools import setup
+setup(name="foo", version="1.0")
+"""
+        analyzer = SetupCallAnalyzer()
+        cst.MetadataWrapper(cst.parse_module(source)).visit(analyzer)
+        self.assertEqual(Span("setup.py", 2, 0, 2, 32), analyzer.setup_span)
+        assert analyzer.setup_span is not None
+
+        transformer = SetupCallTransformer(
+            analyzer.setup_span, {"version": cst.SimpleString('"2.0"')}
+        )
+        new_module = cst.MetadataWrapper(cst.parse_module(source)).visit(transformer)
+        self.assertEqual(
+            """\
+from setuptools import setup
+setup(name="foo", version="2.0")
+""",
+            new_module.code,
+        )
+
+    def test_pyproject(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            (dp / "pyproject.toml").write_text(
+                """\
+[build-system]
+requires = ["setuptools>=61"]
+build-backend = "setuptools.build_meta"
+
+[project]
+name = "foo"
+description = "Short"
+readme = "README.md"
+dynamic = ["version", "dependencies"]
+
+[project.scripts]
+foo = "foo.cli:main"
+
+[tool.setuptools.packages.find]
+where = ["lib"]
+exclude = ["foo.tests"]
+
+[tool.setuptools.package-dir]
+"" = "lib"
+
+[tool.setuptools.dynamic]
+version = {attr = "foo.__version__"}
+dependencies = {file = ["requirements.txt"]}
+"""
+            )
+            (dp / "lib" / "foo" / "tests").mkdir(parents=True)
+            (dp / "lib" / "foo" / "__init__.py").write_text("__version__ = '1.2'\n")
+            (dp / "lib" / "foo" / "tests" / "__init__.py").write_text("")
+            (dp / "README.md").write_text("# Foo\n")
+            (dp / "requirements.txt").write_text("abc\n# comment\n\ndef>=1\n")
+
+            md = SetuptoolsReader(dp).get_metadata()
+            self.assertEqual("foo", md.name)
+            self.assertEqual("Short", md.summary)
+            self.assertEqual("text/markdown", md.description_content_type)
+            self.assertEqual("1.2", md.version)
+            self.assertEqual("# Foo\n", md.description)
+            self.assertEqual(["abc", "def>=1"], md.requires_dist)
+            self.assertEqual(
+                {"console_scripts": ["foo = foo.cli:main"]}, md.entry_points
+            )
+            self.assertEqual({"foo": "lib/foo"}, md.packages_dict)
+            self.assertEqual({}, md.confidence_map())
+            self.assertEqual(
+                ("lib/foo/__init__.py", "README.md", "requirements.txt"),
+                md.input_files,
+            )
+
+    def test_pyproject_overrides_setup_cfg(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            (dp / "setup.cfg").write_text(
+                """\
+[metadata]
+name = old
+version = 1.0
+[options]
+install_requires = abc
+"""
+            )
+            (dp / "pyproject.toml").write_text(
+                """\
+[project]
+name = "new"
+dynamic = ["version", "dependencies"]
+"""
+            )
+            (dp / "new.py").write_text("")
+
+            md = SetuptoolsReader(dp).get_metadata()
+            self.assertEqual("new", md.name)
+            self.assertEqual("1.0", md.version)
+            self.assertEqual(["abc"], md.requires_dist)
+            self.assertEqual(["new"], md.py_modules)
+            self.assertEqual({}, md.confidence_map())
+
+    def test_pyproject_discovery(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            (dp / "pyproject.toml").write_text(
+                """\
+[project]
+name = "foo"
+version = "1.0"
+"""
+            )
+            for p in ("foo", "tests", "docs"):
+                (dp / p).mkdir()
+                (dp / p / "__init__.py").write_text("")
+
+            md = SetuptoolsReader(dp).get_metadata()
+            self.assertEqual({"foo": "foo"}, md.packages_dict)
+
+            (dp / "src" / "bar").mkdir(parents=True)
+            (dp / "src" / "bar" / "__init__.py").write_text("")
+            md = SetuptoolsReader(dp).get_metadata()
+            self.assertEqual({"bar": "src/bar"}, md.packages_dict)
+
+    def test_namespace_packages(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            (dp / "ns" / "pkg").mkdir(parents=True)
+            (dp / "ns" / "pkg" / "__init__.py").write_text("")
+            (dp / "setup.py").write_text(
+                """\
+from setuptools import setup, find_namespace_packages
+setup(packages=find_namespace_packages(include=["ns.*"]))
+"""
+            )
+            md = SetuptoolsReader(dp).get_metadata()
+            self.assertEqual(FindPackages(".", (), ["ns.*"], True), md.packages)
+            self.assertEqual({"ns.pkg": "ns/pkg"}, md.packages_dict)
+
+            (dp / "setup.py").write_text("from setuptools import setup\nsetup()\n")
+            (dp / "setup.cfg").write_text(
+                """\
+[options]
+packages = find_namespace:
+"""
+            )
+            md = SetuptoolsReader(dp).get_metadata()
+            self.assertEqual({"ns": "ns", "ns.pkg": "ns/pkg"}, md.packages_dict)
+
+            # [tool.setuptools.packages.find] finds namespaces by default
+            (dp / "setup.cfg").unlink()
+            (dp / "pyproject.toml").write_text(
+                """\
+[project]
+name = "ns-pkg"
+version = "1.0"
+
+[tool.setuptools.packages.find]
+include = ["ns*"]
+"""
+            )
+            md = SetuptoolsReader(dp).get_metadata()
+            self.assertEqual({"ns": "ns", "ns.pkg": "ns/pkg"}, md.packages_dict)
+
+    def test_src_layout_modules(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            (dp / "src" / "ns" / "pkg").mkdir(parents=True)
+            (dp / "src" / "ns" / "pkg" / "__init__.py").write_text("")
+            (dp / "src" / "mod.py").write_text("")
+            (dp / "pyproject.toml").write_text(
+                """\
+[project]
+name = "foo"
+version = "1.0"
+"""
+            )
+            md = SetuptoolsReader(dp).get_metadata()
+            self.assertEqual(["ns", "ns.pkg"], md.packages)
+            self.assertEqual(["mod"], md.py_modules)
+            self.assertEqual(
+                {
+                    "mod.py": "src/mod.py",
+                    "ns/pkg/__init__.py": "src/ns/pkg/__init__.py",
+                },
+                md.source_mapping,
+            )
+
+    def test_python2(self) -> None:
+        d = self._read(
+            """\
+import sys
+try:
+    from setuptools import setup
+except ImportError, e:
+    print >>sys.stderr, "no setuptools:", e
+    raise SystemExit, 1
+if sys.version_info[0] <> 2:
+    print "python 2 only"
+MODE = 0755
+print `MODE`
+setup(name="foo", version="1.0", packages=["pkg"], zip_safe=False)
+"""
+        )
+        self.assertEqual("foo", d.name)
+        self.assertEqual("1.0", d.version)
+        self.assertEqual(["pkg"], d.packages)
+        self.assertEqual(11, d.provenance["name"].start_line)
+        self.assertEqual({}, d.confidence_map())
+
+    def test_python2_dropped(self) -> None:
+        d = self._read(
+            """\
+from setuptools import setup
+def reqs((a, b)):
+    return [a]
+requires = ["abc"]
+requires += ur"def" $ 1
+setup(name="foo", install_requires=requires)
+"""
+        )
+        self.assertEqual("foo", d.name)
+        self.assertEqual(["abc"], d.requires_dist)
+        # Only what the dropped statements could have changed
+        self.assertEqual({"requires_dist": Confidence.UNKNOWN}, d.confidence_map())
+
+        # Including through a function, or its parameters
+        d = self._read(
+            """\
+from setuptools import setup
+def reqs(extra):
+    return ["abc"] + extra
+def version((a, b)):
+    return a
+def main(**kwargs):
+    setup(name="foo", install_requires=reqs([]), **kwargs)
+main(version=version((1, 2)))
+"""
+        )
+        self.assertEqual(
+            {"requires_dist": Confidence.EXACT, "version": Confidence.UNKNOWN},
+            {
+                "requires_dist": d.get_confidence("requires_dist"),
+                "version": d.get_confidence("version"),
+            },
+        )
+        self.assertEqual(Confidence.EXACT, d.get_confidence("name"))
+
+        # An unused one changes nothing
+        d = self._read(
+            """\
+from setuptools import setup
+def f((a, b)):
+    return a
+setup(name="foo", version="1.0")
+"""
+        )
+        self.assertEqual({}, d.confidence_map())
+
+        # Unless it's setup() itself
+        with self.assertRaises(SyntaxError):
+            self._read("from setuptools import setup\nsetup(name=$)\n")
+
+    def test_encoding(self) -> None:
+        tree = MemoryTree(
+            {
+                "setup.py": """\
+# -*- coding: latin-1 -*-
+from setuptools import setup
+setup(name="foo", author="Ren\xe9")
+""".encode(
+                    "latin-1"
+                ),
+            }
+        )
+        d = SetuptoolsReader(tree.root).get_metadata()
+        self.assertEqual("Ren\xe9", d.author)
+
+    def test_setup_cfg_directives(self) -> None:
+        tree = MemoryTree(
+            {
+                "setup.cfg": b"""\
+[metadata]
+name = foo
+version = attr: foo.version.VERSION
+long_description = file: README.rst, CHANGES.rst
+[options]
+package_dir =
+    = src
+install_requires = file: requirements.txt
+[options.extras_require]
+x = file: x.txt
+""",
+                "src/foo/__init__.py": b"",
+                "src/foo/version.py": b"VERSION = (1, 2, 'post3')\n",
+                "README.rst": b"Foo",
+                "CHANGES.rst": b"Changes",
+                "requirements.txt": b"abc\n",
+            }
+        )
+        md = SetuptoolsReader(tree.root).get_metadata()
+        self.assertEqual("1.2.post3", md.version)
+        self.assertEqual("Foo\nChanges", md.description)
+        self.assertEqual(["abc"], md.requires_dist)
+        self.assertIsInstance(md.extras_require["x"], TooComplicated)
+        self.assertEqual({"extras_require": Confidence.UNKNOWN}, md.confidence_map())
+
+    def test_attr_not_in_src(self) -> None:
+        # Without package_dir, setuptools doesn't look in src
+        tree = MemoryTree(
+            {
+                "setup.cfg": b"[metadata]\nname = foo\nversion = attr: foo.v\n",
+                "src/foo/__init__.py": b"v = '2.0'\n",
+            }
+        )
+        md = SetuptoolsReader(tree.root).get_metadata()
+        self.assertIsInstance(md.version, TooComplicated)
+        self.assertEqual(Confidence.UNKNOWN, md.get_confidence("version"))
+
+    def test_attr_cache(self) -> None:
+        summaries = SummaryCache()
+        files = FileCache()
+        for name in ("a", "b"):
+            tree = MemoryTree(
+                {
+                    "setup.cfg": f"[metadata]\nversion = attr: {name}.v\n".encode(),
+                    f"{name}.py": b"v = '1.0'\n",
+                }
+            )
+            self.assertEqual(
+                ("1.0", [f"{name}.py"]),
+                resolve(tree.root, f"attr: {name}.v", None, files, summaries),
+            )
+        self.assertEqual(1, len(summaries))
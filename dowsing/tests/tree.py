@@ -0,0 +1,189 @@
+import unittest
+from pathlib import Path
+from typing import Any, Dict, List
+
+import setuptools
+import volatile
+
+from ..discovery import find_layout, find_packages
+from ..pep517 import get_metadata, get_requires_for_build_wheel
+from ..tree import GitTree, MemoryTree, Tree
+from .util import git
+
+
+class GitTreeTest(unittest.TestCase):
+    def test_tree_paths(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            git(dp, "init", "-q")
+            (dp / "a" / "b").mkdir(parents=True)
+            (dp / "a" / "b" / "c.txt").write_text("hello")
+            (dp / "top.txt").write_text("x")
+            git(dp, "add", "-A")
+            git(dp, "commit", "-q", "-m", "one")
+            (dp / "top.txt").write_text("changed in work tree")
+
+            with GitTree(dp, "HEAD") as tree:
+                root = tree.root
+                self.assertEqual(".", root.as_posix())
+                self.assertEqual(["a", "top.txt"], [p.name for p in root.iterdir()])
+                self.assertEqual("x", (root / "top.txt").read_text())
+                self.assertTrue((root / "a/b").is_dir())
+                self.assertFalse((root / "a/b").is_file())
+                self.assertFalse((root / "missing").exists())
+                self.assertEqual(("a", "b", "c.txt"), (root / "a/b/c.txt").parts)
+                self.assertEqual(root / "a", (root / "a/b").parent)
+                self.assertEqual(
+                    ["a/b/c.txt"], [p.as_posix() for p in root.rglob("*.txt")][:1]
+                )
+                with self.assertRaises(FileNotFoundError):
+                    (root / "missing").read_bytes()
+
+            # A subdirectory of the work tree is the root of its tree.
+            with GitTree(dp / "a", "HEAD") as tree:
+                self.assertEqual(["b"], [p.name for p in tree.root.iterdir()])
+
+    def test_get_metadata_at_rev(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            git(dp, "init", "-q")
+            proj = dp / "proj"
+            (proj / "foo" / "sub").mkdir(parents=True)
+            (proj / "foo" / "__init__.py").write_text("")
+            (proj / "foo" / "sub" / "__init__.py").write_text("")
+            (proj / "setup.py").write_text(
+                """\
+from setuptools import setup, find_packages
+setup(
+    name="foo",
+    version="1.0",
+    packages=find_packages(),
+    setup_requires=["bar"],
+)
+"""
+            )
+            git(dp, "add", "-A")
+            git(dp, "commit", "-q", "-m", "one")
+            rev = git(dp, "rev-parse", "HEAD").strip()
+            (proj / "setup.py").write_text(
+                "from setuptools import setup\nsetup(name='foo', version='2.0')\n"
+            )
+
+            md = get_metadata(proj, rev=rev)
+            self.assertEqual("foo", md.name)
+            self.assertEqual("1.0", md.version)
+            self.assertEqual({"foo": "foo", "foo.sub": "foo/sub"}, md.packages_dict)
+            self.assertEqual(
+                {
+                    "foo/__init__.py": "foo/__init__.py",
+                    "foo/sub/__init__.py": "foo/sub/__init__.py",
+                },
+                md.source_mapping,
+            )
+            self.assertEqual(
+                ["setuptools", "wheel", "bar"],
+                get_requires_for_build_wheel(proj, rev=rev),
+            )
+            self.assertEqual("2.0", get_metadata(proj).version)
+
+
+class FindPackagesTest(unittest.TestCase):
+    def test_matches_setuptools(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            for pkg in ("a", "a/b", "a/b/c", "tests", "x.y", "n/m", "__pycache__"):
+                (dp / pkg).mkdir(parents=True, exist_ok=True)
+                (dp / pkg / "__init__.py").write_text("")
+            (dp / "a" / "data").mkdir()
+            cases: List[Dict[str, Any]] = [
+                {},
+                {"exclude": ["tests", "a.b"]},
+                {"include": ["a.*"]},
+            ]
+            for args in cases:
+                with self.subTest(args):
+                    self.assertEqual(
+                        sorted(setuptools.find_packages(d, **args)),
+                        sorted(find_packages(dp, **args)),
+                    )
+                with self.subTest(args, namespaces=True):
+                    self.assertEqual(
+                        sorted(setuptools.find_namespace_packages(d, **args)),
+                        sorted(find_packages(dp, **args, namespaces=True)),
+                    )
+
+    def test_find_layout(self) -> None:
+        tree = MemoryTree(
+            {
+                "src/ns/pkg/__init__.py": b"",
+                "src/ns/pkg/data.txt": b"",
+                "src/mod.py": b"",
+                "src/not-a-module.py": b"",
+                "src/setup.py": b"",
+                "src/mod.txt": b"",
+            }
+        )
+        layout = find_layout(tree.root / "src", prefix="src")
+        self.assertEqual([], layout.packages)
+        self.assertEqual(["mod"], layout.py_modules)
+
+        layout = find_layout(tree.root / "src", namespaces=True, prefix="src")
+        self.assertEqual(["ns", "ns.pkg"], layout.packages)
+        self.assertEqual(["mod"], layout.py_modules)
+        self.assertEqual({"ns": "src/ns", "ns.pkg": "src/ns/pkg"}, layout.packages_dict)
+
+        layout = find_layout(tree.root / "src", include=("ns.*",), namespaces=True)
+        self.assertEqual(["ns.pkg"], layout.packages)
+        self.assertEqual([], layout.py_modules)
+        self.assertEqual({"ns.pkg": "ns/pkg"}, layout.packages_dict)
+
+
+class MemoryTreeTest(unittest.TestCase):
+    def test_get_metadata(self) -> None:
+        tree = MemoryTree(
+            {
+                "pyproject.toml": b"""\
+[build-system]
+requires = ["flit_core"]
+build-backend = "flit_core.buildapi"
+
+[project]
+name = "foo"
+version = "1.0"
+dependencies = ["bar"]
+""",
+                "foo/__init__.py": b"",
+                "foo/sub/__init__.py": b"",
+                "./foo/data.json": b"{}",
+            },
+            dirs=["foo/empty"],
+        )
+        root = tree.root
+        self.assertEqual(
+            ["__init__.py", "data.json", "empty", "sub"],
+            [p.name for p in (root / "foo").iterdir()],
+        )
+        self.assertTrue((root / "foo/empty").is_dir())
+        with self.assertRaises(IsADirectoryError):
+            (root / "foo").read_bytes()
+        with self.assertRaises(NotADirectoryError):
+            list((root / "foo/data.json").iterdir())
+
+        md = get_metadata(root)
+        self.assertEqual("foo", md.name)
+        self.assertEqual(["bar"], md.requires_dist)
+        self.assertEqual(
+            {
+                "foo/__init__.py": "foo/__init__.py",
+                "foo/data.json": "foo/data.json",
+                "foo/sub/__init__.py": "foo/sub/__init__.py",
+            },
+            md.source_mapping,
+        )
+
+    def test_subclass_without_read(self) -> None:
+        class NoRead(Tree):
+            pass
+
+        with self.assertRaises(TypeError):
+            NoRead(["a.txt"])  # type: ignore[abstract]
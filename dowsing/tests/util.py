@@ -0,0 +1,36 @@
+"""
+Helpers shared by the tests that need git repos or several projects.
+"""
+
+import subprocess
+from pathlib import Path
+
+
+def git(cwd: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", "-c", "user.name=x", "-c", "user.email=x@example.com", *args],
+        cwd=cwd,
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    ).stdout.decode()
+
+
+def make_project(p: Path, name: str, package: bool = False) -> None:
+    """
+    Writes a setup.py for `name` in p, which lists a package of the same name
+    (created here) when `package`, and otherwise uses find_packages().
+    """
+    p.mkdir(parents=True, exist_ok=True)
+    if package:
+        (p / name).mkdir()
+        (p / name / "__init__.py").write_text("")
+        packages = f"[{name!r}]"
+    else:
+        packages = "find_packages()"
+    (p / "setup.py").write_text(
+        f"""\
+from setuptools import setup, find_packages
+setup(name={name!r}, packages={packages})
+"""
+    )
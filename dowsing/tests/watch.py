@@ -0,0 +1,159 @@
+import os
+import unittest
+from pathlib import Path
+
+import volatile
+
+from ..watch import Watcher
+from .util import git
+
+
+def _bump(p: Path) -> None:
+    # Filesystem timestamps can be coarse; make sure the change is visible.
+    st = p.stat()
+    os.utime(p, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+class WatcherTest(unittest.TestCase):
+    def test_stages(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            (dp / "setup.py").write_text(
+                """\
+from setuptools import setup, find_packages
+setup(name="foo", packages=find_packages())
+"""
+            )
+            (dp / "pkg").mkdir()
+            (dp / "pkg" / "__init__.py").write_text("")
+
+            w = Watcher(dp)
+            md = w.get_metadata()
+            self.assertEqual(("metadata",), w.last_stages)
+            self.assertEqual("foo", md.name)
+            self.assertEqual({"pkg/__init__.py": "pkg/__init__.py"}, md.source_mapping)
+
+            self.assertIs(md, w.get_metadata())
+            self.assertEqual((), w.last_stages)
+
+            # Editing a module doesn't change anything we report
+            (dp / "pkg" / "__init__.py").write_text("x = 1\n")
+            w.get_metadata()
+            self.assertEqual((), w.last_stages)
+
+            # Adding one only redoes the file listing
+            (dp / "pkg" / "mod.py").write_text("")
+            _bump(dp / "pkg")
+            md2 = w.get_metadata()
+            self.assertEqual(("source_mapping",), w.last_stages)
+            self.assertEqual(
+                {"pkg/__init__.py": "pkg/__init__.py", "pkg/mod.py": "pkg/mod.py"},
+                md2.source_mapping,
+            )
+            # The previous result is left alone
+            self.assertEqual({"pkg/__init__.py": "pkg/__init__.py"}, md.source_mapping)
+
+            # A new subpackage can change `packages`
+            (dp / "pkg" / "sub").mkdir()
+            (dp / "pkg" / "sub" / "__init__.py").write_text("")
+            _bump(dp / "pkg")
+            md3 = w.get_metadata()
+            self.assertEqual(("metadata",), w.last_stages)
+            self.assertEqual(
+                {"pkg": "pkg", "pkg.sub": "pkg/sub"}, dict(md3.packages_dict)
+            )
+
+            # Touching setup.py without changing it is free
+            _bump(dp / "setup.py")
+            w.get_metadata()
+            self.assertEqual((), w.last_stages)
+
+            (dp / "setup.py").write_text(
+                """\
+from setuptools import setup, find_packages
+setup(name="bar", packages=find_packages())
+"""
+            )
+            _bump(dp / "setup.py")
+            self.assertEqual("bar", w.get_metadata().name)
+            self.assertEqual(("metadata",), w.last_stages)
+
+    def test_new_config_file(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            (dp / "setup.py").write_text(
+                "from setuptools import setup\nsetup(name='foo')\n"
+            )
+            w = Watcher(dp)
+            self.assertEqual(None, w.get_metadata().version)
+
+            (dp / "setup.cfg").write_text("[metadata]\nversion = 1.0\n")
+            self.assertEqual("1.0", w.get_metadata().version)
+            self.assertEqual(("metadata",), w.last_stages)
+
+    def test_input_files(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            (dp / "setup.py").write_text(
+                "from setuptools import setup\n"
+                "setup(name='foo', version=open('VERSION').read())\n"
+            )
+            (dp / "VERSION").write_text("1.0")
+            w = Watcher(dp)
+            self.assertEqual("1.0", w.get_metadata().version)
+
+            (dp / "VERSION").write_text("2.0")
+            _bump(dp / "VERSION")
+            self.assertEqual("2.0", w.get_metadata().version)
+            self.assertEqual(("metadata",), w.last_stages)
+
+    def test_data_files(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            (dp / "setup.py").write_text(
+                "from setuptools import setup\n"
+                "setup(name='foo', packages=['pkg'],\n"
+                "      package_data={'pkg': ['*.json']})\n"
+            )
+            (dp / "pkg").mkdir()
+            (dp / "pkg" / "__init__.py").write_text("")
+            w = Watcher(dp)
+            w.get_metadata()
+
+            # Only the files that go in the wheel, like the first time through
+            (dp / "pkg" / "data.txt").write_text("")
+            (dp / "pkg" / "data.json").write_text("")
+            _bump(dp / "pkg")
+            md = w.get_metadata()
+            self.assertEqual(("source_mapping",), w.last_stages)
+            self.assertEqual(
+                {
+                    "pkg/__init__.py": "pkg/__init__.py",
+                    "pkg/data.json": "pkg/data.json",
+                },
+                md.source_mapping,
+            )
+
+    def test_scm_version(self) -> None:
+        with volatile.dir() as d:
+            dp = Path(d)
+            (dp / "pyproject.toml").write_text("[tool.setuptools_scm]\n")
+            (dp / "setup.py").write_text(
+                "from setuptools import setup\nsetup(name='foo')\n"
+            )
+            git(dp, "init", "-q")
+            git(dp, "add", "-A")
+            git(dp, "commit", "-q", "-m", "one")
+            git(dp, "tag", "v1.0")
+            w = Watcher(dp)
+            self.assertEqual("1.0", w.get_metadata().version)
+            w.get_metadata()
+            self.assertEqual((), w.last_stages)
+
+            # Neither of these touch a file that the metadata reads
+            git(dp, "commit", "-q", "--allow-empty", "-m", "two")
+            self.assertRegex(str(w.get_metadata().version), r"^1\.1\.dev1\+g")
+            self.assertEqual(("metadata",), w.last_stages)
+            git(dp, "tag", "v2.0")
+            self.assertEqual("2.0", w.get_metadata().version)
+            self.assertEqual(("metadata",), w.last_stages)
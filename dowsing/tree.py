@@ -0,0 +1,282 @@
+"""
+Project files that aren't (necessarily) a directory on disk.
+
+Readers only use a small part of the `pathlib.Path` API.  `TreePath` implements
+that part on top of a `Tree`, so that they can be pointed at something like a
+git revision without materializing it first.
+"""
+
+import abc
+import fnmatch
+import posixpath
+import subprocess
+import threading
+from pathlib import Path, PurePath
+from typing import (
+    Any,
+    Dict,
+    Hashable,
+    IO,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+
+class Tree(abc.ABC):
+    """
+    A read-only set of files, addressed by posix paths relative to the root.
+
+    Subclasses provide the list of files up front and implement `_read`.
+    Directories are implied by the files in them, plus any passed as `dirs`.
+    """
+
+    def __init__(self, files: Iterable[str], dirs: Iterable[str] = ()) -> None:
+        self._files: Set[str] = set()
+        self._children: Dict[str, Set[str]] = {"": set()}
+        for d in dirs:
+            self._add_dir(_normalize(d))
+        for f in files:
+            f = _normalize(f)
+            parent, name = posixpath.split(f)
+            self._add_dir(parent)
+            self._children[parent].add(name)
+            self._files.add(f)
+
+    def _add_dir(self, d: str) -> None:
+        while d not in self._children:
+            self._children[d] = set()
+            parent, name = posixpath.split(d)
+            self._add_dir(parent)
+            self._children[parent].add(name)
+
+    @abc.abstractmethod
+    def _read(self, relpath: str) -> bytes:
+        """
+        Returns the contents of a file that's known to be in the tree.
+        """
+
+    def content_key(self, relpath: str) -> Optional[Hashable]:
+        """
+        Returns something that identifies the contents of a file without
+        referring to this tree, for caching reads across trees, or None if
+        there's nothing cheaper than the contents themselves.
+        """
+        return None
+
+    @property
+    def root(self) -> "TreePath":
+        return TreePath(self, "")
+
+    def is_file(self, relpath: str) -> bool:
+        return relpath in self._files
+
+    def is_dir(self, relpath: str) -> bool:
+        return relpath in self._children
+
+    def listdir(self, relpath: str) -> List[str]:
+        try:
+            return sorted(self._children[relpath])
+        except KeyError:
+            if relpath in self._files:
+                raise NotADirectoryError(relpath)
+            raise FileNotFoundError(relpath)
+
+    def read_bytes(self, relpath: str) -> bytes:
+        if relpath not in self._files:
+            if relpath in self._children:
+                raise IsADirectoryError(relpath)
+            raise FileNotFoundError(relpath)
+        return self._read(relpath)
+
+
+def _normalize(relpath: str) -> str:
+    relpath = posixpath.normpath(relpath.strip("/"))
+    return "" if relpath == "." else relpath
+
+
+class TreePath:
+    """
+    The subset of `pathlib.Path` that readers use, for a path inside a `Tree`.
+
+    Like a relative Path, `as_posix()` of the root is ".".
+    """
+
+    def __init__(self, tree: Tree, relpath: str = "") -> None:
+        self.tree = tree
+        self.relpath = _normalize(relpath)
+
+    def __truediv__(self, other: Union[str, PurePath]) -> "TreePath":
+        if isinstance(other, PurePath):
+            other = other.as_posix()
+        return TreePath(self.tree, posixpath.join(self.relpath, other))
+
+    def __eq__(self, other: Any) -> bool:
+        return (
+            isinstance(other, TreePath)
+            and other.tree is self.tree
+            and other.relpath == self.relpath
+        )
+
+    def __lt__(self, other: "TreePath") -> bool:
+        return self.relpath < other.relpath
+
+    def __hash__(self) -> int:
+        return hash((id(self.tree), self.relpath))
+
+    def __repr__(self) -> str:
+        return f"TreePath({self.tree!r}, {self.relpath!r})"
+
+    def __str__(self) -> str:
+        return self.as_posix()
+
+    @property
+    def name(self) -> str:
+        return posixpath.basename(self.relpath)
+
+    @property
+    def parent(self) -> "TreePath":
+        return TreePath(self.tree, posixpath.dirname(self.relpath))
+
+    @property
+    def parts(self) -> Tuple[str, ...]:
+        return tuple(self.relpath.split("/")) if self.relpath else ()
+
+    def as_posix(self) -> str:
+        return self.relpath or "."
+
+    def exists(self) -> bool:
+        return self.is_file() or self.is_dir()
+
+    def is_file(self) -> bool:
+        return self.tree.is_file(self.relpath)
+
+    def is_dir(self) -> bool:
+        return self.tree.is_dir(self.relpath)
+
+    def iterdir(self) -> Iterator["TreePath"]:
+        for name in self.tree.listdir(self.relpath):
+            yield self / name
+
+    def rglob(self, pattern: str) -> Iterator["TreePath"]:
+        # Only patterns without a "/" are supported, which covers "*" and
+        # "*.py" style uses.
+        for child in self.iterdir():
+            if fnmatch.fnmatchcase(child.name, pattern):
+                yield child
+            if child.is_dir():
+                yield from child.rglob(pattern)
+
+    def read_bytes(self) -> bytes:
+        return self.tree.read_bytes(self.relpath)
+
+    def read_text(
+        self, encoding: Optional[str] = None, errors: Optional[str] = None
+    ) -> str:
+        return self.read_bytes().decode(encoding or "utf-8", errors or "strict")
+
+
+class MemoryTree(Tree):
+    """
+    Files that are already in memory, as a mapping of posix paths to contents.
+
+    Empty directories can be listed in `dirs`; others are implied by their
+    files.
+    """
+
+    def __init__(self, files: Mapping[str, bytes], dirs: Iterable[str] = ()) -> None:
+        self._data = {_normalize(k): v for k, v in files.items()}
+        super().__init__(self._data.keys(), dirs)
+
+    def __repr__(self) -> str:
+        return f"MemoryTree(<{len(self._data)} files>)"
+
+    def _read(self, relpath: str) -> bytes:
+        return self._data[relpath]
+
+
+class GitTree(Tree):
+    """
+    The files of a git revision, read from the object store.
+
+    This lists the tree once with `git ls-tree` and reads blobs on demand
+    through a single `git cat-file --batch` process, so nothing is checked out.
+    If `repo` is a subdirectory of a work tree, the tree is that subdirectory
+    as of `rev`.  Call `close()` (or use as a context manager) when done.
+    """
+
+    def __init__(self, repo: Path, rev: str) -> None:
+        self.repo = repo
+        self.rev = rev
+        prefix = self._git("rev-parse", "--show-prefix").decode().strip().rstrip("/")
+        listing = self._git("ls-tree", "--full-tree", "-r", "-z", f"{rev}:{prefix}")
+
+        self._oids: Dict[str, str] = {}
+        submodules: List[str] = []
+        for entry in listing.decode("utf-8", "surrogateescape").split("\0"):
+            if not entry:
+                continue
+            info, _, relpath = entry.partition("\t")
+            _mode, kind, oid = info.split(" ")
+            if kind == "blob":
+                self._oids[relpath] = oid
+            elif kind == "commit":
+                submodules.append(relpath)
+
+        super().__init__(self._oids.keys(), submodules)
+        self._lock = threading.Lock()
+        self._proc: Optional["subprocess.Popen[bytes]"] = None
+
+    def __repr__(self) -> str:
+        return f"GitTree({self.repo!r}, {self.rev!r})"
+
+    def __enter__(self) -> "GitTree":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _git(self, *args: str) -> bytes:
+        return subprocess.run(
+            ["git", *args], cwd=self.repo, check=True, stdout=subprocess.PIPE
+        ).stdout
+
+    def content_key(self, relpath: str) -> Optional[Hashable]:
+        oid = self._oids.get(relpath)
+        return None if oid is None else ("git", oid)
+
+    def _read(self, relpath: str) -> bytes:
+        oid = self._oids[relpath]
+        with self._lock:
+            if self._proc is None:
+                self._proc = subprocess.Popen(
+                    ["git", "cat-file", "--batch"],
+                    cwd=self.repo,
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                )
+            stdin: IO[bytes] = self._proc.stdin  # type: ignore[assignment]
+            stdout: IO[bytes] = self._proc.stdout  # type: ignore[assignment]
+            stdin.write(oid.encode() + b"\n")
+            stdin.flush()
+            header = stdout.readline().split()
+            if len(header) != 3:
+                raise FileNotFoundError(f"{relpath} ({oid}): {header!r}")
+            data = stdout.read(int(header[2]))
+            stdout.read(1)  # trailing newline
+            return data
+
+    def close(self) -> None:
+        with self._lock:
+            if self._proc is not None:
+                assert self._proc.stdin is not None
+                self._proc.stdin.close()
+                self._proc.wait()
+                if self._proc.stdout is not None:
+                    self._proc.stdout.close()
+                self._proc = None
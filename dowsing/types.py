@@ -1,16 +1,36 @@
-from pathlib import Path
+import enum
+import posixpath
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
 from types import MappingProxyType
-from typing import Any, Dict, Mapping, Optional, Sequence, Set, Tuple
+from typing import (
+    Any,
+    Dict,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
 import pkginfo.distribution
 
+from .tree import TreePath
+
+# Anything a reader can be pointed at: a directory, or a TreePath for files that
+# aren't in one.
+ProjectPath = Union[Path, TreePath]
+
 
 class BaseReader:
     """
     Base class for reading metadata.
     """
 
-    def __init__(self, path: Path):
+    def __init__(self, path: ProjectPath):
         self.path = path
 
     def get_requires_for_build_sdist(self) -> Sequence[str]:
@@ -34,16 +54,109 @@ class BaseReader:
         """
         raise NotImplementedError
 
+    def get_source_mapping(self, dist: "Distribution") -> Optional[Dict[str, str]]:
+        """
+        Returns the source mapping of `dist` (which came from `get_metadata`)
+        for the files that are in the project now, without reading the config
+        again.
+        """
+        return dist._source_mapping(self.path)
+
 
 DEFAULT_EMPTY_DICT: Mapping[str, Any] = MappingProxyType({})
 
 
+class Span(NamedTuple):
+    """
+    Where a value was found, without keeping the parse tree alive.
+
+    Lines are 1-based and columns are 0-based, same as libcst's PositionProvider.
+    """
+
+    filename: str
+    start_line: int
+    start_col: int
+    end_line: int
+    end_col: int
+
+
+@dataclass(frozen=True)
+class TooComplicated:
+    """
+    Stands in for a value (or part of one) that couldn't be worked out
+    statically.
+    """
+
+    reason: str
+
+
+# One PEP 508 comparison, like ("python_version", "<", "3")
+MarkerAtom = Tuple[str, str, str]
+# All of the atoms hold; () always does.
+Condition = Tuple[MarkerAtom, ...]
+
+
+@dataclass
+class Sometimes:
+    """
+    A value that depends on the environment, as (condition, value) options.
+
+    At most one condition holds in any one environment; when none does, the
+    value isn't set at all.  See dowsing.markers for turning conditions into
+    PEP 508 markers.
+    """
+
+    options: List[Tuple[Condition, Any]]
+
+
+class Confidence(enum.Enum):
+    """
+    How far to trust one field of a statically-read Distribution.
+    """
+
+    # What the backend would produce.
+    EXACT = "exact"
+    # Depends on the environment it's built in.
+    SOMETIMES = "sometimes"
+    # Couldn't be evaluated, at least in part.  The value is or contains a
+    # TooComplicated, or is a reference (like "file: README.md") that wasn't
+    # followed.
+    UNKNOWN = "unknown"
+
+
+def _contains(value: Any, cls: type) -> bool:
+    if isinstance(value, cls):
+        return True
+    if isinstance(value, Sometimes):
+        return any(_contains(v, cls) for _, v in value.options)
+    if isinstance(value, Mapping):
+        return any(_contains(k, cls) or _contains(v, cls) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return any(_contains(v, cls) for v in value)
+    return False
+
+
+def has_unknown(value: Any) -> bool:
+    """
+    Whether there's a TooComplicated anywhere in value.
+    """
+    return _contains(value, TooComplicated)
+
+
+def has_sometimes(value: Any) -> bool:
+    """
+    Whether there's a Sometimes anywhere in value.
+    """
+    return _contains(value, Sometimes)
+
+
 class Distribution(pkginfo.distribution.Distribution):
     # These are not actually part of the metadata, see PEP 566
     setup_requires: Sequence[str] = ()
     tests_require: Sequence[str] = ()
     extras_require: Mapping[str, Sequence[str]] = DEFAULT_EMPTY_DICT
-    use_scm_version: Optional[bool] = None
+    # True, or setuptools_scm config
+    use_scm_version: Union[bool, Mapping[str, Any], None] = None
     zip_safe: Optional[bool] = None
     include_package_data: Optional[bool] = None
     test_suite: str = ""
@@ -63,6 +176,20 @@ class Distribution(pkginfo.distribution.Distribution):
     pbr__files__packages_root: Optional[str] = None
     pbr__files__packages: Optional[str] = None
     provides_extra: Optional[Sequence[str]] = ()
+    # distribution key -> where it was set, when known
+    provenance: Mapping[str, Span] = DEFAULT_EMPTY_DICT
+    # distribution key -> how far to trust it, when that isn't evident from the
+    # value; see get_confidence
+    confidence: Mapping[str, Confidence] = DEFAULT_EMPTY_DICT
+    # For keys that aren't set at all; UNKNOWN when they might have been set in
+    # a way we couldn't see (like `setup(**something_opaque)`).
+    default_confidence: Confidence = Confidence.EXACT
+    # Files besides the config itself that were read (or tried to be), relative
+    # to the project root.
+    input_files: Sequence[str] = ()
+    # The setuptools_scm config, when the version comes from version control
+    # (and so also depends on the commit, tags and uncommitted changes).
+    scm_config: Optional[Mapping[str, Any]] = None
 
     def _getHeaderAttrs(self) -> Sequence[Tuple[str, str, bool]]:
         # Until I invent a metadata version to include this, do so
@@ -89,6 +216,28 @@ class Distribution(pkginfo.distribution.Distribution):
             ("X-pbr__files__packages", "pbr__files__packages", True),
         )
 
+    def get_confidence(self, key: str) -> Confidence:
+        if has_unknown(getattr(self, key, None)):
+            return Confidence.UNKNOWN
+        if key in self.confidence:
+            return self.confidence[key]
+        if has_sometimes(getattr(self, key, None)):
+            return Confidence.SOMETIMES
+        if getattr(self, key, None):
+            return Confidence.EXACT
+        return self.default_confidence
+
+    def confidence_map(self) -> Dict[str, Confidence]:
+        """
+        Returns get_confidence for every key that isn't EXACT.
+        """
+        d: Dict[str, Confidence] = {}
+        for k in (*self, "packages_dict", "source_mapping"):
+            c = self.get_confidence(k)
+            if c != Confidence.EXACT:
+                d[k] = c
+        return d
+
     def asdict(self) -> Dict[str, Any]:
         d = {}
         for x in self:
@@ -96,19 +245,27 @@ class Distribution(pkginfo.distribution.Distribution):
                 d[x] = getattr(self, x)
         return d
 
-    def _source_mapping(self, root: Path) -> Optional[Dict[str, str]]:
+    def _source_mapping(self, root: ProjectPath) -> Optional[Dict[str, str]]:
         """
         Returns install path -> src path
 
-        If an exception like FileNotFound is encountered, returns None.
+        If an exception like FileNotFound is encountered, or the modules or
+        packages aren't known, returns None.
         """
         d: Dict[str, str] = {}
+        if (
+            has_unknown(self.py_modules)
+            or has_unknown(self.packages)
+            or has_unknown(self.package_dir)
+            or not all(isinstance(m, str) for m in self.py_modules)
+        ):
+            return None
 
+        # Top-level modules live in package_dir[""], like a src layout's do
+        base = self.package_dir.get("", "")
         for m in self.py_modules:
-            if m == "?":
-                return None
             m = m.replace(".", "/")
-            d[f"{m}.py"] = f"{m}.py"
+            d[f"{m}.py"] = posixpath.normpath(posixpath.join(base, f"{m}.py"))
 
         try:
             # This commented block is approximately correct for setuptools, but
@@ -126,7 +283,7 @@ class Distribution(pkginfo.distribution.Distribution):
             # in-package tests, which is a behavior I like, but I'm sure some
             # people won't.
 
-            seen_paths: Set[Path] = set()
+            seen_paths: Set[ProjectPath] = set()
 
             # Longest source path first, will "own" the item
             for k, v in sorted(
@@ -139,7 +296,7 @@ class Distribution(pkginfo.distribution.Distribution):
                         continue
                     seen_paths.add(item)
                     if item.is_file():
-                        rel = item.relative_to(vp)
+                        rel = PurePosixPath(*item.parts[len(vp.parts) :])
                         d[(kp / rel).as_posix()] = (v / rel).as_posix()
 
         except IOError:
@@ -0,0 +1,191 @@
+"""
+Incremental re-analysis for tools that ask about the same checkout repeatedly.
+
+The expensive part of `get_metadata` is parsing config (especially `setup.py`),
+while the part that changes on nearly every save is the set of files under the
+packages.  `Watcher` fingerprints the inputs of each and only redoes the stages
+whose inputs changed, so that in the common case a refresh is just some stats.
+A version from version control also depends on the state of the checkout, which
+takes asking git each time.
+"""
+
+import copy
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from . import pep517
+from .scm import git_version, ScmVersion
+from .types import BaseReader, Distribution
+
+# Files (relative to the project root) that the metadata stage reads.
+INPUT_FILES: Tuple[str, ...] = (
+    "pyproject.toml",
+    "setup.cfg",
+    "setup.py",
+    "Cargo.toml",
+    "MANIFEST.in",
+)
+
+# (mtime_ns, size, sha256) or None when the file doesn't exist
+FileFingerprint = Optional[Tuple[int, int, bytes]]
+# The parts of a directory listing that can change which packages/modules exist:
+# (subdirectory names, .py files that matter)
+Layout = Tuple[FrozenSet[str], FrozenSet[str]]
+
+
+def _layout(path: Path, is_root: bool) -> Optional[Layout]:
+    dirs = set()
+    files = set()
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir():
+                    dirs.add(entry.name)
+                elif entry.name == "__init__.py" or (
+                    is_root and entry.name.endswith(".py")
+                ):
+                    files.add(entry.name)
+    except OSError:
+        return None
+    return frozenset(dirs), frozenset(files)
+
+
+class Watcher:
+    """
+    Remembers the last result for one project and refreshes it on demand.
+
+    After each `get_metadata` call, `last_stages` says what was recomputed:
+    `("metadata",)` means config was (re)parsed, `("source_mapping",)` means
+    only the file listing under packages was redone, and `()` means the cached
+    result was still good.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.last_stages: Tuple[str, ...] = ()
+        self._reader: Optional[BaseReader] = None
+        self._dist: Optional[Distribution] = None
+        self._files: Dict[str, FileFingerprint] = {}
+        self._scm: Optional[ScmVersion] = None
+        # dir -> (mtime_ns, layout)
+        self._dirs: Dict[Path, Tuple[int, Optional[Layout]]] = {}
+
+    def get_metadata(self) -> Distribution:
+        if self._dist is None or self._files_changed() or self._scm_changed():
+            self._refresh_metadata()
+        else:
+            layout_changed, contents_changed = self._dirs_changed()
+            if layout_changed:
+                self._refresh_metadata()
+            elif contents_changed:
+                self._refresh_source_mapping()
+            else:
+                self.last_stages = ()
+
+        assert self._dist is not None
+        return self._dist
+
+    def _refresh_metadata(self) -> None:
+        # The config is fingerprinted, so the reader stays good until the
+        # next time through here.
+        _, self._reader = pep517.get_backend(self.path)
+        self._dist = self._reader.get_metadata()
+        names = INPUT_FILES + tuple(self._dist.input_files)
+        self._files = {name: self._fingerprint(name) for name in names}
+        self._scm = self._scm_state(self._dist)
+        self._record_dirs(self._dist)
+        self.last_stages = ("metadata",)
+
+    def _refresh_source_mapping(self) -> None:
+        assert self._dist is not None and self._reader is not None
+        # Callers may still be holding the previous result; don't change it
+        # underneath them.
+        dist = copy.copy(self._dist)
+        dist.source_mapping = self._reader.get_source_mapping(dist)
+        self._dist = dist
+        self._record_dirs(dist)
+        self.last_stages = ("source_mapping",)
+
+    def _fingerprint(
+        self, name: str, previous: FileFingerprint = None
+    ) -> FileFingerprint:
+        p = self.path / name
+        try:
+            st = p.stat()
+        except OSError:
+            return None
+        if previous is not None and previous[:2] == (st.st_mtime_ns, st.st_size):
+            return previous
+        return (st.st_mtime_ns, st.st_size, hashlib.sha256(p.read_bytes()).digest())
+
+    def _scm_state(self, dist: Distribution) -> Optional[ScmVersion]:
+        if dist.scm_config is None:
+            return None
+        return git_version(self.path, dist.scm_config)
+
+    def _scm_changed(self) -> bool:
+        assert self._dist is not None
+        return self._scm_state(self._dist) != self._scm
+
+    def _files_changed(self) -> bool:
+        changed = False
+        for name, previous in self._files.items():
+            current = self._fingerprint(name, previous)
+            # A touch without an edit gets a new mtime but the same digest.
+            if (current is None) != (previous is None) or (
+                current is not None
+                and previous is not None
+                and current[2] != previous[2]
+            ):
+                changed = True
+            self._files[name] = current
+        return changed
+
+    def _record_dirs(self, dist: Distribution) -> None:
+        self._dirs = {}
+        self._record_dir(self.path, recursive=False)
+
+        if isinstance(dist.packages_dict, dict):
+            for v in dist.packages_dict.values():
+                pkg_dir = self.path / v
+                # Covers src/ and similar, where new top-level packages appear.
+                self._record_dir(pkg_dir.parent, recursive=False)
+                self._record_dir(pkg_dir, recursive=True)
+
+    def _record_dir(self, path: Path, recursive: bool) -> None:
+        todo: List[Path] = [path]
+        while todo:
+            p = todo.pop()
+            if p in self._dirs:
+                continue
+            try:
+                mtime = p.stat().st_mtime_ns
+            except OSError:
+                mtime = -1
+            layout = _layout(p, p == self.path)
+            self._dirs[p] = (mtime, layout)
+            if recursive and layout is not None:
+                todo.extend(p / d for d in layout[0])
+
+    def _dirs_changed(self) -> Tuple[bool, bool]:
+        """
+        Returns (layout_changed, contents_changed).
+
+        Adding or removing a file changes the mtime of the directory it's in,
+        so only directories need to be checked; edits to existing files don't
+        change the source_mapping at all.
+        """
+        contents_changed = False
+        for p, (mtime, layout) in self._dirs.items():
+            try:
+                current = p.stat().st_mtime_ns
+            except OSError:
+                current = -1
+            if current == mtime:
+                continue
+            if _layout(p, p == self.path) != layout:
+                return True, True
+            contents_changed = True
+        return False, contents_changed